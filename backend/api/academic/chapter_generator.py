@@ -8,6 +8,7 @@ from datetime import datetime
 # Import your existing systems (matching the working script)
 from backend.api.writing.logic import generate_written_output
 from backend.api.project_versions import save_version_to_db
+from backend.core.request_context import check_deadline
 
 class AcademicChapterGenerator:
     """
@@ -170,8 +171,8 @@ AVOID TEXTBOOK PITFALLS:
 
         print(f"[ACADEMIC] ✅ Project validated: {self.project_name}")
 
-    async def generate_complete_chapter(self, chapter_num: int = 1) -> Dict[str, Any]:
-        """Generate complete academic chapter using your existing infrastructure"""
+    async def generate_complete_chapter(self, chapter_num: int = 1, cache_mode: Optional[str] = None) -> Dict[str, Any]:
+        """Generate complete academic chapter using your existing infrastructure (cache_mode is passed to each section)"""
         self.validate_project()
         self._setup_academic_tables()
         
@@ -187,6 +188,8 @@ AVOID TEXTBOOK PITFALLS:
         # Generate each section using your existing writing system
         for i, (roman_numeral, section_info) in enumerate(self.CHAPTER_SECTIONS.items(), 1):
             section_title = section_info['title']
+            # Stop before the next section once the request is past its deadline
+            check_deadline(f"section {roman_numeral}")
             print(f"\n📝 [{i}/{len(self.CHAPTER_SECTIONS)}] Generating Section {roman_numeral}: {section_title}")
 
             try:
@@ -195,7 +198,7 @@ AVOID TEXTBOOK PITFALLS:
 
                 # Use your existing generate_written_output function
                 print(f"[ACADEMIC] Calling your existing writing system...")
-                result = await generate_written_output(**write_request)
+                result = await generate_written_output(**write_request, cache_mode=cache_mode)
 
                 if result.get("status") == "success":
                     section_content = result.get("result", "")
@@ -1,5 +1,5 @@
 # backend/api/academic/routes.py
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request, Response
 from pydantic import BaseModel
 from typing import Dict, Any, Optional, List
 import os
@@ -7,6 +7,11 @@ import sqlite3
 import json
 
 from .chapter_generator import AcademicChapterGenerator
+from backend.core.request_context import run_cancellable, RequestAbandoned, CHAPTER_DEADLINE_SECONDS
+from backend.core.idempotency import (
+    run_idempotent, request_fingerprint, successful_response, IdempotencyConflict,
+    IDEMPOTENCY_HEADER, REPLAY_HEADER,
+)
 
 router = APIRouter()
 
@@ -16,14 +21,17 @@ class ChapterGenerationRequest(BaseModel):
     academic_level: str = "undergraduate"
     force_regenerate: bool = False
     custom_table_mapping: Optional[Dict[str, List[str]]] = None
+    cache_mode: Optional[str] = None  # "use" | "bypass" | "refresh" (completion cache)
 
 class SectionRegenerateRequest(BaseModel):
     project_name: str
     chapter_number: int
     section_number: int  # 1-8 for I-VIII
+    cache_mode: Optional[str] = None  # "use" | "bypass" | "refresh" (completion cache)
 
 @router.post("/generate-chapter")
-async def generate_academic_chapter(request: ChapterGenerationRequest) -> Dict[str, Any]:
+async def generate_academic_chapter(request: ChapterGenerationRequest, http_request: Request,
+                                    response: Response) -> Dict[str, Any]:
     """
     Generate complete academic chapter using section-by-section approach
     Integrates with your existing Nell Beta infrastructure:
@@ -57,16 +65,21 @@ async def generate_academic_chapter(request: ChapterGenerationRequest) -> Dict[s
             detail=f"LightRAG buckets directory not found: {lightrag_path}"
         )
     
-    try:
+    idempotency_key = http_request.headers.get(IDEMPOTENCY_HEADER)
+    
+    async def generate() -> Dict[str, Any]:
         # Initialize generator with optional custom table mapping
         generator = AcademicChapterGenerator(
             request.project_name, 
             custom_table_mapping=request.custom_table_mapping
         )
         
-        result = await generator.generate_complete_chapter(
-            chapter_num=request.chapter_number
-        )
+        # Sections still running when the client disconnects or the deadline passes are cancelled
+        result = await run_cancellable(http_request, lambda: generator.generate_complete_chapter(
+            chapter_num=request.chapter_number,
+            cache_mode=request.cache_mode
+        ), label=f"chapter {request.chapter_number} of {request.project_name}",
+            deadline_seconds=CHAPTER_DEADLINE_SECONDS, cancel_on_disconnect=not idempotency_key)
         
         # Add API-specific metadata
         result["api_metadata"] = {
@@ -80,7 +93,25 @@ async def generate_academic_chapter(request: ChapterGenerationRequest) -> Dict[s
         }
         
         return result
+    
+    try:
+        # A retry carrying the same Idempotency-Key gets the first chapter back instead of
+        # regenerating it, unless some of its sections failed
+        result, replayed = await run_idempotent(
+            "generate-chapter",
+            idempotency_key,
+            request_fingerprint(request.dict()),
+            generate,
+            storable=lambda chapter: successful_response(chapter) and not chapter["metadata"]["sections_failed"]
+        )
+        if replayed:
+            response.headers[REPLAY_HEADER] = "true"
+        return result
         
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except RequestAbandoned as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
     except FileNotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
@@ -90,7 +121,7 @@ async def generate_academic_chapter(request: ChapterGenerationRequest) -> Dict[s
         )
 
 @router.post("/regenerate-section")
-async def regenerate_chapter_section(request: SectionRegenerateRequest) -> Dict[str, Any]:
+async def regenerate_chapter_section(request: SectionRegenerateRequest, http_request: Request) -> Dict[str, Any]:
     """Regenerate a specific section of a chapter"""
     
     project_path = f"projects/{request.project_name}"
@@ -120,7 +151,11 @@ async def regenerate_chapter_section(request: SectionRegenerateRequest) -> Dict[
         
         # Use existing writing system
         from backend.api.writing.logic import generate_written_output
-        result = await generate_written_output(**write_request)
+        result = await run_cancellable(
+            http_request,
+            lambda: generate_written_output(**write_request, cache_mode=request.cache_mode),
+            label=f"section {roman_numeral} of {request.project_name}"
+        )
         
         if result.get("status") == "success":
             section_content = result.get("result", "")
@@ -149,6 +184,8 @@ async def regenerate_chapter_section(request: SectionRegenerateRequest) -> Dict[
                 detail=f"Section regeneration failed: {result.get('error', 'Unknown error')}"
             )
             
+    except RequestAbandoned as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -6,9 +6,14 @@ import os
 from datetime import datetime
 from typing import List, Dict, Any
 
-from lightrag import QueryParam  # ✅ ADDED: Import QueryParam
 from backend.core.lightrag_singleton import get_lightrag
+from backend.core.lightrag_interface import query_bucket, retrieve_context
+from backend.core.context_packer import pack_contexts
+from backend.core.llm_hedging import hedged_completion, openai_attempt, HEDGE_MODE
+from backend.core.completion_cache import cached_completion
+from backend.core.request_context import check_deadline
 from backend.api.project_versions import save_version_to_db
+from backend.api.writing.logic import RETRIEVAL_MODE, RETRIEVAL_MODES, QUERY_LATENCY_BUDGET
 
 PROJECTS_DIR = "projects"
 
@@ -17,18 +22,37 @@ def get_db_path(project_id: str) -> str:
     return os.path.join(PROJECTS_DIR, project_id, "project.db")
 
 
-async def query_buckets(buckets: List[str], query: str) -> Dict[str, str]:
-    """Query LightRAG buckets using the correct API"""
-    lightrag = get_lightrag()  # This was already correct
+async def query_buckets(buckets: List[str], query: str, retrieval: str = None,
+                        latency_budget: float = None, plans: Dict[str, Any] = None) -> Dict[str, str]:
+    """
+    Query each bucket's own LightRAG instance.
+
+    retrieval="context" (default WRITING_RETRIEVAL) returns packed entities,
+    relationships and excerpts without LightRAG's answer-writing LLM call;
+    "answer" returns LightRAG's prose answer. Mode and top_k are planned per bucket
+    from an even share of latency_budget; the plans are written to plans if given.
+    """
+    retrieval = (retrieval or RETRIEVAL_MODE).lower()
+    if retrieval not in RETRIEVAL_MODES:
+        raise ValueError(f"Unknown retrieval mode '{retrieval}' (expected one of {RETRIEVAL_MODES})")
     results = {}
+    contexts = {}
+    
+    bucket_budget = latency_budget / len(buckets) if latency_budget and buckets else None
     
     for bucket in buckets:
-        # ✅ FIXED: Use correct LightRAG query method with QueryParam
-        query_param = QueryParam(mode="hybrid", top_k=5)
-        response = await lightrag.aquery(query, param=query_param)
-        
-        # Note: LightRAG returns a string response, not a list of hits
-        results[bucket] = response
+        check_deadline(f"querying bucket '{bucket}'")
+        if retrieval == "context":
+            hit = contexts[bucket] = await retrieve_context(bucket, query, mode="auto", latency_budget=bucket_budget)
+        else:
+            # Note: LightRAG returns a string response, not a list of hits
+            hit = await query_bucket(bucket, query, mode="auto", latency_budget=bucket_budget)
+            results[bucket] = hit["result"]
+        if plans is not None:
+            plans[bucket] = hit["plan"]
+    
+    for bucket, packed in pack_contexts(contexts).items():
+        results[bucket] = packed or f"[No content available in {bucket}]"
         
     return results
 
@@ -40,15 +64,28 @@ async def generate_brainstorm_output(
     selected_buckets: List[str],
     custom_prompt: str,
     tone: str,
-    easter_egg: str
+    easter_egg: str,
+    cache_mode: str = None,
+    retrieval: str = None,
+    latency_budget: float = None
 ) -> Dict[str, Any]:
-    """Generate brainstorm using proper LightRAG API"""
+    """
+    Generate brainstorm using proper LightRAG API.
+
+    cache_mode: "use", "bypass" or "refresh"; retrieval: "context" or "answer";
+    latency_budget: seconds for bucket querying (see query_buckets).
+    """
     lightrag = get_lightrag()  # This was already correct
     
     # Query buckets for context (if any buckets are selected)
     bucket_context = ""
+    retrieval_plans = {}
     if selected_buckets:
-        bucket_hits = await query_buckets(selected_buckets, scene_description)
+        bucket_hits = await query_buckets(
+            selected_buckets, scene_description, retrieval,
+            latency_budget=latency_budget if latency_budget is not None else QUERY_LATENCY_BUDGET,
+            plans=retrieval_plans
+        )
         for name, content in bucket_hits.items():
             bucket_context += f"\n--- {name} ---\n{content}"
 
@@ -66,8 +103,17 @@ Easter Egg: {easter_egg}
 
 Now brainstorm specific ideas, patterns, or scene possibilities."""
 
-    # ✅ Use the correct LightRAG API for generation
-    result = await lightrag.llm_model_func(final_prompt)
+    # ✅ Use the correct LightRAG API for generation (hedged when LLM_HEDGE is enabled)
+    async def complete():
+        if HEDGE_MODE in ("same", "fallback"):
+            outcome = await hedged_completion("openai", openai_attempt(final_prompt), "openai", openai_attempt(final_prompt))
+            return outcome["text"]
+        return await lightrag.llm_model_func(final_prompt)
+
+    cached = await cached_completion("openai", "gpt-4o-mini", {}, final_prompt, complete, mode=cache_mode)
+    result = cached["text"]
+
+    check_deadline("saving brainstorm")
 
     version_id = f"brainstorm_{int(datetime.now().timestamp())}"
     metadata = {
@@ -81,7 +127,8 @@ Now brainstorm specific ideas, patterns, or scene possibilities."""
             "instructions": custom_prompt,
             "easter_egg": easter_egg
         },
-        "dataSourcesCount": len(selected_buckets)
+        "dataSourcesCount": len(selected_buckets),
+        "retrieval_plans": retrieval_plans
     }
 
     save_version_to_db(
@@ -99,5 +146,7 @@ Now brainstorm specific ideas, patterns, or scene possibilities."""
         "version_id": version_id,
         "result": result,
         "prompt": final_prompt,
-        "scene_id": scene_id
+        "scene_id": scene_id,
+        "cache": cached["cache"],
+        "retrieval_plans": retrieval_plans
     }
@@ -1,8 +1,12 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request, Response
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
 
 from backend.api.brainstorming.logic import generate_brainstorm_output
+from backend.core.request_context import run_cancellable, RequestAbandoned
+from backend.core.idempotency import (
+    run_idempotent, request_fingerprint, IdempotencyConflict, IDEMPOTENCY_HEADER, REPLAY_HEADER,
+)
 
 router = APIRouter()
 
@@ -15,20 +19,46 @@ class BrainstormRequest(BaseModel):
     custom_prompt: Optional[str] = ""
     tone: Optional[str] = "neutral"
     easter_egg: Optional[str] = ""
+    cache_mode: Optional[str] = None  # "use" | "bypass" | "refresh" (completion cache)
+    retrieval: Optional[str] = None  # "context" (retrieved passages) | "answer" (LightRAG prose answer)
+    latency_budget: Optional[float] = None  # seconds for bucket querying; picks query mode/top_k per bucket
 
 
 @router.post("/brainstorm")
-async def api_brainstorm(request: BrainstormRequest) -> Dict[str, Any]:
+async def api_brainstorm(request: BrainstormRequest, http_request: Request, response: Response) -> Dict[str, Any]:
     try:
-        return await generate_brainstorm_output(
-            project_id=request.project_id,
-            scene_id=request.scene_id,
-            scene_description=request.scene_description,
-            selected_buckets=request.selected_buckets,
-            custom_prompt=request.custom_prompt,
-            tone=request.tone,
-            easter_egg=request.easter_egg
+        # Cancelled if the request deadline passes, or the client disconnects without an
+        # Idempotency-Key; retries carrying the same key get the first response back
+        idempotency_key = http_request.headers.get(IDEMPOTENCY_HEADER)
+        result, replayed = await run_idempotent(
+            "brainstorm",
+            idempotency_key,
+            request_fingerprint(request.dict()),
+            lambda: run_cancellable(http_request, lambda: generate_brainstorm_output(
+                project_id=request.project_id,
+                scene_id=request.scene_id,
+                scene_description=request.scene_description,
+                selected_buckets=request.selected_buckets,
+                custom_prompt=request.custom_prompt,
+                tone=request.tone,
+                easter_egg=request.easter_egg,
+                cache_mode=request.cache_mode,
+                retrieval=request.retrieval,
+                latency_budget=request.latency_budget
+            ), label=f"brainstorm {request.project_id}/{request.scene_id}",
+                cancel_on_disconnect=not idempotency_key)
         )
+        if replayed:
+            response.headers[REPLAY_HEADER] = "true"
+        return result
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except RequestAbandoned as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -1,12 +1,27 @@
 # backend/api/buckets.py
 
 import os
-import tempfile
-from fastapi import APIRouter, HTTPException, UploadFile, File
+import io
+import json
+import codecs
+import tarfile
+import zipfile
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException, UploadFile, File, Query, Response
+from fastapi.responses import StreamingResponse
 
 from backend.core.lightrag_interface import (
-    create_bucket, list_buckets, delete_bucket,
-    ingest_file, list_bucket_files, delete_file, query_bucket,
+    WORKING_DIR, create_bucket, list_buckets, delete_bucket,
+    ingest_text, ingest_documents, content_preview, list_bucket_files, delete_file, query_bucket,
+    plan_bucket_query, get_bucket_summary, refresh_bucket_summary,
+    export_graph_page, stream_graph_ndjson, stream_graph_graphml,
+)
+from backend.core.project_registry import get_project_metadata
+from backend.core.graph_index import get_graph_index
+from backend.core.query_planner import QUERY_MODES, bucket_latency_stats
+from backend.core.ingest_queue import (
+    enqueue_document, check_capacity, get_job, list_jobs, document_progress, queue_stats,
+    IngestQueueFull, QUEUE_FULL_RETRY_AFTER,
 )
 
 router = APIRouter()
@@ -30,36 +45,192 @@ async def api_delete_bucket(bucket: str):
     return await delete_bucket(bucket)
 
 
+# Upload bytes pulled per read while decoding an ingest upload
+UPLOAD_READ_SIZE = 1024 * 1024
+
+async def _read_upload_text(file: UploadFile) -> str:
+    """Decode an upload chunk by chunk straight into text, without a temp-file round-trip"""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    parts = []
+    while True:
+        chunk = await file.read(UPLOAD_READ_SIZE)
+        if not chunk:
+            break
+        parts.append(decoder.decode(chunk))
+    parts.append(decoder.decode(b"", final=True))
+    return "".join(parts)
+
+
+def _queue_full(e: IngestQueueFull) -> HTTPException:
+    return HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(QUEUE_FULL_RETRY_AFTER)})
+
+
 @router.post("/buckets/{bucket}/ingest")
-async def api_ingest(bucket: str, file: UploadFile = File(...)):
+async def api_ingest(
+    bucket: str,
+    response: Response,
+    file: UploadFile = File(...),
+    wait: bool = Query(False, description="Ingest inside the request instead of queueing"),
+):
+    """
+    Queue an uploaded document for ingestion and return its job (202).
+    Poll /buckets/{bucket}/ingest/jobs/{job_id} or /buckets/{bucket}/files/{doc_id}/progress.
+    """
     print(f"\n[LIGHTRAG INGEST] Bucket: {bucket}")
     print(f"[LIGHTRAG INGEST] File name: {file.filename}")
 
-    suffix = os.path.splitext(file.filename)[1] or ".txt"
-    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
-        contents = await file.read()
-        tmp.write(contents)
-        tmp_path = tmp.name
+    try:
+        if not wait:
+            # Refuse before reading the upload when the queue is already full
+            check_capacity(file.size or 0)
+        content = await _read_upload_text(file)
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=415, detail="Only UTF-8 text files can be ingested")
+    except IngestQueueFull as e:
+        raise _queue_full(e)
 
-    print(f"[LIGHTRAG INGEST] Temp file saved at: {tmp_path}")
-    print(f"[LIGHTRAG INGEST] File contents:\n{contents.decode('utf-8')}\n")
+    print(f"[LIGHTRAG INGEST] Received {len(content)} characters: {content_preview(content)}")
 
-    try:
-        result = await ingest_file(bucket, tmp_path)
-        print(f"[LIGHTRAG INGEST] Ingest result: {result}")
-        return result
-    finally:
-        os.remove(tmp_path)
+    if not wait:
+        try:
+            job = enqueue_document(bucket, content, file.filename or "unknown")
+        except IngestQueueFull as e:
+            raise _queue_full(e)
+        response.status_code = 202
+        return job
+
+    result = await ingest_text(bucket, content, file.filename or "unknown")
+    print(f"[LIGHTRAG INGEST] Ingest result: {result}")
+    return result
+
+
+@router.get("/buckets/{bucket}/ingest/jobs")
+async def api_list_ingest_jobs(bucket: str, status: Optional[str] = Query(None)):
+    return {"queue": queue_stats(), "jobs": list_jobs(bucket, status)}
+
+
+@router.get("/buckets/{bucket}/ingest/jobs/{job_id}")
+async def api_get_ingest_job(bucket: str, job_id: str):
+    job = get_job(job_id)
+    if job is None or job["bucket"] != bucket:
+        raise HTTPException(status_code=404, detail=f"Ingest job '{job_id}' not found.")
+    return job
+
+
+# Upper bound on what a single batch request may expand to, archives included
+MAX_BATCH_BYTES = int(os.getenv("MAX_BATCH_INGEST_BYTES", str(200 * 1024 * 1024)))
+ARCHIVE_SUFFIXES = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz")
+
+def _archive_members(filename: str, data: bytes):
+    """Yield (member name, size, reader) for every regular file in a zip or tar archive"""
+    if filename.lower().endswith(".zip"):
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            for info in archive.infolist():
+                if not info.is_dir():
+                    yield info.filename, info.file_size, lambda info=info: archive.read(info)
+    else:
+        with tarfile.open(fileobj=io.BytesIO(data), mode="r:*") as archive:
+            for member in archive.getmembers():
+                if member.isfile():
+                    yield member.name, member.size, lambda member=member: archive.extractfile(member).read()
+
+def _batch_too_large() -> HTTPException:
+    return HTTPException(status_code=413, detail=f"Batch expands beyond {MAX_BATCH_BYTES} bytes")
+
+async def _read_upload_bytes(upload: UploadFile, max_bytes: int) -> bytes:
+    """Read an upload in chunks, failing with 413 as soon as it exceeds max_bytes"""
+    if upload.size is not None and upload.size > max_bytes:
+        raise _batch_too_large()
+    data = bytearray()
+    while True:
+        chunk = await upload.read(UPLOAD_READ_SIZE)
+        if not chunk:
+            break
+        data.extend(chunk)
+        if len(data) > max_bytes:
+            raise _batch_too_large()
+    return bytes(data)
+
+def _is_hidden(path: str) -> bool:
+    return any(part.startswith(".") or part == "__MACOSX" for part in path.split("/"))
+
+
+@router.post("/buckets/{bucket}/ingest/batch")
+async def api_ingest_batch(bucket: str, files: List[UploadFile] = File(...)):
+    """
+    Ingest several files, or zip/tar archives of files, in one request.
+
+    Each text document becomes its own LightRAG document; the response lists a
+    result per document (success, duplicate, failed or skipped).
+    """
+    print(f"\n[LIGHTRAG INGEST] Batch into bucket: {bucket} ({len(files)} uploads)")
+    if not os.path.isdir(os.path.join(WORKING_DIR, bucket)):
+        raise HTTPException(status_code=404, detail=f"Bucket '{bucket}' not found.")
+
+    documents = []
+    skipped = []
+    total_bytes = 0
+
+    def add(name: str, raw: bytes):
+        try:
+            documents.append((name, raw.decode("utf-8")))
+        except UnicodeDecodeError:
+            skipped.append({"status": "skipped", "filename": name, "error": "Not a UTF-8 text file"})
+
+    for upload in files:
+        name = upload.filename or "unknown"
+        data = await _read_upload_bytes(upload, MAX_BATCH_BYTES - total_bytes)
+        total_bytes += len(data)
+        if not name.lower().endswith(ARCHIVE_SUFFIXES):
+            add(name, data)
+            continue
+        try:
+            for member, size, read in _archive_members(name, data):
+                if _is_hidden(member):
+                    continue
+                total_bytes += size
+                if total_bytes > MAX_BATCH_BYTES:
+                    raise _batch_too_large()
+                add(f"{name}/{member}", read())
+        except (zipfile.BadZipFile, tarfile.TarError) as e:
+            skipped.append({"status": "skipped", "filename": name, "error": f"Unreadable archive: {str(e)}"})
+
+    print(f"[LIGHTRAG INGEST] {len(documents)} documents to ingest, {len(skipped)} skipped")
+    result = await ingest_documents(bucket, documents)
+    result["documents"].extend(skipped)
+    result["total"] += len(skipped)
+    if skipped:
+        result["counts"]["skipped"] = len(skipped)
+    return result
 
 
 @router.get("/buckets/{bucket}/files")
-async def api_list_files(bucket: str):
-    return await list_bucket_files(bucket)
+async def api_list_files(
+    bucket: str,
+    status: Optional[str] = Query(None, description="Filter by status: processing, processed, failed"),
+    limit: int = Query(1000, ge=1, le=10000),
+    offset: int = Query(0, ge=0),
+):
+    try:
+        return await list_bucket_files(bucket, status=status, limit=limit, offset=offset)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@router.get("/buckets/{bucket}/files/{doc_id}/progress")
+async def api_file_progress(bucket: str, doc_id: str):
+    progress = document_progress(bucket, doc_id)
+    if progress is None:
+        raise HTTPException(status_code=404, detail=f"Document '{doc_id}' not found in bucket '{bucket}'.")
+    return progress
 
 
 @router.delete("/buckets/{bucket}/files/{doc_id}")
 async def api_delete_file(bucket: str, doc_id: str):
-    return await delete_file(bucket, doc_id)
+    try:
+        return await delete_file(bucket, doc_id)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
 
 
 @router.post("/buckets/{bucket}/query")
@@ -68,12 +239,129 @@ async def api_query(bucket: str, payload: dict):
     if not query:
         raise HTTPException(status_code=400, detail="Must provide 'query'")
     user_prompt = payload.get("user_prompt", "")
-    return await query_bucket(bucket, query, user_prompt=user_prompt)
+    # "auto" (default) picks mode and top_k from latency_budget and the bucket's stats;
+    # the chosen mode and plan come back with the result
+    mode = payload.get("mode") or "auto"
+    if mode not in QUERY_MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of {', '.join(QUERY_MODES)}")
+    try:
+        latency_budget = float(payload["latency_budget"]) if payload.get("latency_budget") is not None else None
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="latency_budget must be a number of seconds")
+    return await query_bucket(bucket, query, user_prompt=user_prompt, mode=mode, latency_budget=latency_budget)
+
+@router.get("/buckets/{bucket}/query/stats")
+async def api_query_stats(bucket: str, latency_budget: Optional[float] = None, only_need_context: bool = False):
+    """Measured query latency per mode and the plan the planner would use now (for context-only retrieval if asked)"""
+    if not os.path.isdir(os.path.join(WORKING_DIR, bucket)):
+        raise HTTPException(status_code=404, detail=f"Bucket '{bucket}' not found")
+    return {
+        "bucket": bucket,
+        "latency": bucket_latency_stats(bucket),
+        "plan": plan_bucket_query(bucket, latency_budget=latency_budget, only_need_context=only_need_context),
+    }
+
+@router.get("/buckets/{bucket}/summary")
+async def api_bucket_summary(bucket: str):
+    """Precomputed summary of the bucket's documents, kept up to date after ingests and deletes"""
+    try:
+        summary = get_bucket_summary(bucket)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    if summary is None:
+        raise HTTPException(status_code=404, detail=f"No summary for bucket '{bucket}' yet; it is being computed")
+    return summary
+
+@router.post("/buckets/{bucket}/summary/refresh")
+async def api_refresh_bucket_summary(bucket: str):
+    """Bring the summary up to date now instead of waiting for the background refresh"""
+    try:
+        await refresh_bucket_summary(bucket)
+        return get_bucket_summary(bucket)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@router.post("/buckets/{bucket}/subgraph")
+async def api_bucket_subgraph(bucket: str, payload: dict):
+    """
+    Bounded neighbourhood around the given entities from the bucket's in-memory
+    adjacency index: {"entities": [...], "hops": 1, "max_nodes": 50, "rank_by": "degree"|"weight"}
+    """
+    entities = payload.get("entities")
+    if not entities or not isinstance(entities, list):
+        raise HTTPException(status_code=400, detail="Must provide 'entities' as a list")
+    if not os.path.isdir(os.path.join(WORKING_DIR, bucket)):
+        raise HTTPException(status_code=404, detail=f"Bucket '{bucket}' not found.")
+    try:
+        hops = min(max(int(payload.get("hops", 1)), 0), 5)
+        max_nodes = min(max(int(payload.get("max_nodes", 50)), 1), 5000)
+        index = await get_graph_index(bucket)
+        return index.neighborhood(
+            [str(e) for e in entities], hops=hops, max_nodes=max_nodes,
+            rank_by=payload.get("rank_by", "degree"),
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 
 @router.get("/buckets/export_graph")
-async def api_export_graph():
-    from backend.core.lightrag_interface import export_graph
-    return await export_graph()
+async def api_export_graph(
+    project_name: str,
+    bucket: Optional[List[str]] = Query(None),
+    format: str = "json",
+    kind: str = "nodes",
+    offset: int = Query(0, ge=0),
+    limit: int = Query(1000, ge=1, le=50000),
+    merge: bool = True,
+):
+    """
+    Export the knowledge graph of one or more buckets.
+
+    Without ?bucket= the project's buckets are used (all buckets if the project
+    lists none). format=json returns one page of `kind` (nodes|edges);
+    format=ndjson and format=graphml stream the whole graph. With merge=true
+    entities shared across buckets are emitted once, tagged with every bucket.
+    """
+    buckets = bucket or _project_buckets(project_name)
+    try:
+        if format == "json":
+            return await export_graph_page(buckets, kind=kind, offset=offset, limit=limit, merge=merge)
+        if format == "ndjson":
+            stream = stream_graph_ndjson(buckets, merge=merge)
+            media_type, extension = "application/x-ndjson", "ndjson"
+        elif format == "graphml":
+            stream = stream_graph_graphml(buckets, merge=merge)
+            media_type, extension = "application/graphml+xml", "graphml"
+        else:
+            raise HTTPException(status_code=400, detail="format must be 'json', 'ndjson' or 'graphml'")
+        # Resolve buckets (and surface 404s) before the response starts streaming
+        first_chunk = await stream.__anext__()
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async def body():
+        yield first_chunk
+        async for chunk in stream:
+            yield chunk
+
+    return StreamingResponse(
+        body(),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={project_name}_graph.{extension}"},
+    )
+
+
+def _project_buckets(project_name: str) -> Optional[List[str]]:
+    """Buckets listed in the project's metadata that exist on disk, or None for all buckets"""
+    try:
+        metadata = get_project_metadata(project_name)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    listed = [b for b in metadata.get("buckets", []) if isinstance(b, str)]
+    existing = [b for b in listed if os.path.isdir(os.path.join(WORKING_DIR, b))]
+    return existing or None
 
 # Re-export router for FastAPI app
 router = router
@@ -1,19 +1,61 @@
-from fastapi import APIRouter, HTTPException
-from backend.core.lightrag_interface import export_graph
-from backend.core.neo4j_interface import write_graph, fetch_graph
+
+import os
+from typing import List
+from fastapi import APIRouter, HTTPException, Query
+from backend.core.lightrag_interface import WORKING_DIR, list_buckets
+from backend.core.graph_backend import get_graph_backend
+from backend.core.graph_sync import push_bucket_graph, compute_graph_delta, summarize_delta
 
 router = APIRouter(tags=["graph"])
 
 @router.post("/graph/push")
-async def api_push_graph():
+async def api_push_graph(bucket: str = None, mode: str = "incremental"):
+    """Sync bucket graphs to the graph backend; incremental mode only sends what changed since the last push"""
+    if mode not in ("incremental", "full"):
+        raise HTTPException(status_code=400, detail="mode must be 'incremental' or 'full'")
+    buckets = [bucket] if bucket else [
+        b for b in await list_buckets() if os.path.isdir(os.path.join(WORKING_DIR, b))
+    ]
     try:
-        nodes, rels = await export_graph()
-        write_graph(nodes, rels)
-        return {"status":"ok", "nodes":len(nodes), "relations":len(rels)}
+        results = [await push_bucket_graph(b, mode=mode) for b in buckets]
+        return {
+            "status": "ok",
+            "mode": mode,
+            "nodes": sum(r["nodes_upserted"] for r in results),
+            "relations": sum(r["relations_upserted"] for r in results),
+            "buckets": results,
+        }
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/graph/changes")
+async def api_pending_graph_changes(bucket: str):
+    """Entities and relations added, changed or removed since the bucket's last push"""
+    if not os.path.isdir(os.path.join(WORKING_DIR, bucket)):
+        raise HTTPException(status_code=404, detail=f"Bucket '{bucket}' not found.")
+    delta = await compute_graph_delta(bucket)
+    return summarize_delta(bucket, delta)
+
 @router.get("/graph/all")
 def api_fetch_graph(limit: int = 100):
-    return fetch_graph(limit)
+    return get_graph_backend().fetch_graph(limit)
+
+@router.get("/graph/nodes/{node_id}/neighbors")
+def api_graph_neighbors(node_id: str, limit: int = Query(100, ge=1, le=5000), type: str = None):
+    """Nodes adjacent to node_id (either direction), optionally filtered by relation type"""
+    return get_graph_backend().neighbors(node_id, limit=limit, rel_type=type)
+
+@router.get("/graph/subgraph")
+def api_graph_subgraph(
+    id: List[str] = Query(...),
+    hops: int = Query(1, ge=0, le=5),
+    max_nodes: int = Query(200, ge=1, le=5000),
+):
+    """k-hop neighbourhood around the given node ids, capped at max_nodes"""
+    return get_graph_backend().subgraph(id, hops=hops, max_nodes=max_nodes)
 
+@router.get("/graph/degree")
+def api_graph_degree(id: List[str] = Query(...)):
+    return get_graph_backend().degree(id)
@@ -0,0 +1,25 @@
+# backend/api/llm.py
+
+from fastapi import APIRouter
+
+from backend.core.llm_gateway import gateway_metrics
+from backend.core.llm_resilience import breaker_states
+from backend.core.llm_hedging import hedging_metrics
+from backend.core.completion_cache import completion_cache_stats
+from backend.core.embedding_cache import embedding_cache_stats
+from backend.core.singleflight import coalescing_metrics
+
+router = APIRouter()
+
+
+@router.get("/llm/metrics")
+async def api_llm_metrics():
+    """Per-provider LLM gateway state (limits, in-flight calls, queue depth, waits per lane), circuit breakers, hedging, the completion and embedding caches and request coalescing"""
+    return {
+        **gateway_metrics(),
+        "circuit_breakers": breaker_states(),
+        "hedging": hedging_metrics(),
+        "completion_cache": completion_cache_stats(),
+        "embedding_cache": embedding_cache_stats(),
+        "coalescing": coalescing_metrics(),
+    }
@@ -4,14 +4,30 @@ import os
 import sqlite3
 import json
 import shutil
+import hashlib
+import time
+import asyncio
 from datetime import datetime
 from typing import List, Dict, Any, Optional
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request, Response
 
 # Initialize projects directory
 PROJECTS_DIR = os.path.join(os.path.dirname(__file__), "../../projects")
 os.makedirs(PROJECTS_DIR, exist_ok=True)
 
+# Bump whenever ensure_project_structure learns to create or repair something new.
+# Each project is checked at most once per schema version per process.
+PROJECT_SCHEMA_VERSION = 1
+
+# In-memory caches
+_structure_checks: Dict[str, Dict[str, Any]] = {}   # project path -> {"schema_version", "result"}
+_project_responses: Dict[str, Dict[str, Any]] = {}  # project path -> {"etag", "body"}
+
+# Deep health reports are computed in the background and served from here
+HEALTH_REFRESH_INTERVAL = int(os.getenv("HEALTH_REFRESH_INTERVAL", "30"))
+_health_cache: Dict[str, Any] = {"system": None, "projects": {}}
+_health_task: Optional[asyncio.Task] = None
+
 router = APIRouter()
 
 # ===================================================================
@@ -20,13 +36,27 @@ router = APIRouter()
 
 @router.get("/projects/{name}/health")
 async def get_project_health(name: str) -> Dict[str, Any]:
-    """Comprehensive project health check"""
+    """Project health report, served from the background health cache"""
     sanitized_name = validate_project_name(name)
     project_path = get_project_path(sanitized_name)
     
     if not os.path.isdir(project_path):
         raise HTTPException(status_code=404, detail="Project not found")
     
+    ensure_health_monitor()
+    entry = _health_cache["projects"].get(sanitized_name)
+    if entry is None:
+        # Project not covered by the last refresh yet (e.g. just created)
+        entry = {
+            "report": await asyncio.to_thread(compute_project_health, sanitized_name, project_path),
+            "computed_at": time.time()
+        }
+        _health_cache["projects"][sanitized_name] = entry
+    
+    return {**entry["report"], **_cache_age(entry["computed_at"])}
+
+def compute_project_health(sanitized_name: str, project_path: str) -> Dict[str, Any]:
+    """Comprehensive project health check (opens the database, parses metadata)"""
     health_report = {
         "project_name": sanitized_name,
         "overall_status": "healthy",
@@ -141,8 +171,10 @@ async def repair_project(name: str) -> Dict[str, Any]:
     try:
         print(f"[PROJECT] Starting repair for project: {sanitized_name}")
         
-        # Run structure repair
-        repair_result = ensure_project_structure(project_path, sanitized_name)
+        # Run structure repair (forced, bypasses the per-process memo)
+        invalidate_project_cache(project_path)
+        _health_cache["projects"].pop(sanitized_name, None)
+        repair_result = ensure_project_structure_once(project_path, sanitized_name, force=True)
         
         # Additional repairs
         additional_repairs = []
@@ -304,35 +336,47 @@ async def get_project_detailed_stats(name: str) -> Dict[str, Any]:
 # HEALTH AND MONITORING
 # ===================================================================
 
+@router.get("/system/live")
+async def system_liveness() -> Dict[str, Any]:
+    """Constant-time liveness probe for load balancers (no disk or database I/O)"""
+    return {"status": "alive"}
+
+@router.get("/system/ready")
+async def system_readiness(response: Response) -> Dict[str, Any]:
+    """Readiness probe backed by the cached deep health report"""
+    ensure_health_monitor()
+    entry = _health_cache["system"]
+    if entry is None:
+        response.status_code = 503
+        return {"status": "starting", "ready": False}
+    
+    report = entry["report"]
+    ready = report.get("status") == "healthy"
+    if not ready:
+        response.status_code = 503
+    return {"status": report.get("status"), "ready": ready, **_cache_age(entry["computed_at"])}
+
 @router.get("/system/health")
-async def system_health_check() -> Dict[str, Any]:
-    """Overall system health check"""
+async def system_health_check(refresh: bool = False) -> Dict[str, Any]:
+    """Deep system health report, computed in the background and served from cache"""
+    ensure_health_monitor()
+    if refresh or _health_cache["system"] is None:
+        await asyncio.to_thread(refresh_health_reports)
+    
+    entry = _health_cache["system"]
+    return {**entry["report"], **_cache_age(entry["computed_at"])}
+
+def compute_system_health(project_reports: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Overall system health summarised from per-project reports"""
     try:
         # Check projects directory
         projects_accessible = os.path.exists(PROJECTS_DIR) and os.access(PROJECTS_DIR, os.W_OK)
         
-        # Count projects
-        project_count = 0
-        healthy_projects = 0
-        
-        if projects_accessible:
-            try:
-                for item in os.listdir(PROJECTS_DIR):
-                    item_path = os.path.join(PROJECTS_DIR, item)
-                    if os.path.isdir(item_path):
-                        project_count += 1
-                        
-                        # Quick health check
-                        db_path = os.path.join(item_path, "project.db")
-                        if os.path.exists(db_path):
-                            try:
-                                conn = sqlite3.connect(db_path)
-                                conn.close()
-                                healthy_projects += 1
-                            except:
-                                pass
-            except OSError:
-                pass
+        project_count = len(project_reports)
+        healthy_projects = sum(
+            1 for report in project_reports.values()
+            if report.get("checks", {}).get("database", {}).get("status") == "pass"
+        )
         
         return {
             "status": "healthy" if projects_accessible else "unhealthy",
@@ -349,6 +393,57 @@ async def system_health_check() -> Dict[str, Any]:
             "error": str(e),
             "projects_directory": PROJECTS_DIR
         }
+
+def refresh_health_reports():
+    """Recompute every project report and the system summary (blocking, run off-loop)"""
+    project_reports = {}
+    try:
+        for item in os.listdir(PROJECTS_DIR):
+            item_path = os.path.join(PROJECTS_DIR, item)
+            if os.path.isdir(item_path):
+                project_reports[item] = compute_project_health(item, item_path)
+    except OSError as e:
+        print(f"[HEALTH] Failed to list projects: {str(e)}")
+    
+    computed_at = time.time()
+    _health_cache["projects"] = {
+        name: {"report": report, "computed_at": computed_at}
+        for name, report in project_reports.items()
+    }
+    _health_cache["system"] = {"report": compute_system_health(project_reports), "computed_at": computed_at}
+
+async def _health_monitor_loop():
+    while True:
+        try:
+            await asyncio.to_thread(refresh_health_reports)
+        except Exception as e:
+            print(f"[HEALTH] Background health refresh failed: {str(e)}")
+        await asyncio.sleep(HEALTH_REFRESH_INTERVAL)
+
+def ensure_health_monitor():
+    """Start the background health refresher if it is not already running"""
+    global _health_task
+    if _health_task is None or _health_task.done():
+        _health_task = asyncio.get_running_loop().create_task(_health_monitor_loop())
+
+async def stop_health_monitor():
+    global _health_task
+    if _health_task is not None:
+        _health_task.cancel()
+        try:
+            await _health_task
+        except asyncio.CancelledError:
+            pass
+        _health_task = None
+
+def _cache_age(computed_at: float) -> Dict[str, Any]:
+    return {
+        "computed_at": datetime.fromtimestamp(computed_at).isoformat(),
+        "age_seconds": round(time.time() - computed_at, 3),
+        "refresh_interval_seconds": HEALTH_REFRESH_INTERVAL
+    }
+
+# ===================================================================
 # UTILITY FUNCTIONS
 # ===================================================================
 
@@ -422,6 +517,10 @@ def ensure_project_structure(project_path: str, project_name: str) -> Dict[str,
                 "INSERT OR REPLACE INTO project_info (key, value) VALUES (?, ?)",
                 ("created", datetime.now().isoformat())
             )
+            conn.execute(
+                "INSERT OR REPLACE INTO project_info (key, value) VALUES (?, ?)",
+                ("schema_version", str(PROJECT_SCHEMA_VERSION))
+            )
             
             conn.commit()
             conn.close()
@@ -491,6 +590,100 @@ def ensure_project_structure(project_path: str, project_name: str) -> Dict[str,
             "repaired_items": repaired_items
         }
 
+def read_schema_version(db_path: str) -> int:
+    """Read the schema version stamped in project_info without modifying the database"""
+    if not os.path.exists(db_path):
+        return 0
+    try:
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        try:
+            row = conn.execute("SELECT value FROM project_info WHERE key = 'schema_version'").fetchone()
+        finally:
+            conn.close()
+        return int(row[0]) if row else 0
+    except (sqlite3.Error, ValueError):
+        return 0
+
+def stamp_schema_version(db_path: str):
+    """Record that the project structure satisfies the current schema version"""
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS project_info (
+                key TEXT PRIMARY KEY,
+                value TEXT,
+                updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+        """)
+        conn.execute(
+            "INSERT OR REPLACE INTO project_info (key, value) VALUES (?, ?)",
+            ("schema_version", str(PROJECT_SCHEMA_VERSION))
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+def ensure_project_structure_once(project_path: str, project_name: str, force: bool = False) -> Dict[str, Any]:
+    """Run the structural check at most once per schema version per process.
+
+    Projects already stamped with the current schema version are only probed
+    read-only; everything else goes through ensure_project_structure once and
+    is stamped so later processes can skip the repair as well. Memoized calls
+    report nothing created or repaired, since that happened on an earlier call.
+    """
+    cached = _structure_checks.get(project_path)
+    if not force and cached and cached["schema_version"] == PROJECT_SCHEMA_VERSION:
+        return {"status": "success", "created_items": [], "repaired_items": [], "cached": True}
+    
+    db_path = os.path.join(project_path, "project.db")
+    structure_complete = (
+        os.path.exists(db_path)
+        and os.path.isdir(os.path.join(project_path, "lightrag"))
+        and os.path.exists(os.path.join(project_path, "metadata.json"))
+    )
+    
+    if not force and structure_complete and read_schema_version(db_path) >= PROJECT_SCHEMA_VERSION:
+        result = {"status": "success", "created_items": [], "repaired_items": []}
+    else:
+        print(f"[PROJECT] Checking and repairing project structure: {project_name} (schema v{PROJECT_SCHEMA_VERSION})")
+        result = ensure_project_structure(project_path, project_name)
+        if result["status"] == "success":
+            try:
+                stamp_schema_version(db_path)
+            except sqlite3.Error as e:
+                print(f"[WARNING] Failed to stamp schema version for '{project_name}': {str(e)}")
+    
+    if result["status"] == "success":
+        _structure_checks[project_path] = {"schema_version": PROJECT_SCHEMA_VERSION}
+    return result
+
+def invalidate_project_cache(project_path: str):
+    """Forget memoized structure checks and cached responses for a project"""
+    _structure_checks.pop(project_path, None)
+    _project_responses.pop(project_path, None)
+
+def compute_project_etag(project_path: str) -> str:
+    """Build a weak ETag from the files that feed GET /projects/{name}"""
+    parts = [f"schema={PROJECT_SCHEMA_VERSION}"]
+    for relative in ("project.db", "project.db-wal", "metadata.json", "lightrag"):
+        try:
+            st = os.stat(os.path.join(project_path, relative))
+            parts.append(f"{relative}:{st.st_mtime_ns}:{st.st_size}")
+        except OSError:
+            parts.append(f"{relative}:missing")
+    digest = hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()
+    return f'W/"{digest}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header against an ETag (weak comparison)"""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    bare = etag[2:] if etag.startswith("W/") else etag
+    return "*" in candidates or any(
+        (tag[2:] if tag.startswith("W/") else tag) == bare for tag in candidates
+    )
+
 def get_project_stats(project_path: str) -> Dict[str, Any]:
     """Get comprehensive project statistics"""
     stats = {
@@ -636,7 +829,7 @@ async def create_project(body: dict) -> Dict[str, Any]:
     
     try:
         # Create project structure
-        structure_result = ensure_project_structure(project_path, sanitized_name)
+        structure_result = ensure_project_structure_once(project_path, sanitized_name, force=True)
         
         if structure_result["status"] == "error":
             # Cleanup on failure
@@ -682,8 +875,8 @@ async def create_project(body: dict) -> Dict[str, Any]:
         raise HTTPException(status_code=500, detail=f"Failed to create project: {str(e)}")
 
 @router.get("/projects/{name}")
-async def get_project(name: str) -> Dict[str, Any]:
-    """Get project details with auto-repair functionality"""
+async def get_project(name: str, request: Request, response: Response) -> Dict[str, Any]:
+    """Get project details (structure check memoized per schema version, ETag-cacheable)"""
     # Validate project name
     sanitized_name = validate_project_name(name)
     project_path = get_project_path(sanitized_name)
@@ -692,9 +885,18 @@ async def get_project(name: str) -> Dict[str, Any]:
         raise HTTPException(status_code=404, detail="Project not found")
     
     try:
-        # Auto-repair project structure
-        print(f"[PROJECT] Checking and repairing project structure: {sanitized_name}")
-        repair_result = ensure_project_structure(project_path, sanitized_name)
+        # Structural check runs once per schema version; afterwards this is a pure read
+        repair_result = ensure_project_structure_once(project_path, sanitized_name)
+        
+        etag = compute_project_etag(project_path)
+        cache_headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=cache_headers)
+        response.headers.update(cache_headers)
+        
+        cached = _project_responses.get(project_path)
+        if cached and cached["etag"] == etag:
+            return {**cached["body"], "original_name": name, "repair_info": repair_result}
         
         # Get project paths
         db_path = os.path.join(project_path, "project.db")
@@ -740,7 +942,7 @@ async def get_project(name: str) -> Dict[str, Any]:
             except sqlite3.Error as e:
                 print(f"[WARNING] Database error getting table names: {str(e)}")
         
-        response = {
+        project_response = {
             "name": sanitized_name,
             "original_name": name,
             "sql_exists": os.path.exists(db_path),
@@ -762,7 +964,12 @@ async def get_project(name: str) -> Dict[str, Any]:
             if repair_result["repaired_items"]:
                 print(f"[PROJECT] Repaired: {', '.join(repair_result['repaired_items'])}")
         
-        return response
+        # The repair report belongs to this call only; cached replays carry their own
+        _project_responses[project_path] = {
+            "etag": etag,
+            "body": {key: value for key, value in project_response.items() if key != "repair_info"},
+        }
+        return project_response
         
     except HTTPException:
         raise
@@ -785,6 +992,8 @@ async def delete_project(name: str) -> Dict[str, Any]:
         
         # Remove project directory
         shutil.rmtree(project_path)
+        invalidate_project_cache(project_path)
+        _health_cache["projects"].pop(sanitized_name, None)
         
         print(f"[PROJECT] Deleted project '{sanitized_name}' (had {stats['table_count']} tables, {stats['bucket_count']} buckets)")
         
@@ -1,6 +1,7 @@
 # backend/api/writing/logic.py - COMPLETE REWRITE WITH PERPLEXITY SUPPORT
 
 import os
+import time
 import sqlite3
 import json
 import httpx
@@ -8,32 +9,98 @@ from datetime import datetime
 from typing import List, Dict, Any, Optional
 import traceback
 
-from lightrag import QueryParam
 from backend.core.lightrag_singleton import get_lightrag
+from backend.core.llm_resilience import call_provider, CircuitOpenError, PROVIDER_TIMEOUT
+from backend.core.llm_hedging import hedged_completion, openai_attempt, HEDGE_MODE, HEDGE_MODES
+from backend.core.completion_cache import cached_completion, CACHE_MODES
+from backend.core.singleflight import coalesce, flight_key
+from backend.core.request_context import check_deadline
+from backend.core.lightrag_interface import query_bucket, retrieve_context, get_bucket_summary
+from backend.core.context_packer import pack_contexts
 from backend.api.project_versions import save_version_to_db
 
 PROJECTS_DIR = "projects"
 
+# "context": bucket retrieval returns raw entities/relationships/excerpts for the prompt
+# (no answer synthesis); "answer": LightRAG writes a prose answer per bucket first
+RETRIEVAL_MODE = os.getenv("WRITING_RETRIEVAL", "context").lower()
+RETRIEVAL_MODES = ("context", "answer")
+# Seconds bucket querying may take per generation when the request sets no latency_budget (0: no limit)
+QUERY_LATENCY_BUDGET = float(os.getenv("QUERY_LATENCY_BUDGET", "0"))
+# Results generate_written_output reports (with status "success") when no content was generated
+FAILED_RESULT_PREFIXES = ("Content generation failed", "Content generation completed but no content", "Error")
+
 # ===================================================================
 # PERPLEXITY INTEGRATION
 # ===================================================================
 
+PERPLEXITY_URL = "https://api.perplexity.ai/chat/completions"
+PERPLEXITY_MODEL = "llama-3.1-sonar-large-128k-online"
+PERPLEXITY_DEFAULTS = {"max_tokens": 2000, "temperature": 0.1, "top_p": 0.9}
+OPENAI_MODEL = "gpt-4o-mini"
+
+def _perplexity_attempt(payload: Dict[str, Any], api_key: str):
+    """Hedging attempt: stream a Perplexity completion, reporting the first token"""
+    async def attempt(on_first_token):
+        async def stream():
+            parts = []
+            async with httpx.AsyncClient(timeout=PROVIDER_TIMEOUT) as client:
+                async with client.stream(
+                    "POST",
+                    PERPLEXITY_URL,
+                    json={**payload, "stream": True},
+                    headers={"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
+                ) as response:
+                    response.raise_for_status()
+                    async for line in response.aiter_lines():
+                        if not line.startswith("data:"):
+                            continue
+                        data = line[len("data:"):].strip()
+                        if data == "[DONE]":
+                            break
+                        delta = json.loads(data)["choices"][0].get("delta", {}).get("content")
+                        if delta:
+                            if not parts:
+                                on_first_token()
+                            parts.append(delta)
+            return "".join(parts)
+        return await call_provider("perplexity", stream)
+    return attempt
+
 async def perplexity_model_complete(
     prompt: str,
-    model: str = "llama-3.1-sonar-large-128k-online",
+    model: str = PERPLEXITY_MODEL,
+    answered: dict = None,
     **kwargs
 ) -> str:
     """
-    Perplexity API completion function with fallback to OpenAI
+    Perplexity API completion function with fallback to OpenAI.
+
+    hedge="same"|"fallback" (default LLM_HEDGE) streams the completion and fires a
+    second request if no first token arrives within the provider's hedge deadline.
+    Pass a dict as answered to have its "provider" set to the provider whose text
+    is returned (None for a failure message).
     """
+    answered = answered if answered is not None else {}
     api_key = os.getenv("PERPLEXITY_API_KEY")
     use_perplexity = os.getenv("USE_PERPLEXITY", "false").lower() == "true"
+    hedge = (kwargs.get("hedge") or HEDGE_MODE).lower()
+    if hedge not in HEDGE_MODES:
+        print(f"[WARNING] Unknown hedge mode '{hedge}', hedging disabled")
+        hedge = "off"
     
     if not use_perplexity or not api_key:
         print("[WRITING] Using OpenAI (Perplexity not configured)")
+        if hedge != "off":
+            # Only one provider available, so hedge to itself
+            outcome = await hedged_completion("openai", openai_attempt(prompt), "openai", openai_attempt(prompt))
+            answered["provider"] = outcome["provider"]
+            return outcome["text"]
         # Fallback to existing LightRAG/OpenAI
         lightrag = get_lightrag()
-        return await lightrag.llm_model_func(prompt)
+        text = await lightrag.llm_model_func(prompt)
+        answered["provider"] = "openai"
+        return text
     
     try:
         print(f"[WRITING] Using Perplexity API with model: {model}")
@@ -45,42 +112,89 @@ async def perplexity_model_complete(
         payload = {
             "model": model,
             "messages": messages,
-            "max_tokens": kwargs.get("max_tokens", 2000),
-            "temperature": kwargs.get("temperature", 0.1),
-            "top_p": kwargs.get("top_p", 0.9)
+            "max_tokens": kwargs.get("max_tokens", PERPLEXITY_DEFAULTS["max_tokens"]),
+            "temperature": kwargs.get("temperature", PERPLEXITY_DEFAULTS["temperature"]),
+            "top_p": kwargs.get("top_p", PERPLEXITY_DEFAULTS["top_p"])
         }
         
+        if hedge != "off":
+            if hedge == "same":
+                backup_provider, backup = "perplexity", _perplexity_attempt(payload, api_key)
+            else:
+                backup_provider, backup = "openai", openai_attempt(prompt)
+            outcome = await hedged_completion("perplexity", _perplexity_attempt(payload, api_key), backup_provider, backup)
+            print(f"[WRITING] {outcome['provider']} generation successful ({outcome['winner']}"
+                  f"{', hedged' if outcome['hedged'] else ''}): {len(outcome['text'])} chars")
+            answered["provider"] = outcome["provider"]
+            return outcome["text"]
+        
         headers = {
             "Authorization": f"Bearer {api_key}",
             "Content-Type": "application/json"
         }
         
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.post(
-                "https://api.perplexity.ai/chat/completions",
-                json=payload,
-                headers=headers
-            )
-            response.raise_for_status()
-            
-            result = response.json()
-            content = result["choices"][0]["message"]["content"]
-            
-            print(f"[WRITING] Perplexity generation successful: {len(content)} chars")
-            return content
+        async def post():
+            async with httpx.AsyncClient(timeout=PROVIDER_TIMEOUT) as client:
+                response = await client.post(
+                    PERPLEXITY_URL,
+                    json=payload,
+                    headers=headers
+                )
+                response.raise_for_status()
+                return response
+        
+        # Gateway limits, jittered retries on retryable statuses, circuit breaker
+        response = await call_provider("perplexity", post)
+        
+        result = response.json()
+        content = result["choices"][0]["message"]["content"]
+        
+        print(f"[WRITING] Perplexity generation successful: {len(content)} chars")
+        answered["provider"] = "perplexity"
+        return content
             
     except Exception as e:
-        print(f"[ERROR] Perplexity API failed: {str(e)}")
+        if isinstance(e, CircuitOpenError):
+            # Provider known to be unhealthy: no request was sent
+            print(f"[WRITING] {str(e)}")
+        else:
+            print(f"[ERROR] Perplexity API failed: {str(e)}")
         print("[WRITING] Falling back to OpenAI...")
         
         # Fallback to OpenAI
         try:
             lightrag = get_lightrag()
-            return await lightrag.llm_model_func(prompt)
+            text = await lightrag.llm_model_func(prompt)
+            answered["provider"] = "openai"
+            return text
         except Exception as fallback_error:
             print(f"[ERROR] OpenAI fallback also failed: {str(fallback_error)}")
+            answered["provider"] = None
             return f"Content generation failed: {str(e)}"
 
+def perplexity_enabled() -> bool:
+    return os.getenv("USE_PERPLEXITY", "false").lower() == "true" and os.getenv("PERPLEXITY_API_KEY") is not None
+
+async def cached_model_complete(prompt: str, cache_mode: str = None) -> Dict[str, Any]:
+    """
+    perplexity_model_complete behind the completion cache (see backend/core/completion_cache.py).
+
+    Keyed by the configured provider, so switching USE_PERPLEXITY never serves the
+    other provider's answers. Only text that provider produced is stored: failure
+    messages and answers from the OpenAI fallback (or a fallback hedge) are not.
+    """
+    if perplexity_enabled():
+        provider, model, params = "perplexity", PERPLEXITY_MODEL, PERPLEXITY_DEFAULTS
+    else:
+        provider, model, params = "openai", OPENAI_MODEL, {}
+    answered = {}
+    return await cached_completion(
+        provider, model, params, prompt,
+        lambda: perplexity_model_complete(prompt, answered=answered),
+        mode=cache_mode,
+        cacheable=lambda text: answered.get("provider") == provider
+    )
+
 # ===================================================================
 # UTILITY FUNCTIONS
 # ===================================================================
@@ -218,34 +332,72 @@ async def load_sql_table_data(project_id: str, table_name: str) -> List[Dict[str
 # BUCKET QUERYING (ENHANCED)
 # ===================================================================
 
-async def query_buckets(buckets: List[str], instructions: str, project_id: str = None) -> Dict[str, str]:
-    """Query LightRAG buckets with comprehensive error handling"""
+async def query_buckets(buckets: List[str], instructions: str, project_id: str = None,
+                        retrieval: str = None, latency_budget: float = None,
+                        plans: Optional[Dict[str, Any]] = None) -> Dict[str, str]:
+    """
+    Query LightRAG buckets with comprehensive error handling.
+
+    retrieval="context" (default WRITING_RETRIEVAL) packs the entities, relationships
+    and source excerpts retrieved from each bucket into prompt text; "answer" has
+    LightRAG write a prose answer per bucket first, which costs one more LLM call each.
+
+    Query mode and top_k are chosen per bucket by the query planner. latency_budget
+    (seconds for all buckets) is shared out as the buckets are queried in turn; time a
+    bucket does not use is available to the ones after it. The plan used for each
+    bucket is written to plans when a dict is passed.
+
+    Without instructions, a bucket's precomputed summary (refreshed after each ingest)
+    is used as is when one exists; buckets without one yet are queried as above.
+    """
     if not buckets:
         print("[WRITING] No buckets provided for querying")
         return {}
     
-    print(f"[WRITING] Querying {len(buckets)} buckets: {buckets}")
+    retrieval = (retrieval or RETRIEVAL_MODE).lower()
+    if retrieval not in RETRIEVAL_MODES:
+        print(f"[WARNING] Unknown retrieval mode '{retrieval}', using '{RETRIEVAL_MODE}'")
+        retrieval = RETRIEVAL_MODE
+    
+    print(f"[WRITING] Querying {len(buckets)} buckets ({retrieval} retrieval): {buckets}")
     results = {}
+    contexts = {}
     
-    try:
-        lightrag = get_lightrag()
-        if not lightrag:
-            print("[ERROR] Failed to get LightRAG instance")
-            return {bucket: "[Error: LightRAG not available]" for bucket in buckets}
-        
-    except Exception as e:
-        print(f"[ERROR] Failed to initialize LightRAG: {str(e)}")
-        return {bucket: f"[Error: LightRAG initialization failed - {str(e)}]" for bucket in buckets}
+    budget_left = latency_budget if latency_budget and latency_budget > 0 else None
     
-    for bucket in buckets:
+    for index, bucket in enumerate(buckets):
         if not bucket or not isinstance(bucket, str):
             print(f"[WARNING] Invalid bucket name: {bucket}")
             results[str(bucket)] = "[Error: Invalid bucket name]"
             continue
             
+        # Stops brainstorming, which calls this in its request scope; written output
+        # runs it as shared work, which only stops once all its requests are cancelled
+        check_deadline(f"querying bucket '{bucket}'")
+        bucket_budget = max(budget_left, 0.0) / (len(buckets) - index) if budget_left is not None else None
+        started = time.monotonic()
         try:
             print(f"[WRITING] Querying bucket: {bucket}")
             
+            if not (instructions and instructions.strip()):
+                stored = get_bucket_summary(bucket)
+                if stored and stored["summary"]:
+                    results[bucket] = stored["summary"]
+                    if plans is not None:
+                        plans[bucket] = {"mode": "summary", "documents": stored["documents"],
+                                         "current": stored["current"], "updated": stored["updated"]}
+                    print(f"[WRITING] Using stored summary of '{bucket}': {len(stored['summary'])} chars")
+                    continue
+            
+            if retrieval == "context":
+                query_text = instructions.strip() if instructions and instructions.strip() else \
+                    f"Main topics, people and events in {bucket}"
+                contexts[bucket] = await retrieve_context(bucket, query_text, mode="auto", latency_budget=bucket_budget)
+                results[bucket] = None  # filled in by the packer below, keeps bucket order
+                if plans is not None:
+                    plans[bucket] = contexts[bucket]["plan"]
+                continue
+            
             # Prepare query text
             if instructions and len(instructions.strip()) > 0:
                 query_text = f"{instructions.strip()}\n\nContext from {bucket}:"
@@ -253,8 +405,10 @@ async def query_buckets(buckets: List[str], instructions: str, project_id: str =
                 query_text = f"Summarize content from {bucket} for writing context"
             
             # Query with proper error handling
-            query_param = QueryParam(mode="hybrid", top_k=5)
-            response = await lightrag.aquery(query_text, param=query_param)
+            answer = await query_bucket(bucket, query_text, mode="auto", latency_budget=bucket_budget)
+            response = answer["result"]
+            if plans is not None:
+                plans[bucket] = answer["plan"]
             
             # Validate and process response
             if not response:
@@ -269,6 +423,9 @@ async def query_buckets(buckets: List[str], instructions: str, project_id: str =
                 results[bucket] = response_str
                 print(f"[WRITING] Successfully queried bucket '{bucket}': {len(response_str)} chars")
                 
+        except FileNotFoundError as e:
+            print(f"[ERROR] {str(e)}")
+            results[bucket] = f"[Error: Bucket '{bucket}' not found]"
         except ImportError as e:
             print(f"[ERROR] LightRAG import error for bucket '{bucket}': {str(e)}")
             results[bucket] = f"[Error: LightRAG module issue - {str(e)}]"
@@ -283,6 +440,14 @@ async def query_buckets(buckets: List[str], instructions: str, project_id: str =
             print(f"[ERROR] Exception type: {type(e).__name__}")
             traceback.print_exc()
             results[bucket] = f"[Error accessing {bucket}: {type(e).__name__}]"
+        finally:
+            if budget_left is not None:
+                budget_left -= time.monotonic() - started
+    
+    if contexts:
+        for bucket, packed in pack_contexts(contexts).items():
+            results[bucket] = packed or f"[No content available in {bucket}]"
+            print(f"[WRITING] Packed context from '{bucket}': {len(packed)} chars")
     
     print(f"[WRITING] Bucket querying complete: {len(results)} results")
     return results
@@ -296,9 +461,10 @@ def build_prompt(
     instructions: str, 
     brainstorms: List[str],
     tables: Dict[str, List[Dict[str, Any]]], 
-    buckets: Dict[str, str]
+    buckets: Dict[str, str],
+    max_bucket_chars: Optional[int] = 1000
 ) -> str:
-    """Build comprehensive prompt from all data sources"""
+    """Build comprehensive prompt from all data sources (max_bucket_chars=None keeps packed context whole)"""
     
     print(f"[WRITING] Building prompt with tone='{tone}', {len(brainstorms)} brainstorms, {len(tables)} tables, {len(buckets)} buckets")
     
@@ -350,8 +516,8 @@ def build_prompt(
             if content and len(content.strip()) > 0 and not content.startswith("[Error"):
                 # Truncate very long content
                 display_content = content.strip()
-                if len(display_content) > 1000:
-                    display_content = display_content[:1000] + "... [content truncated]"
+                if max_bucket_chars and len(display_content) > max_bucket_chars:
+                    display_content = display_content[:max_bucket_chars] + "... [content truncated]"
                 prompt_parts.append(f"\nFrom {bucket_name}:\n{display_content}")
     
     # Final instruction
@@ -367,15 +533,59 @@ def build_prompt(
 # MAIN GENERATION FUNCTION (WITH PERPLEXITY SUPPORT)
 # ===================================================================
 
+def written_output_succeeded(output: Dict[str, Any]) -> bool:
+    """Whether a generate_written_output response holds generated content rather than a reported failure"""
+    result = output.get("result") or ""
+    return output.get("status") == "success" and bool(result.strip()) and not result.startswith(FAILED_RESULT_PREFIXES)
+
 async def generate_written_output(
     project_id: str,
     prompt_tone: str,
     custom_instructions: str,
     selected_buckets: List[str],
     selected_tables: List[str],
-    brainstorm_version_ids: List[str]
+    brainstorm_version_ids: List[str],
+    cache_mode: Optional[str] = None,
+    retrieval: Optional[str] = None,
+    latency_budget: Optional[float] = None
+) -> Dict[str, Any]:
+    """
+    Generate written content with Perplexity support and comprehensive error handling.
+
+    cache_mode ("use", "bypass" or "refresh") controls the opt-in completion cache;
+    retrieval ("context" or "answer") how bucket content is gathered and latency_budget
+    (seconds, default QUERY_LATENCY_BUDGET) how long bucket querying may take, see query_buckets.
+    Identical requests arriving while one is running (double-clicks, client retries)
+    share that generation and its saved version instead of starting another.
+    """
+    key = flight_key(
+        project_id,
+        (prompt_tone or "").strip().lower(),
+        (custom_instructions or "").strip(),
+        list(selected_buckets or []),
+        list(selected_tables or []),
+        list(brainstorm_version_ids or []),
+        (cache_mode or "use").lower(),
+        (retrieval or RETRIEVAL_MODE).lower(),
+        latency_budget,
+    )
+    result = await coalesce("generate_written_output", key, lambda: _generate_written_output(
+        project_id, prompt_tone, custom_instructions, selected_buckets,
+        selected_tables, brainstorm_version_ids, cache_mode, retrieval, latency_budget
+    ))
+    return dict(result)
+
+async def _generate_written_output(
+    project_id: str,
+    prompt_tone: str,
+    custom_instructions: str,
+    selected_buckets: List[str],
+    selected_tables: List[str],
+    brainstorm_version_ids: List[str],
+    cache_mode: Optional[str],
+    retrieval: Optional[str],
+    latency_budget: Optional[float]
 ) -> Dict[str, Any]:
-    """Generate written content with Perplexity support and comprehensive error handling"""
     
     # Input validation
     if not project_id or not isinstance(project_id, str):
@@ -387,6 +597,25 @@ async def generate_written_output(
             "status": "error",
             "error": "Invalid project ID"
         }
+    if cache_mode and cache_mode.lower() not in CACHE_MODES:
+        return {
+            "version_id": None,
+            "result": f"Error: Invalid cache mode '{cache_mode}'",
+            "prompt": "",
+            "sources": {},
+            "status": "error",
+            "error": f"cache_mode must be one of {', '.join(CACHE_MODES)}"
+        }
+    if retrieval and retrieval.lower() not in RETRIEVAL_MODES:
+        return {
+            "version_id": None,
+            "result": f"Error: Invalid retrieval mode '{retrieval}'",
+            "prompt": "",
+            "sources": {},
+            "status": "error",
+            "error": f"retrieval must be one of {', '.join(RETRIEVAL_MODES)}"
+        }
+    retrieval = (retrieval or RETRIEVAL_MODE).lower()
     
     print(f"[WRITING] ===== STARTING CONTENT GENERATION =====")
     print(f"[WRITING] Project: {project_id}")
@@ -406,6 +635,7 @@ async def generate_written_output(
         brainstorms = []
         tables = {}
         buckets = {}
+        retrieval_plans = {}
         
         # Load brainstorm results
         print(f"[WRITING] === LOADING BRAINSTORMS ===")
@@ -435,7 +665,11 @@ async def generate_written_output(
         print(f"[WRITING] === QUERYING BUCKETS ===")
         if selected_buckets:
             try:
-                buckets = await query_buckets(selected_buckets, custom_instructions, project_id)
+                buckets = await query_buckets(
+                    selected_buckets, custom_instructions, project_id, retrieval,
+                    latency_budget=latency_budget if latency_budget is not None else QUERY_LATENCY_BUDGET,
+                    plans=retrieval_plans
+                )
                 print(f"[WRITING] Queried {len(buckets)} buckets successfully")
             except Exception as e:
                 print(f"[ERROR] Failed to query buckets: {str(e)}")
@@ -444,7 +678,9 @@ async def generate_written_output(
         # Build comprehensive prompt
         print(f"[WRITING] === BUILDING PROMPT ===")
         try:
-            final_prompt = build_prompt(prompt_tone, custom_instructions, brainstorms, tables, buckets)
+            # Packed context is already sized to CONTEXT_CHAR_BUDGET; prose answers get the old per-bucket cut
+            final_prompt = build_prompt(prompt_tone, custom_instructions, brainstorms, tables, buckets,
+                                        max_bucket_chars=None if retrieval == "context" else 1000)
             print(f"[WRITING] Built prompt: {len(final_prompt)} characters")
         except Exception as e:
             print(f"[ERROR] Failed to build prompt: {str(e)}")
@@ -452,8 +688,10 @@ async def generate_written_output(
         
         # Generate content with Perplexity or OpenAI
         print(f"[WRITING] === GENERATING CONTENT ===")
+        cache_status = None
         try:
-            result = await perplexity_model_complete(final_prompt)
+            outcome = await cached_model_complete(final_prompt, cache_mode)
+            result, cache_status = outcome["text"], outcome["cache"]
             
             if not result or len(result.strip()) < 10:
                 print(f"[WARNING] Generated content is very short: {len(result) if result else 0} chars")
@@ -471,10 +709,7 @@ async def generate_written_output(
         generation_duration = (generation_end_time - generation_start_time).total_seconds()
         
         # Check if Perplexity was used
-        perplexity_used = (
-            os.getenv("USE_PERPLEXITY", "false").lower() == "true" and 
-            os.getenv("PERPLEXITY_API_KEY") is not None
-        )
+        perplexity_used = perplexity_enabled()
         
         metadata = {
             "selectedSources": {
@@ -493,7 +728,10 @@ async def generate_written_output(
                 "duration_seconds": generation_duration,
                 "prompt_length": len(final_prompt),
                 "result_length": len(result) if result else 0,
-                "model_used": "perplexity" if perplexity_used else "openai"
+                "model_used": "perplexity" if perplexity_used else "openai",
+                "cache": cache_status,
+                "retrieval": retrieval,
+                "retrieval_plans": retrieval_plans
             },
             "status": "success" if result and not result.startswith("Error") else "error"
         }
@@ -530,7 +768,9 @@ async def generate_written_output(
             "sources": metadata,
             "status": "success",
             "generation_time": generation_duration,
-            "model_used": "perplexity" if perplexity_used else "openai"
+            "model_used": "perplexity" if perplexity_used else "openai",
+            "cache": cache_status,
+            "retrieval_plans": retrieval_plans
         }
         
     except FileNotFoundError as e:
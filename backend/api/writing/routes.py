@@ -1,7 +1,11 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request, Response
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
-from backend.api.writing.logic import generate_written_output
+from backend.api.writing.logic import generate_written_output, written_output_succeeded
+from backend.core.request_context import run_cancellable, RequestAbandoned
+from backend.core.idempotency import (
+    run_idempotent, request_fingerprint, IdempotencyConflict, IDEMPOTENCY_HEADER, REPLAY_HEADER,
+)
 
 router = APIRouter()
 
@@ -12,19 +16,46 @@ class WriteRequest(BaseModel):
     selected_buckets: List[str] = []
     selected_tables: List[str] = []
     brainstorm_version_ids: List[str] = []
+    cache_mode: Optional[str] = None  # "use" | "bypass" | "refresh" (completion cache)
+    retrieval: Optional[str] = None  # "context" (retrieved passages) | "answer" (LightRAG prose answer)
+    latency_budget: Optional[float] = None  # seconds for bucket querying; picks query mode/top_k per bucket
 
 @router.post("/write")
-async def generate_writing(request: WriteRequest) -> Dict[str, Any]:
-    """Generate AI-powered written content using selected data sources"""
+async def generate_writing(request: WriteRequest, http_request: Request, response: Response) -> Dict[str, Any]:
+    """
+    Generate AI-powered written content using selected data sources.
+
+    Generation is cancelled (and no version saved) if the client disconnects or the
+    request deadline passes; see backend/core/request_context.py. With an
+    Idempotency-Key header, retries get the first successful response instead of a
+    new version, and a disconnect does not cancel the work so the retry can attach to it.
+    """
+    idempotency_key = http_request.headers.get(IDEMPOTENCY_HEADER)
     try:
-        return await generate_written_output(
-            project_id=request.project_id,
-            prompt_tone=request.prompt_tone,
-            custom_instructions=request.custom_instructions,
-            selected_buckets=request.selected_buckets,
-            selected_tables=request.selected_tables,
-            brainstorm_version_ids=request.brainstorm_version_ids
+        result, replayed = await run_idempotent(
+            "write",
+            idempotency_key,
+            request_fingerprint(request.dict()),
+            lambda: run_cancellable(http_request, lambda: generate_written_output(
+                project_id=request.project_id,
+                prompt_tone=request.prompt_tone,
+                custom_instructions=request.custom_instructions,
+                selected_buckets=request.selected_buckets,
+                selected_tables=request.selected_tables,
+                brainstorm_version_ids=request.brainstorm_version_ids,
+                cache_mode=request.cache_mode,
+                retrieval=request.retrieval,
+                latency_budget=request.latency_budget
+            ), label=f"write {request.project_id}", cancel_on_disconnect=not idempotency_key),
+            storable=written_output_succeeded
         )
+        if replayed:
+            response.headers[REPLAY_HEADER] = "true"
+        return result
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except RequestAbandoned as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -0,0 +1,127 @@
+# backend/benchmark_vector_search.py
+"""
+Compare bucket vector storages on synthetic clustered embeddings.
+
+    python -m backend.benchmark_vector_search --rows 100000 --dim 1536 --nprobe 4,8,16,32
+
+Every storage is filled through the same LightRAG storage interface (upsert, then
+index_done_callback), then answers the same queries. Reported per storage: time to
+load and save the vectors, query latency (p50/p95) and recall@k against exact
+nearest neighbours. IvfVectorDBStorage runs once per --nprobe value.
+"""
+
+import time
+import asyncio
+import argparse
+import tempfile
+
+import numpy as np
+from lightrag.utils import EmbeddingFunc
+from lightrag.kg.shared_storage import initialize_share_data
+
+from backend.core.mmap_vector_storage import MmapVectorDBStorage
+from backend.core.ann_vector_storage import IvfVectorDBStorage
+
+UPSERT_BATCH = 5000
+
+
+def _dataset(rows: int, dim: int, clusters: int, queries: int, seed: int = 0):
+    """Normalized points around random cluster centres, and queries perturbed from random points"""
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(clusters, dim)).astype(np.float32)
+    points = centres[rng.integers(clusters, size=rows)] + 0.6 * rng.normal(size=(rows, dim)).astype(np.float32)
+    points /= np.linalg.norm(points, axis=1, keepdims=True)
+    picks = points[rng.integers(rows, size=queries)]
+    probes = picks + 0.3 * rng.normal(size=picks.shape).astype(np.float32) / dim ** 0.5
+    probes /= np.linalg.norm(probes, axis=1, keepdims=True)
+    return points, probes
+
+def _embedding_func(points: np.ndarray, probes: np.ndarray) -> EmbeddingFunc:
+    # Texts are "p<row>" for stored points and "q<i>" for queries
+    async def embed(texts, **kwargs):
+        return np.stack([points[int(t[1:])] if t[0] == "p" else probes[int(t[1:])] for t in texts])
+    return EmbeddingFunc(embedding_dim=points.shape[1], max_token_size=8192, func=embed)
+
+def _storage(cls, working_dir: str, embedding_func: EmbeddingFunc, options: dict):
+    return cls(
+        namespace="chunks",
+        global_config={
+            "working_dir": working_dir,
+            "embedding_batch_num": 64,
+            "vector_db_storage_cls_kwargs": {"cosine_better_than_threshold": -1.0, **options},
+        },
+        embedding_func=embedding_func,
+        meta_fields={"content"},
+    )
+
+async def _fill(storage, rows: int) -> float:
+    started = time.perf_counter()
+    await storage.initialize()
+    for start in range(0, rows, UPSERT_BATCH):
+        await storage.upsert({f"p{i}": {"content": f"p{i}"} for i in range(start, min(start + UPSERT_BATCH, rows))})
+        await storage.index_done_callback()
+    return time.perf_counter() - started
+
+async def _measure(storage, truth: np.ndarray, top_k: int) -> dict:
+    latencies, hits = [], 0
+    for i, expected in enumerate(truth):
+        started = time.perf_counter()
+        results = await storage.query(f"q{i}", top_k=top_k)
+        latencies.append(time.perf_counter() - started)
+        hits += len({int(r["id"][1:]) for r in results} & set(expected.tolist()))
+    latencies = np.array(latencies) * 1000
+    return {
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "recall": hits / truth.size,
+    }
+
+async def run(args):
+    initialize_share_data()
+    points, probes = _dataset(args.rows, args.dim, args.clusters, args.queries)
+    truth = np.argsort(-(probes @ points.T), axis=1)[:, :args.top_k]
+    embedding_func = _embedding_func(points, probes)
+    print(f"{args.rows} vectors x {args.dim} dims, {args.queries} queries, recall@{args.top_k}\n")
+    print(f"{'storage':<46}{'build s':>9}{'p50 ms':>9}{'p95 ms':>9}{'recall':>8}")
+
+    def report(name, build, stats):
+        print(f"{name:<46}{build:>9.2f}{stats['p50_ms']:>9.2f}{stats['p95_ms']:>9.2f}{stats['recall']:>8.3f}")
+
+    for name in args.storages.split(","):
+        with tempfile.TemporaryDirectory() as working_dir:
+            if name == "nano":
+                # LightRAG's default: brute force over vectors held in memory
+                from lightrag.kg.nano_vector_db_impl import NanoVectorDBStorage
+                storage = _storage(NanoVectorDBStorage, working_dir, embedding_func, {})
+                report("NanoVectorDBStorage", await _fill(storage, args.rows), await _measure(storage, truth, args.top_k))
+            elif name == "mmap":
+                for quantization in ("none", "int8"):
+                    with tempfile.TemporaryDirectory() as sub_dir:
+                        storage = _storage(MmapVectorDBStorage, sub_dir, embedding_func, {"quantization": quantization})
+                        build = await _fill(storage, args.rows)
+                        report(f"MmapVectorDBStorage ({quantization})", build, await _measure(storage, truth, args.top_k))
+            elif name == "ivf":
+                storage = _storage(IvfVectorDBStorage, working_dir, embedding_func, {"min_rows": min(args.rows, 4096)})
+                build = await _fill(storage, args.rows)
+                stats = storage.index_stats()
+                for nprobe in [int(n) for n in args.nprobe.split(",")]:
+                    storage.nprobe = nprobe
+                    report(f"IvfVectorDBStorage ({stats['nlist']} lists, nprobe {nprobe})", build,
+                           await _measure(storage, truth, args.top_k))
+            else:
+                raise SystemExit(f"Unknown storage '{name}' (expected nano, mmap or ivf)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=20)
+    parser.add_argument("--nprobe", default="4,8,16,32")
+    parser.add_argument("--storages", default="nano,mmap,ivf")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+# backend/core/ann_vector_storage.py
+
+import os
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Dict
+
+import numpy as np
+from lightrag.kg.shared_storage import set_all_update_flags
+
+from backend.core.mmap_vector_storage import (
+    MmapVectorDBStorage, register_vector_storage, _normalize, _top, _append_rows,
+)
+
+# Below this many live rows a full scan is fast enough and no index is built
+IVF_MIN_ROWS = int(os.getenv("IVF_MIN_ROWS", "4096"))
+# Number of inverted lists (k-means centroids); 0 sizes it from the row count as 4·√rows
+IVF_NLIST = int(os.getenv("IVF_NLIST", "0"))
+# Lists scanned per query: the recall/latency knob (all lists = exact brute force)
+IVF_NPROBE = int(os.getenv("IVF_NPROBE", "16"))
+# Centroids are retrained once the live rows grow past this multiple of the rows they were trained on
+IVF_RETRAIN_GROWTH = float(os.getenv("IVF_RETRAIN_GROWTH", "4"))
+IVF_TRAIN_ITERATIONS = 10
+IVF_TRAIN_SAMPLE_MAX = 65536
+# Rows assigned to centroids per step, bounding the rows x nlist score matrix
+ASSIGN_BLOCK_ROWS = 2048
+
+
+def _nlist_for(rows: int, configured: int) -> int:
+    nlist = configured or int(4 * rows ** 0.5)
+    return max(1, min(nlist, 4096, rows))
+
+def _assign(vectors, centroids: np.ndarray) -> np.ndarray:
+    """Nearest centroid of each row (vectors may be a memmap)"""
+    assignments = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), ASSIGN_BLOCK_ROWS):
+        block = np.asarray(vectors[start:start + ASSIGN_BLOCK_ROWS], dtype=np.float32)
+        assignments[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return assignments
+
+def _train(vectors, live: np.ndarray, nlist: int, seed: int = 0) -> np.ndarray:
+    """Spherical k-means centroids of a sample of the live rows"""
+    rng = np.random.default_rng(seed)
+    rows = np.flatnonzero(live)
+    sample_rows = np.sort(rng.choice(rows, size=min(len(rows), IVF_TRAIN_SAMPLE_MAX), replace=False))
+    sample = np.asarray(vectors[sample_rows], dtype=np.float32)
+    centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+    for _ in range(IVF_TRAIN_ITERATIONS):
+        assignments = _assign(sample, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, sample)
+        counts = np.bincount(assignments, minlength=nlist)
+        # Lists that attracted nothing restart from random points
+        empty = np.flatnonzero(counts == 0)
+        sums[empty] = sample[rng.choice(len(sample), size=len(empty))]
+        centroids = _normalize(sums)
+    return centroids
+
+
+@dataclass
+class IvfVectorDBStorage(MmapVectorDBStorage):
+    """
+    MmapVectorDBStorage with an inverted-file (IVF) index for large buckets.
+
+    Rows are grouped under k-means centroids; a query scores the centroids, scans
+    only the rows of the nprobe closest lists (int8 codes when quantized) and
+    rescores the best candidates exactly. Buckets below min_rows are scanned in
+    full, like MmapVectorDBStorage.
+
+    The index is trained once a bucket reaches min_rows and persisted per
+    generation next to the vectors (vdb_<namespace>.<generation>.ivf.npz holds the
+    centroids, .ivf the list of every row). Rows added later are appended to their
+    nearest list on save; centroids are retrained in a worker thread after the
+    bucket grows IVF_RETRAIN_GROWTH times past what they were trained on.
+
+    vector_db_storage_cls_kwargs may set "nlist", "nprobe" and "min_rows" besides
+    the MmapVectorDBStorage options.
+    """
+
+    _GENERATION_FILES = MmapVectorDBStorage._GENERATION_FILES + ("ivf", "ivf.npz")
+
+    def __post_init__(self):
+        kwargs = self.global_config.get("vector_db_storage_cls_kwargs", {})
+        self.nlist = int(kwargs.get("nlist", IVF_NLIST))
+        self.nprobe = max(1, int(kwargs.get("nprobe", IVF_NPROBE)))
+        self.min_rows = int(kwargs.get("min_rows", IVF_MIN_ROWS))
+        super().__post_init__()
+
+    # ——— Index files ———
+
+    def _reset(self):
+        super()._reset()
+        self._centroids = None
+        self._trained_rows = 0
+        self._assignments = np.zeros(0, dtype=np.int32)
+        self._lists = None  # (rows ordered by list, list offsets, rows covered)
+
+    def _load(self):
+        super()._load()
+        self._load_index()
+
+    def _load_index(self):
+        index_file = self._path("ivf.npz")
+        if not os.path.exists(index_file):
+            return
+        with np.load(index_file) as index:
+            self._centroids = index["centroids"]
+            self._trained_rows = int(index["trained_rows"])
+        assignments_file = self._path("ivf")
+        assignments = np.fromfile(assignments_file, dtype=np.int32) if os.path.exists(assignments_file) else np.zeros(0, dtype=np.int32)
+        self._assignments = assignments[:self._rows]
+        if len(self._assignments) < self._rows:
+            # Saved by a process that stopped before assigning its rows
+            tail = _assign(self._vectors[len(self._assignments):], self._centroids)
+            _append_rows(assignments_file, tail, len(self._assignments) * 4)
+            self._assignments = np.concatenate([self._assignments, tail])
+        self._build_lists()
+
+    def _write_index(self):
+        tmp_path = self._path("ivf.npz") + ".tmp.npz"
+        np.savez(tmp_path, centroids=self._centroids, trained_rows=self._trained_rows)
+        os.replace(tmp_path, self._path("ivf.npz"))
+
+    def _build_lists(self):
+        if self._centroids is None:
+            self._lists = None
+            return
+        order = np.argsort(self._assignments, kind="stable").astype(np.int64)
+        offsets = np.searchsorted(self._assignments[order], np.arange(len(self._centroids) + 1))
+        self._lists = (order, offsets, len(self._assignments))
+
+    # ——— Incremental maintenance ———
+
+    def _on_rows_added(self, vectors: np.ndarray, first_row: int):
+        if self._centroids is None:
+            return
+        assignments = _assign(vectors, self._centroids)
+        _append_rows(self._path("ivf"), assignments, first_row * 4)
+        self._assignments = np.concatenate([self._assignments[:first_row], assignments])
+
+    def _on_compacted(self):
+        # Centroids carry over; rows are reassigned as they are copied into the new generation
+        self._assignments = np.zeros(0, dtype=np.int32)
+        if self._centroids is not None:
+            self._write_index()
+
+    def _save(self):
+        super()._save()
+        self._build_lists()
+
+    def _needs_training(self) -> bool:
+        live = int(self._live.sum())
+        if live < self.min_rows:
+            return False
+        return self._centroids is None or live > IVF_RETRAIN_GROWTH * self._trained_rows
+
+    async def _train_index(self):
+        """Train centroids and assign every stored row in a worker thread, then install them"""
+        vectors, live, rows = self._vectors, self._live.copy(), self._rows
+        nlist = _nlist_for(int(live.sum()), self.nlist)
+        print(f"[VECTOR STORAGE] Training IVF index of {self.namespace}: {nlist} lists over {int(live.sum())} rows")
+
+        def train():
+            centroids = _train(vectors, live, nlist)
+            return centroids, _assign(vectors, centroids)
+
+        centroids, assignments = await asyncio.to_thread(train)
+        if self._vectors is not vectors:
+            # Compacted or reloaded meanwhile; the next save trains again
+            return
+        self._centroids, self._trained_rows = centroids, int(live.sum())
+        _append_rows(self._path("ivf"), assignments, 0)
+        self._assignments = assignments
+        if self._rows > rows:
+            self._on_rows_added(np.asarray(self._vectors[rows:self._rows]), rows)
+        self._write_index()
+        self._build_lists()
+
+    async def initialize(self):
+        await super().initialize()
+        if self._needs_training():
+            async with self._storage_lock:
+                await self._train_index()
+
+    async def index_done_callback(self) -> bool:
+        saved = await super().index_done_callback()
+        if saved and self._needs_training():
+            async with self._storage_lock:
+                await self._train_index()
+            await set_all_update_flags(self.namespace)
+            self.storage_updated.value = False
+        return saved
+
+    # ——— Search ———
+
+    def _snapshot(self) -> dict:
+        snapshot = super()._snapshot()
+        snapshot["ivf"] = (self._centroids, *self._lists) if self._lists is not None else None
+        return snapshot
+
+    def _candidates(self, snapshot: dict, query: np.ndarray, count: int) -> np.ndarray:
+        if snapshot["ivf"] is None:
+            return super()._candidates(snapshot, query, count)
+        centroids, order, offsets, covered = snapshot["ivf"]
+        probed = _top(centroids @ query, min(self.nprobe, len(centroids)))
+        # Rows stored after the lists were built are not in any list yet and are always scanned
+        rows = np.concatenate(
+            [order[offsets[c]:offsets[c + 1]] for c in probed] + [np.arange(covered, len(snapshot["live"]))]
+        )
+        rows = np.sort(rows[snapshot["live"][rows]])
+        return rows[_top(self._score_rows(snapshot, query, rows), count)]
+
+    def index_stats(self) -> Dict[str, Any]:
+        lists = np.diff(self._lists[1]) if self._lists is not None else None
+        return {
+            "namespace": self.namespace,
+            "rows": self._rows,
+            "live_rows": int(self._live.sum()),
+            "indexed": self._centroids is not None,
+            "nlist": len(self._centroids) if self._centroids is not None else 0,
+            "nprobe": self.nprobe,
+            "trained_rows": self._trained_rows,
+            "largest_list": int(lists.max()) if lists is not None and len(lists) else 0,
+        }
+
+
+register_vector_storage("IvfVectorDBStorage", __name__)
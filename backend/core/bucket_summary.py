@@ -0,0 +1,169 @@
+# backend/core/bucket_summary.py
+
+import os
+import json
+import time
+import asyncio
+from typing import Dict, Any, List, Optional, Callable, Awaitable
+
+# Summaries are (re)computed in the background after every ingest or delete
+SUMMARY_ENABLED = os.getenv("BUCKET_SUMMARIES", "on").lower() in ("on", "1", "true", "yes")
+# Stored next to LightRAG's files so it is deleted together with the bucket
+SUMMARY_FILE = "bucket_summary.json"
+# Characters of a document read for its own summary (start and end of longer documents)
+SUMMARY_DOC_CHARS = int(os.getenv("BUCKET_SUMMARY_DOC_CHARS", "8000"))
+# Characters of document summaries combined into the bucket summary; the newest documents come first
+SUMMARY_REDUCE_CHARS = int(os.getenv("BUCKET_SUMMARY_REDUCE_CHARS", "24000"))
+# Documents (or an overview) whose summary failed are retried after this long; a stale
+# summary is not refreshed again on read within this long of the last attempt
+SUMMARY_RETRY_SECONDS = float(os.getenv("BUCKET_SUMMARY_RETRY_SECONDS", "300"))
+SUMMARY_DOC_WORDS = 120
+SUMMARY_BUCKET_WORDS = 400
+
+_DOC_PROMPT = """Summarize the document below in at most {words} words for a writer who will
+draw on it later. Name the main topics, people, places, events and claims. Plain prose, no preamble.
+
+Document "{filename}":
+{content}"""
+
+_BUCKET_PROMPT = """The following are summaries of every document in a knowledge collection named
+"{bucket}". Write one overview of the collection in at most {words} words for a writer who will
+draw on it: its main topics, people, events and how they relate. Plain prose, no preamble.
+
+{summaries}"""
+
+
+def _summary_path(bucket_path: str) -> str:
+    return os.path.join(bucket_path, SUMMARY_FILE)
+
+def _document_excerpt(content: str) -> str:
+    content = content.strip()
+    if len(content) <= SUMMARY_DOC_CHARS:
+        return content
+    half = SUMMARY_DOC_CHARS // 2
+    return f"{content[:half]}\n[...]\n{content[-half:]}"
+
+def _save(bucket_path: str, summary: Dict[str, Any]):
+    path = _summary_path(bucket_path)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+    # Readers in other workers never see a half-written file
+    os.replace(tmp_path, path)
+
+async def _summarize_document(complete: Callable[..., Awaitable[str]], filename: str, content: str) -> str:
+    prompt = _DOC_PROMPT.format(words=SUMMARY_DOC_WORDS, filename=filename, content=_document_excerpt(content))
+    return str(await complete(prompt) or "").strip()
+
+async def _summarize_bucket(complete: Callable[..., Awaitable[str]], bucket: str,
+                            documents: List[Dict[str, Any]]) -> str:
+    if not documents:
+        return ""
+    if len(documents) == 1:
+        return documents[0]["summary"]
+    parts, used = [], 0
+    for doc in documents:
+        part = f"- {doc['filename']}: {doc['summary']}"
+        if used + len(part) > SUMMARY_REDUCE_CHARS:
+            break
+        parts.append(part)
+        used += len(part) + 1
+    prompt = _BUCKET_PROMPT.format(bucket=bucket, words=SUMMARY_BUCKET_WORDS, summaries="\n".join(parts))
+    return str(await complete(prompt) or "").strip()
+
+
+# ——— Public API ———
+
+def load_summary(bucket_path: str) -> Optional[Dict[str, Any]]:
+    """The stored summary artifact of a bucket, or None if none was computed yet"""
+    try:
+        with open(_summary_path(bucket_path), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+def summary_is_current(summary: Optional[Dict[str, Any]], doc_ids: List[str]) -> bool:
+    """Whether the artifact accounts for exactly these documents (summarized or recorded as failed)"""
+    return (summary is not None and "error" not in summary
+            and set(summary.get("documents", {})) == set(doc_ids))
+
+def _retry_due(entry: Dict[str, Any], now: float) -> bool:
+    return "error" in entry and now - entry.get("failed", 0) >= SUMMARY_RETRY_SECONDS
+
+async def update_summary(bucket: str, bucket_path: str, processed: List[Dict[str, Any]],
+                         load_contents: Callable[[List[str]], Awaitable[Dict[str, str]]],
+                         complete: Callable[..., Awaitable[str]]) -> Dict[str, Any]:
+    """
+    Bring a bucket's summary artifact in line with its processed documents.
+
+    processed are the bucket's registry rows. Only documents without a stored
+    summary are read (through load_contents) and summarized; summaries of documents
+    no longer in the bucket are dropped. The bucket overview is then rewritten from
+    the per-document summaries, so an update costs one LLM call per new document
+    plus one for the overview, and none when nothing changed.
+
+    A document without stored content, or whose summary fails, is recorded with
+    {"summary": None, "error"} and left out of the overview; a failed overview keeps
+    the previous one and records "error". Either is retried by the first update
+    after SUMMARY_RETRY_SECONDS, so the artifact can be current meanwhile.
+    """
+    now = time.time()
+    previous = load_summary(bucket_path) or {}
+    known = previous.get("documents", {})
+    wanted = {row["doc_id"]: row for row in processed}
+    overview_due = "error" in previous and _retry_due(previous, now)
+    if (previous and set(known) == set(wanted) and not overview_due
+            and not any(_retry_due(entry, now) for entry in known.values())):
+        return previous
+
+    documents = {doc_id: entry for doc_id, entry in known.items()
+                 if doc_id in wanted and not _retry_due(entry, now)}
+    new_ids = [doc_id for doc_id in wanted if doc_id not in documents]
+    contents = await load_contents(new_ids) if new_ids else {}
+    readable = [doc_id for doc_id in new_ids if contents.get(doc_id)]
+    # The LLM gateway bounds how many of these run at once
+    summaries = await asyncio.gather(*(
+        _summarize_document(complete, wanted[doc_id]["filename"], contents[doc_id]) for doc_id in readable
+    ), return_exceptions=True)
+    outcomes = dict(zip(readable, summaries))
+
+    failed = 0
+    for doc_id in new_ids:
+        entry = {"filename": wanted[doc_id]["filename"], "summary": None, "created": wanted[doc_id]["created"]}
+        outcome = outcomes.get(doc_id)
+        if doc_id not in outcomes:
+            entry.update(error="No stored content", failed=now)
+        elif isinstance(outcome, asyncio.CancelledError):
+            raise outcome
+        elif isinstance(outcome, BaseException):
+            entry.update(error=f"{type(outcome).__name__}: {str(outcome)}", failed=now)
+        else:
+            entry["summary"] = outcome
+        failed += "error" in entry
+        documents[doc_id] = entry
+    if failed:
+        print(f"[SUMMARY] {failed} document(s) in {bucket} could not be summarized, retrying after {SUMMARY_RETRY_SECONDS:.0f}s")
+
+    summarized = {doc_id for doc_id, entry in documents.items() if entry["summary"]}
+    previously_summarized = {doc_id for doc_id, entry in known.items() if entry.get("summary")}
+    summary = {"bucket": bucket, "documents": documents, "updated": now}
+    if summarized == previously_summarized and not overview_due and "summary" in previous:
+        # Only failures were recorded: the overview would come out the same
+        summary["summary"] = previous["summary"]
+        if "error" in previous:
+            summary.update(error=previous["error"], failed=previous["failed"])
+    else:
+        ordered = sorted((documents[doc_id] for doc_id in summarized), key=lambda doc: doc["created"], reverse=True)
+        try:
+            summary["summary"] = await _summarize_bucket(complete, bucket, ordered)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"[SUMMARY] Overview of {bucket} failed, keeping the previous one: {type(e).__name__}: {str(e)}")
+            summary.update(summary=previous.get("summary", ""), error=f"{type(e).__name__}: {str(e)}", failed=now)
+
+    if os.path.isdir(bucket_path):
+        _save(bucket_path, summary)
+    print(f"[SUMMARY] {bucket}: {len(new_ids)} new, {len(set(known) - set(wanted))} removed, "
+          f"{len(summarized)} of {len(documents)} documents summarized")
+    return summary
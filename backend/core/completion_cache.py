@@ -0,0 +1,171 @@
+# backend/core/completion_cache.py
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+from typing import Dict, Any, Callable, Awaitable, Optional
+
+# Opt-in: identical prompts are only served from the cache when COMPLETION_CACHE=on
+CACHE_ENABLED = os.getenv("COMPLETION_CACHE", "off").lower() in ("1", "on", "true", "yes")
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+CACHE_DIR = os.getenv("COMPLETION_CACHE_DIR", os.path.join(BASE_DIR, "completion_cache"))
+CACHE_FILE = "completions.db"
+# Least recently used completions are evicted once the stored text exceeds this size
+CACHE_MAX_BYTES = int(os.getenv("COMPLETION_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+# "use" serves a stored completion when there is one, "bypass" neither reads nor
+# writes the cache, "refresh" always calls the provider and overwrites the entry
+CACHE_MODES = ("use", "bypass", "refresh")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS completions (
+    key TEXT PRIMARY KEY,
+    provider TEXT NOT NULL,
+    model TEXT NOT NULL,
+    text TEXT NOT NULL,
+    size_bytes INTEGER NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_completions_last_used ON completions (last_used);
+"""
+
+# In-memory caches
+_ready = False
+_stats = {"hits": 0, "misses": 0, "bypassed": 0, "refreshed": 0, "stored": 0, "evicted": 0}
+
+
+def _connect() -> sqlite3.Connection:
+    global _ready
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    conn = sqlite3.connect(os.path.join(CACHE_DIR, CACHE_FILE), timeout=30)
+    conn.execute("PRAGMA busy_timeout = 30000")
+    if not _ready:
+        conn.execute("PRAGMA journal_mode=WAL")
+        with conn:
+            conn.executescript(_SCHEMA)
+        _ready = True
+    return conn
+
+def _evict(conn: sqlite3.Connection):
+    total = conn.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM completions").fetchone()[0]
+    if total <= CACHE_MAX_BYTES:
+        return
+    doomed = []
+    for key, size in conn.execute("SELECT key, size_bytes FROM completions ORDER BY last_used"):
+        if total <= CACHE_MAX_BYTES:
+            break
+        doomed.append((key,))
+        total -= size
+    conn.executemany("DELETE FROM completions WHERE key = ?", doomed)
+    _stats["evicted"] += len(doomed)
+    print(f"[COMPLETION CACHE] Evicted {len(doomed)} least recently used completions")
+
+
+# ——— Public API ———
+
+def completion_key(provider: str, model: str, params: Dict[str, Any], prompt: str) -> str:
+    """Fingerprint of everything that determines a completion: provider, model, sampling params and prompt"""
+    prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    material = json.dumps(
+        {"provider": provider, "model": model, "params": params or {}, "prompt": prompt_hash},
+        sort_keys=True, default=str
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+def get_completion(key: str) -> Optional[str]:
+    conn = _connect()
+    try:
+        with conn:
+            row = conn.execute("SELECT text FROM completions WHERE key = ?", (key,)).fetchone()
+            if row:
+                conn.execute(
+                    "UPDATE completions SET hits = hits + 1, last_used = ? WHERE key = ?",
+                    (time.time(), key)
+                )
+        return row[0] if row else None
+    finally:
+        conn.close()
+
+def put_completion(key: str, provider: str, model: str, text: str):
+    now = time.time()
+    conn = _connect()
+    try:
+        with conn:
+            conn.execute(
+                """
+                INSERT INTO completions (key, provider, model, text, size_bytes, created, last_used)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET
+                    text = excluded.text,
+                    size_bytes = excluded.size_bytes,
+                    created = excluded.created,
+                    last_used = excluded.last_used
+                """,
+                (key, provider, model, text, len(text.encode("utf-8")), now, now)
+            )
+            _evict(conn)
+        _stats["stored"] += 1
+    finally:
+        conn.close()
+
+async def cached_completion(provider: str, model: str, params: Dict[str, Any], prompt: str,
+                            complete: Callable[[], Awaitable[str]], mode: str = None,
+                            cacheable: Callable[[str], bool] = None) -> Dict[str, Any]:
+    """
+    Return a stored completion for an identical request, or run complete() and store its text.
+
+    mode is one of CACHE_MODES (default "use"); nothing is read or written unless
+    COMPLETION_CACHE is on. cacheable(text) can veto storing a result, e.g. an error message.
+
+    Returns {"text", "cache": "hit"|"miss"|"refresh"|"bypass"|"off"}.
+    """
+    mode = (mode or "use").lower()
+    if mode not in CACHE_MODES:
+        raise ValueError(f"Unknown cache mode '{mode}' (expected one of {CACHE_MODES})")
+    if not CACHE_ENABLED:
+        return {"text": await complete(), "cache": "off"}
+    if mode == "bypass":
+        _stats["bypassed"] += 1
+        return {"text": await complete(), "cache": "bypass"}
+
+    key = completion_key(provider, model, params, prompt)
+    if mode == "use":
+        try:
+            text = get_completion(key)
+        except sqlite3.Error as e:
+            print(f"[COMPLETION CACHE] Lookup failed: {str(e)}")
+            text = None
+        if text is not None:
+            _stats["hits"] += 1
+            print(f"[COMPLETION CACHE] Hit for {provider}/{model} ({len(text)} chars)")
+            return {"text": text, "cache": "hit"}
+        _stats["misses"] += 1
+    else:
+        _stats["refreshed"] += 1
+
+    text = await complete()
+    if text and (cacheable is None or cacheable(text)):
+        try:
+            put_completion(key, provider, model, text)
+        except sqlite3.Error as e:
+            print(f"[COMPLETION CACHE] Store failed: {str(e)}")
+    return {"text": text, "cache": "miss" if mode == "use" else "refresh"}
+
+def completion_cache_stats() -> Dict[str, Any]:
+    stats = {"enabled": CACHE_ENABLED, "max_bytes": CACHE_MAX_BYTES, **_stats}
+    lookups = _stats["hits"] + _stats["misses"]
+    stats["hit_rate"] = round(_stats["hits"] / lookups, 4) if lookups else 0.0
+    if CACHE_ENABLED:
+        conn = _connect()
+        try:
+            entries, size = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM completions"
+            ).fetchone()
+        finally:
+            conn.close()
+        stats.update({"entries": entries, "size_bytes": size})
+    return stats
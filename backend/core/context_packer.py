@@ -0,0 +1,86 @@
+# backend/core/context_packer.py
+
+import os
+from typing import Dict, Any, List, Tuple
+
+# Total characters of retrieved context placed into one generation prompt, shared by all buckets
+CONTEXT_CHAR_BUDGET = int(os.getenv("CONTEXT_CHAR_BUDGET", "12000"))
+# Longest single source excerpt; longer chunks are cut so one chunk cannot fill a bucket's share
+EXCERPT_MAX_CHARS = int(os.getenv("CONTEXT_EXCERPT_MAX_CHARS", "1200"))
+MIN_EXCERPT_CHARS = 200
+
+_SECTION_TITLES = (("entities", "Key entities"), ("relations", "Relationships"), ("chunks", "Source excerpts"))
+
+
+def _clip(text: str, limit: int) -> str:
+    text = " ".join(str(text or "").split())
+    return text if len(text) <= limit else text[:limit].rstrip() + "…"
+
+def _ranked(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return sorted(rows, key=lambda row: (row.get("rank") or 0, row.get("weight") or 0), reverse=True)
+
+def _candidates(context: Dict[str, Any]) -> List[Tuple[str, str]]:
+    """Context items as (section, line), alternating excerpt / relation / entity by rank"""
+    entities = [
+        f"{row.get('entity', '?')} ({str(row.get('type') or 'unknown').lower()}): {_clip(row.get('description'), 400)}"
+        for row in _ranked(context.get("entities") or [])
+    ]
+    relations = [
+        f"{row.get('entity1', '?')} → {row.get('entity2', '?')}: {_clip(row.get('description'), 400)}"
+        for row in _ranked(context.get("relations") or [])
+    ]
+    # LightRAG already orders chunks by relevance
+    chunks = [_clip(row.get("content"), EXCERPT_MAX_CHARS) for row in context.get("chunks") or []]
+
+    queues = [("chunks", chunks), ("relations", relations), ("entities", entities)]
+    items = []
+    while any(lines for _, lines in queues):
+        for section, lines in queues:
+            if lines:
+                items.append((section, lines.pop(0)))
+    return items
+
+def _pack_one(context: Dict[str, Any], budget: int) -> str:
+    if not context.get("entities") and not context.get("relations") and not context.get("chunks"):
+        return _clip(context.get("raw"), budget) if context.get("raw") else ""
+
+    chosen: Dict[str, List[str]] = {section: [] for section, _ in _SECTION_TITLES}
+    used = 0
+    for section, line in _candidates(context):
+        cost = len(line) + 3
+        if used + cost > budget:
+            # An excerpt is still worth a shortened version; a cut-off description is not
+            if section != "chunks" or budget - used < MIN_EXCERPT_CHARS:
+                continue
+            line = _clip(line, budget - used - 4)
+            cost = len(line) + 3
+        chosen[section].append(line)
+        used += cost
+
+    parts = []
+    for section, title in _SECTION_TITLES:
+        if chosen[section]:
+            parts.append(f"{title}:\n" + "\n".join(f"- {line}" for line in chosen[section]))
+    return "\n".join(parts)
+
+
+# ——— Public API ———
+
+def pack_contexts(contexts: Dict[str, Dict[str, Any]], budget_chars: int = None) -> Dict[str, str]:
+    """
+    Render retrieved bucket contexts (see lightrag_interface.retrieve_context) into
+    prompt text within a shared character budget.
+
+    Each bucket gets an equal share of what is left; characters a bucket does not
+    need pass on to the buckets after it. Within a bucket, the highest-ranked
+    excerpts, relationships and entities are taken in turn until its share is used.
+    Buckets with nothing retrieved map to "".
+    """
+    remaining = budget_chars or CONTEXT_CHAR_BUDGET
+    packed = {}
+    names = list(contexts)
+    for index, name in enumerate(names):
+        share = remaining // (len(names) - index)
+        packed[name] = _pack_one(contexts[name], share)
+        remaining -= len(packed[name])
+    return packed
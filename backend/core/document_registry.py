@@ -0,0 +1,216 @@
+# backend/core/document_registry.py
+
+import os
+import json
+import sqlite3
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+# One registry per bucket, stored next to LightRAG's own files so it is
+# deleted together with the bucket and shared by every uvicorn worker.
+REGISTRY_FILE = "doc_registry.db"
+LIGHTRAG_DOC_STATUS_FILE = "kv_store_doc_status.json"
+
+_COLUMNS = [
+    "doc_id", "filename", "content_hash", "size_bytes", "chunk_count",
+    "ingest_seconds", "status", "error", "created", "updated",
+]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    doc_id TEXT PRIMARY KEY,
+    filename TEXT NOT NULL DEFAULT 'unknown',
+    content_hash TEXT,
+    size_bytes INTEGER,
+    chunk_count INTEGER,
+    ingest_seconds REAL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    error TEXT,
+    created TEXT NOT NULL,
+    updated TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_documents_hash ON documents (content_hash);
+CREATE INDEX IF NOT EXISTS idx_documents_filename ON documents (filename);
+CREATE INDEX IF NOT EXISTS idx_documents_status_created ON documents (status, created);
+CREATE INDEX IF NOT EXISTS idx_documents_created ON documents (created);
+"""
+
+# Registry paths whose schema was already ensured by this process
+_ready_paths: set[str] = set()
+
+
+def _connect(bucket_path: str) -> sqlite3.Connection:
+    db_path = os.path.join(bucket_path, REGISTRY_FILE)
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    # Concurrent workers: readers never block the writer, writers wait instead of failing
+    conn.execute("PRAGMA busy_timeout = 30000")
+    if db_path not in _ready_paths:
+        conn.execute("PRAGMA journal_mode=WAL")
+        with conn:
+            conn.executescript(_SCHEMA)
+            _backfill_from_lightrag(conn, bucket_path)
+        _ready_paths.add(db_path)
+    return conn
+
+def _backfill_from_lightrag(conn: sqlite3.Connection, bucket_path: str):
+    """Import documents LightRAG already knows about (buckets ingested before the registry existed)"""
+    if conn.execute("SELECT 1 FROM documents LIMIT 1").fetchone():
+        return
+    status_path = os.path.join(bucket_path, LIGHTRAG_DOC_STATUS_FILE)
+    if not os.path.exists(status_path):
+        return
+    try:
+        with open(status_path, "r", encoding="utf-8") as f:
+            doc_status = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"[REGISTRY] Could not read {status_path} for backfill: {str(e)}")
+        return
+
+    now = datetime.now().isoformat()
+    rows = []
+    for doc_id, info in doc_status.items():
+        if not isinstance(info, dict):
+            continue
+        file_path = info.get("file_path") or "unknown"
+        rows.append((
+            doc_id,
+            "unknown" if file_path == "unknown_source" else file_path,
+            info.get("content_length"),
+            info.get("chunks_count"),
+            info.get("status", "processed"),
+            info.get("error"),
+            info.get("created_at") or now,
+            info.get("updated_at") or now,
+        ))
+    conn.executemany(
+        """
+        INSERT OR IGNORE INTO documents
+            (doc_id, filename, size_bytes, chunk_count, status, error, created, updated)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        rows
+    )
+    if rows:
+        print(f"[REGISTRY] Backfilled {len(rows)} documents from LightRAG doc status in {bucket_path}")
+
+def _row_to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+    return {key: row[key] for key in _COLUMNS}
+
+
+# ——— Public API ———
+
+def register_document(bucket_path: str, doc_id: str, filename: str, content_hash: str,
+                      size_bytes: int, status: str = "processing") -> Dict[str, Any]:
+    """Insert or reset a document row at the start of an ingest"""
+    now = datetime.now().isoformat()
+    conn = _connect(bucket_path)
+    try:
+        with conn:
+            conn.execute(
+                """
+                INSERT INTO documents (doc_id, filename, content_hash, size_bytes, status, created, updated)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(doc_id) DO UPDATE SET
+                    filename = excluded.filename,
+                    content_hash = excluded.content_hash,
+                    size_bytes = excluded.size_bytes,
+                    status = excluded.status,
+                    error = NULL,
+                    updated = excluded.updated
+                """,
+                (doc_id, filename or "unknown", content_hash, size_bytes, status, now, now)
+            )
+            row = conn.execute("SELECT * FROM documents WHERE doc_id = ?", (doc_id,)).fetchone()
+        return _row_to_dict(row)
+    finally:
+        conn.close()
+
+def update_document(bucket_path: str, doc_id: str, **fields) -> None:
+    """Update selected columns (status, chunk_count, ingest_seconds, error, ...)"""
+    unknown = set(fields) - set(_COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown registry columns: {', '.join(sorted(unknown))}")
+    fields["updated"] = datetime.now().isoformat()
+    assignments = ", ".join(f"{name} = ?" for name in fields)
+    conn = _connect(bucket_path)
+    try:
+        with conn:
+            conn.execute(
+                f"UPDATE documents SET {assignments} WHERE doc_id = ?",
+                (*fields.values(), doc_id)
+            )
+    finally:
+        conn.close()
+
+def get_document(bucket_path: str, doc_id: str) -> Optional[Dict[str, Any]]:
+    conn = _connect(bucket_path)
+    try:
+        row = conn.execute("SELECT * FROM documents WHERE doc_id = ?", (doc_id,)).fetchone()
+        return _row_to_dict(row) if row else None
+    finally:
+        conn.close()
+
+def find_by_hash(bucket_path: str, content_hash: str) -> Optional[Dict[str, Any]]:
+    conn = _connect(bucket_path)
+    try:
+        row = conn.execute(
+            "SELECT * FROM documents WHERE content_hash = ? ORDER BY created DESC LIMIT 1",
+            (content_hash,)
+        ).fetchone()
+        return _row_to_dict(row) if row else None
+    finally:
+        conn.close()
+
+def find_by_filename(bucket_path: str, filename: str) -> Optional[Dict[str, Any]]:
+    """Most recent document ingested under this filename"""
+    conn = _connect(bucket_path)
+    try:
+        row = conn.execute(
+            "SELECT * FROM documents WHERE filename = ? ORDER BY created DESC LIMIT 1",
+            (filename,)
+        ).fetchone()
+        return _row_to_dict(row) if row else None
+    finally:
+        conn.close()
+
+def list_documents(bucket_path: str, status: str = None, limit: int = 1000, offset: int = 0) -> List[Dict[str, Any]]:
+    conn = _connect(bucket_path)
+    try:
+        if status:
+            rows = conn.execute(
+                "SELECT * FROM documents WHERE status = ? ORDER BY created DESC LIMIT ? OFFSET ?",
+                (status, limit, offset)
+            ).fetchall()
+        else:
+            rows = conn.execute(
+                "SELECT * FROM documents ORDER BY created DESC LIMIT ? OFFSET ?",
+                (limit, offset)
+            ).fetchall()
+        return [_row_to_dict(row) for row in rows]
+    finally:
+        conn.close()
+
+def document_totals(bucket_path: str) -> Dict[str, int]:
+    """Number of processed documents in a bucket and their chunks"""
+    conn = _connect(bucket_path)
+    try:
+        documents, chunks = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(chunk_count), 0) FROM documents WHERE status = 'processed'"
+        ).fetchone()
+        return {"documents": documents, "chunks": chunks}
+    finally:
+        conn.close()
+
+def remove_document(bucket_path: str, doc_id: str) -> bool:
+    conn = _connect(bucket_path)
+    try:
+        with conn:
+            cursor = conn.execute("DELETE FROM documents WHERE doc_id = ?", (doc_id,))
+        return cursor.rowcount > 0
+    finally:
+        conn.close()
+
+def forget_bucket(bucket_path: str):
+    """Drop the schema memo for a bucket whose directory is being deleted"""
+    _ready_paths.discard(os.path.join(bucket_path, REGISTRY_FILE))
@@ -0,0 +1,190 @@
+# backend/core/embedding_cache.py
+
+import os
+import math
+import time
+import sqlite3
+import asyncio
+import hashlib
+from typing import Dict, Any, List
+
+import numpy as np
+from lightrag.utils import EmbeddingFunc
+
+# Embeddings are a pure function of (model, text), so the cache is on unless EMBEDDING_CACHE=off
+CACHE_ENABLED = os.getenv("EMBEDDING_CACHE", "on").lower() in ("1", "on", "true", "yes")
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+# Shared by every bucket (and every project), so text ingested anywhere is embedded once
+CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", os.path.join(BASE_DIR, "embedding_cache"))
+CACHE_FILE = "embeddings.db"
+# Least recently used vectors are evicted once the cache database exceeds this size
+CACHE_MAX_BYTES = int(os.getenv("EMBEDDING_CACHE_MAX_BYTES", str(2 * 1024 * 1024 * 1024)))
+EVICT_TO = 0.9
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
+# SQLite caps the number of bound parameters per statement
+LOOKUP_BATCH = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    model TEXT NOT NULL,
+    text_hash TEXT NOT NULL,
+    dim INTEGER NOT NULL,
+    vector BLOB NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (model, text_hash)
+);
+CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings (last_used);
+"""
+
+# In-memory caches
+_ready = False
+_stats = {"lookups": 0, "hits": 0, "misses": 0, "embedded_batches": 0, "stored": 0, "evicted": 0}
+
+
+def _connect() -> sqlite3.Connection:
+    global _ready
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    conn = sqlite3.connect(os.path.join(CACHE_DIR, CACHE_FILE), timeout=30)
+    conn.execute("PRAGMA busy_timeout = 30000")
+    if not _ready:
+        conn.execute("PRAGMA journal_mode=WAL")
+        with conn:
+            conn.executescript(_SCHEMA)
+        _ready = True
+    return conn
+
+def _used_bytes(conn: sqlite3.Connection) -> int:
+    """Size of the live pages of the database, without scanning the table"""
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    pages = conn.execute("PRAGMA page_count").fetchone()[0]
+    free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    return (pages - free) * page_size
+
+def _evict(conn: sqlite3.Connection):
+    used = _used_bytes(conn)
+    if used <= CACHE_MAX_BYTES:
+        return
+    # Trim to EVICT_TO of the limit so the next stores do not evict again right away
+    entries = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+    doomed = math.ceil(entries * (used - CACHE_MAX_BYTES * EVICT_TO) / used)
+    conn.execute(
+        """
+        DELETE FROM embeddings WHERE rowid IN (
+            SELECT rowid FROM embeddings ORDER BY last_used LIMIT ?
+        )
+        """,
+        (doomed,)
+    )
+    _stats["evicted"] += doomed
+    print(f"[EMBEDDING CACHE] Evicted {doomed} least recently used embeddings")
+
+
+# ——— Public API ———
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def get_embeddings(model: str, hashes: List[str]) -> Dict[str, np.ndarray]:
+    """Stored vectors for the given text hashes (missing ones are left out)"""
+    found: Dict[str, np.ndarray] = {}
+    conn = _connect()
+    try:
+        with conn:
+            for offset in range(0, len(hashes), LOOKUP_BATCH):
+                batch = hashes[offset:offset + LOOKUP_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                    (model, *batch)
+                ).fetchall()
+                for key, vector in rows:
+                    found[key] = np.frombuffer(vector, dtype=np.float32)
+            if found:
+                conn.executemany(
+                    "UPDATE embeddings SET hits = hits + 1, last_used = ? WHERE model = ? AND text_hash = ?",
+                    [(time.time(), model, key) for key in found]
+                )
+        return found
+    finally:
+        conn.close()
+
+def put_embeddings(model: str, vectors: Dict[str, np.ndarray]):
+    now = time.time()
+    conn = _connect()
+    try:
+        with conn:
+            conn.executemany(
+                """
+                INSERT INTO embeddings (model, text_hash, dim, vector, created, last_used)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(model, text_hash) DO UPDATE SET
+                    vector = excluded.vector,
+                    dim = excluded.dim,
+                    last_used = excluded.last_used
+                """,
+                [
+                    (model, key, len(vector), np.asarray(vector, dtype=np.float32).tobytes(), now, now)
+                    for key, vector in vectors.items()
+                ]
+            )
+            _evict(conn)
+        _stats["stored"] += len(vectors)
+    finally:
+        conn.close()
+
+def cached_embedding_func(embed: EmbeddingFunc, model: str = None) -> EmbeddingFunc:
+    """
+    Wrap an embedding function so texts already embedded with the same model, in any
+    bucket, are served from the cache.
+
+    Each call looks up the whole batch at once and sends only the texts not found
+    (each distinct text once) to embed. Vectors come back in input order as float32.
+    """
+    model = model or EMBEDDING_MODEL
+    if not CACHE_ENABLED:
+        return embed
+
+    async def embed_with_cache(texts: List[str], **kwargs) -> np.ndarray:
+        hashes = [text_hash(text) for text in texts]
+        _stats["lookups"] += len(texts)
+        try:
+            found = await asyncio.to_thread(get_embeddings, model, list(dict.fromkeys(hashes)))
+        except sqlite3.Error as e:
+            print(f"[EMBEDDING CACHE] Lookup failed: {str(e)}")
+            found = {}
+
+        missing: Dict[str, str] = {}
+        for key, text in zip(hashes, texts):
+            if key not in found:
+                missing.setdefault(key, text)
+        _stats["hits"] += len(texts) - sum(1 for key in hashes if key in missing)
+        _stats["misses"] += len(missing)
+
+        if missing:
+            computed = await embed(list(missing.values()), model=model, **kwargs)
+            _stats["embedded_batches"] += 1
+            fresh = {key: np.asarray(vector, dtype=np.float32) for key, vector in zip(missing, computed)}
+            found.update(fresh)
+            try:
+                await asyncio.to_thread(put_embeddings, model, fresh)
+            except sqlite3.Error as e:
+                print(f"[EMBEDDING CACHE] Store failed: {str(e)}")
+
+        return np.vstack([found[key] for key in hashes]) if hashes else np.zeros((0, embed.embedding_dim), dtype=np.float32)
+
+    return EmbeddingFunc(embedding_dim=embed.embedding_dim, max_token_size=embed.max_token_size, func=embed_with_cache)
+
+def embedding_cache_stats() -> Dict[str, Any]:
+    stats = {"enabled": CACHE_ENABLED, "model": EMBEDDING_MODEL, "max_bytes": CACHE_MAX_BYTES, **_stats}
+    stats["hit_rate"] = round(_stats["hits"] / _stats["lookups"], 4) if _stats["lookups"] else 0.0
+    if CACHE_ENABLED:
+        conn = _connect()
+        try:
+            entries = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            size = _used_bytes(conn)
+        finally:
+            conn.close()
+        stats.update({"entries": entries, "size_bytes": size})
+    return stats
@@ -0,0 +1,186 @@
+# backend/core/graph_backend.py
+
+import os
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Dict, Any, List, Optional
+
+class GraphBackend(ABC):
+    """
+    Interface shared by the graph stores that bucket graphs are pushed to.
+
+    nodes:     list of {"id": str, "labels": [str], "props": {...}}
+    relations: list of {"start": str, "end": str, "type": str, "props": {...}}
+
+    Elements written with a bucket remember it; deletes with a bucket only drop
+    that membership and remove the element once no bucket references it.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def write_graph(self, nodes: List[dict], relations: List[dict], bucket: str = None) -> Dict[str, int]:
+        ...
+
+    @abstractmethod
+    def delete_nodes(self, node_ids: List[str], bucket: str = None) -> Dict[str, int]:
+        ...
+
+    @abstractmethod
+    def delete_relations(self, relations: List[dict], bucket: str = None) -> Dict[str, int]:
+        ...
+
+    @abstractmethod
+    def fetch_graph(self, limit: int = 100) -> List[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def neighbors(self, node_id: str, limit: int = 100, rel_type: str = None) -> List[Dict[str, Any]]:
+        """Adjacent nodes in either direction: [{"id", "type", "direction", "props"}]"""
+        ...
+
+    @abstractmethod
+    def degree(self, node_ids: List[str]) -> Dict[str, int]:
+        ...
+
+    # Primitives used by the generic k-hop expansion below
+
+    @abstractmethod
+    def _adjacent_ids(self, node_ids: List[str]) -> Dict[str, set]:
+        ...
+
+    @abstractmethod
+    def _node_records(self, node_ids: List[str]) -> List[dict]:
+        ...
+
+    @abstractmethod
+    def _edges_among(self, node_ids: List[str]) -> List[dict]:
+        ...
+
+    def subgraph(self, node_ids: List[str], hops: int = 1, max_nodes: int = 200) -> Dict[str, Any]:
+        """Breadth-first k-hop neighbourhood of the seed nodes, capped at max_nodes"""
+        seeds = [n for n in dict.fromkeys(node_ids) if n]
+        known = {r["id"] for r in self._node_records(seeds)}
+        selected = [n for n in seeds if n in known][:max_nodes]
+        seen = set(selected)
+        frontier = deque(selected)
+        truncated = False
+
+        for _ in range(max(hops, 0)):
+            if not frontier or len(seen) >= max_nodes:
+                break
+            adjacency = self._adjacent_ids(list(frontier))
+            next_frontier = deque()
+            for node_id in frontier:
+                for other in sorted(adjacency.get(node_id, ())):
+                    if other in seen:
+                        continue
+                    if len(seen) >= max_nodes:
+                        truncated = True
+                        break
+                    seen.add(other)
+                    selected.append(other)
+                    next_frontier.append(other)
+            frontier = next_frontier
+
+        return {
+            "seeds": seeds,
+            "hops": hops,
+            "truncated": truncated,
+            "nodes": self._node_records(selected),
+            "edges": self._edges_among(selected),
+        }
+
+
+class Neo4jGraphBackend(GraphBackend):
+    """Graph backend on a running Neo4j server (see neo4j_interface)"""
+
+    name = "neo4j"
+
+    def __init__(self):
+        # Imported lazily so embedded deployments do not need the neo4j driver
+        from backend.core import neo4j_interface
+        self._neo4j = neo4j_interface
+
+    def write_graph(self, nodes, relations, bucket=None):
+        return self._neo4j.write_graph(nodes, relations, bucket)
+
+    def delete_nodes(self, node_ids, bucket=None):
+        return self._neo4j.delete_nodes(node_ids, bucket)
+
+    def delete_relations(self, relations, bucket=None):
+        return self._neo4j.delete_relations(relations, bucket)
+
+    def fetch_graph(self, limit=100):
+        return self._neo4j.fetch_graph(limit)
+
+    def _run(self, query: str, **params) -> List[dict]:
+        self._neo4j.migrate_base_label(strict=False)
+        with self._neo4j._get_driver().session() as sess:
+            return [dict(record) for record in sess.run(query, **params)]
+
+    def neighbors(self, node_id, limit=100, rel_type=None):
+        entity = self._neo4j._quote(self._neo4j.BASE_LABEL)
+        rel = f":{self._neo4j._quote(rel_type)}" if rel_type else ""
+        return self._run(
+            f"MATCH (a:{entity} {{id: $id}})-[r{rel}]-(b:{entity}) "
+            "RETURN b.id AS id, type(r) AS type, "
+            "CASE WHEN startNode(r) = a THEN 'out' ELSE 'in' END AS direction, "
+            "properties(r) AS props LIMIT $limit",
+            id=node_id, limit=limit
+        )
+
+    def degree(self, node_ids):
+        entity = self._neo4j._quote(self._neo4j.BASE_LABEL)
+        rows = self._run(
+            f"UNWIND $ids AS id MATCH (a:{entity} {{id: id}}) "
+            "RETURN id, COUNT { (a)--() } AS degree",
+            ids=list(node_ids)
+        )
+        return {row["id"]: row["degree"] for row in rows}
+
+    def _adjacent_ids(self, node_ids):
+        entity = self._neo4j._quote(self._neo4j.BASE_LABEL)
+        rows = self._run(
+            f"UNWIND $ids AS id MATCH (a:{entity} {{id: id}})--(b:{entity}) "
+            "RETURN id, collect(DISTINCT b.id) AS others",
+            ids=list(node_ids)
+        )
+        return {row["id"]: set(row["others"]) for row in rows}
+
+    def _node_records(self, node_ids):
+        entity = self._neo4j._quote(self._neo4j.BASE_LABEL)
+        rows = self._run(
+            f"UNWIND $ids AS id MATCH (a:{entity} {{id: id}}) "
+            "RETURN a.id AS id, labels(a) AS labels, properties(a) AS props",
+            ids=list(node_ids)
+        )
+        for row in rows:
+            row["labels"] = [l for l in row["labels"] if l != self._neo4j.BASE_LABEL]
+        return rows
+
+    def _edges_among(self, node_ids):
+        entity = self._neo4j._quote(self._neo4j.BASE_LABEL)
+        return self._run(
+            f"MATCH (a:{entity})-[r]->(b:{entity}) WHERE a.id IN $ids AND b.id IN $ids "
+            "RETURN a.id AS start, b.id AS end, type(r) AS type, properties(r) AS props",
+            ids=list(node_ids)
+        )
+
+
+_backend: Optional[GraphBackend] = None
+
+def get_graph_backend() -> GraphBackend:
+    """Backend selected by GRAPH_BACKEND: 'neo4j' (default) or 'sqlite' (embedded, no server)"""
+    global _backend
+    if _backend is None:
+        choice = os.getenv("GRAPH_BACKEND", "neo4j").lower()
+        if choice == "sqlite":
+            from backend.core.sqlite_graph_store import SQLiteGraphBackend
+            _backend = SQLiteGraphBackend()
+        elif choice == "neo4j":
+            _backend = Neo4jGraphBackend()
+        else:
+            raise ValueError(f"Unknown GRAPH_BACKEND '{choice}' (expected 'neo4j' or 'sqlite')")
+        print(f"[GRAPH] Using {_backend.name} graph backend")
+    return _backend
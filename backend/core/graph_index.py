@@ -0,0 +1,176 @@
+# backend/core/graph_index.py
+
+import time
+import asyncio
+from typing import Dict, Any, List, Optional
+
+from backend.core.lightrag_interface import get_bucket_graph, graph_version, node_record, bucket_lock
+
+RANK_MODES = ("degree", "weight")
+
+
+class BucketGraphIndex:
+    """
+    Read-only adjacency index over one bucket's LightRAG knowledge graph.
+
+    Built once per graph version and kept in memory so neighbourhood queries
+    never walk the networkx graph or touch disk.
+    """
+
+    def __init__(self, bucket: str, graph, version: tuple):
+        self.bucket = bucket
+        self.version = version
+        self.built_at = time.time()
+        self.nodes: Dict[str, dict] = {}
+        self.adjacency: Dict[str, Dict[str, float]] = {}
+        self.edges: Dict[tuple, dict] = {}
+        self._by_lower: Dict[str, str] = {}
+
+        for node_id, data in graph.nodes(data=True):
+            self.nodes[node_id] = dict(data)
+            self.adjacency[node_id] = {}
+            self._by_lower.setdefault(node_id.lower(), node_id)
+
+        for u, v, data in graph.edges(data=True):
+            weight = _as_float(data.get("weight"), 1.0)
+            self.adjacency[u][v] = weight
+            self.adjacency[v][u] = weight
+            self.edges[_edge_key(u, v)] = dict(data)
+
+    def resolve(self, entity: str) -> Optional[str]:
+        """Exact entity id, falling back to a case-insensitive match"""
+        if entity in self.nodes:
+            return entity
+        return self._by_lower.get(entity.lower())
+
+    def degree(self, node_id: str) -> int:
+        return len(self.adjacency.get(node_id, ()))
+
+    def neighborhood(self, entities: List[str], hops: int = 1, max_nodes: int = 50,
+                     rank_by: str = "degree") -> Dict[str, Any]:
+        """
+        Bounded k-hop neighbourhood around the seed entities.
+
+        Expansion is layer by layer; within a layer candidates are ranked by
+        degree or by the strongest edge weight linking them to the previous
+        layer, and the layer is cut once max_nodes is reached.
+        """
+        if rank_by not in RANK_MODES:
+            raise ValueError(f"rank_by must be one of {RANK_MODES}")
+
+        seeds, missing = [], []
+        for entity in entities:
+            node_id = self.resolve(entity)
+            if node_id is None:
+                missing.append(entity)
+            elif node_id not in seeds:
+                seeds.append(node_id)
+
+        selected: Dict[str, Dict[str, Any]] = {}
+        for node_id in seeds[:max_nodes]:
+            selected[node_id] = {"hop": 0, "score": float(self.degree(node_id))}
+        frontier = list(selected)
+        truncated = len(seeds) > max_nodes
+
+        for hop in range(1, max(hops, 0) + 1):
+            if not frontier or len(selected) >= max_nodes:
+                break
+            candidates: Dict[str, float] = {}
+            for node_id in frontier:
+                for other, weight in self.adjacency[node_id].items():
+                    if other in selected:
+                        continue
+                    score = float(self.degree(other)) if rank_by == "degree" else weight
+                    if score > candidates.get(other, float("-inf")):
+                        candidates[other] = score
+
+            ranked = sorted(candidates.items(), key=lambda item: (-item[1], item[0]))
+            room = max_nodes - len(selected)
+            if len(ranked) > room:
+                truncated = True
+            frontier = []
+            for other, score in ranked[:room]:
+                selected[other] = {"hop": hop, "score": score}
+                frontier.append(other)
+
+        nodes = []
+        for node_id, info in selected.items():
+            record = node_record(node_id, self.nodes[node_id])
+            record.update({"hop": info["hop"], "score": info["score"], "degree": self.degree(node_id)})
+            nodes.append(record)
+
+        edges = []
+        for node_id in selected:
+            for other, weight in self.adjacency[node_id].items():
+                if other in selected and node_id < other:
+                    edges.append({
+                        "start": node_id,
+                        "end": other,
+                        "weight": weight,
+                        "props": self.edges[_edge_key(node_id, other)],
+                    })
+        edges.sort(key=lambda e: -e["weight"])
+
+        return {
+            "bucket": self.bucket,
+            "seeds": seeds,
+            "missing": missing,
+            "hops": hops,
+            "rank_by": rank_by,
+            "truncated": truncated,
+            "nodes": nodes,
+            "edges": edges,
+            "index_built_at": self.built_at,
+        }
+
+
+def _edge_key(u: str, v: str) -> tuple:
+    return (u, v) if u <= v else (v, u)
+
+def _as_float(value, default: float) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+# In-memory caches
+_indexes: Dict[str, BucketGraphIndex] = {}
+_builds: Dict[str, asyncio.Task] = {}
+
+async def _build_index(bucket: str) -> BucketGraphIndex:
+    started = time.time()
+    # Ingestion and deletes change the live graph only under the bucket lock, so holding
+    # it lets a worker thread walk the graph while the loop keeps serving requests
+    async with bucket_lock(bucket):
+        version = graph_version(bucket)
+        graph = await get_bucket_graph(bucket)
+        index = await asyncio.to_thread(BucketGraphIndex, bucket, graph, version)
+    _indexes[bucket] = index
+    print(f"[GRAPH INDEX] Built index for '{bucket}': {len(index.nodes)} nodes, "
+          f"{len(index.edges)} edges in {time.time() - started:.3f}s")
+    return index
+
+def _report_failed_build(bucket: str, build: asyncio.Task):
+    if not build.cancelled() and build.exception() is not None:
+        print(f"[GRAPH INDEX] Building index for '{bucket}' failed: {str(build.exception())}")
+
+async def get_graph_index(bucket: str) -> BucketGraphIndex:
+    """
+    Return the bucket's adjacency index. When the graph changed since it was built,
+    a rebuild starts in the background and the previous index is served until it
+    is done; only a bucket without any index waits for the build.
+    """
+    current = _indexes.get(bucket)
+    if current is not None and current.version == graph_version(bucket):
+        return current
+
+    build = _builds.get(bucket)
+    if build is None or build.done():
+        build = asyncio.get_running_loop().create_task(_build_index(bucket))
+        build.add_done_callback(lambda done, bucket=bucket: _report_failed_build(bucket, done))
+        _builds[bucket] = build
+    if current is not None:
+        return current
+    # Shielded so one caller going away does not cancel the build for the others
+    return await asyncio.shield(build)
@@ -0,0 +1,147 @@
+# backend/core/graph_sync.py
+
+import os
+import json
+import time
+import asyncio
+import hashlib
+from typing import Dict, Any
+
+from backend.core.lightrag_interface import (
+    WORKING_DIR, get_bucket_graph, node_record, edge_record,
+)
+from backend.core.graph_backend import get_graph_backend
+
+# Per-bucket, per-backend snapshot of what was last pushed:
+# {"pushed_at": float, "nodes": {id: fingerprint}, "edges": {key: [type, fingerprint]}}
+SYNC_STATE_FILE = "graph_sync_state.{backend}.json"
+_EDGE_KEY_SEP = "\x1f"
+
+_push_locks: dict[str, asyncio.Lock] = {}
+
+def _state_path(bucket: str) -> str:
+    return os.path.join(WORKING_DIR, bucket, SYNC_STATE_FILE.format(backend=get_graph_backend().name))
+
+def _fingerprint(record: dict) -> str:
+    payload = json.dumps(record, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+def _edge_key(u: str, v: str) -> str:
+    # LightRAG graphs are undirected, so the key must not depend on edge orientation
+    a, b = sorted((u, v))
+    return f"{a}{_EDGE_KEY_SEP}{b}"
+
+def load_sync_state(bucket: str) -> Dict[str, Any]:
+    path = _state_path(bucket)
+    if not os.path.exists(path):
+        return {"pushed_at": None, "nodes": {}, "edges": {}}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"[GRAPH SYNC] Unreadable sync state for '{bucket}', treating as never pushed: {str(e)}")
+        return {"pushed_at": None, "nodes": {}, "edges": {}}
+
+def save_sync_state(bucket: str, state: Dict[str, Any]):
+    path = _state_path(bucket)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+async def compute_graph_delta(bucket: str, full: bool = False) -> Dict[str, Any]:
+    """Diff the bucket's current graph against the last pushed snapshot.
+
+    With full=True every current node and relation is marked for upsert; deletes
+    are still computed relative to the snapshot.
+    """
+    graph = await get_bucket_graph(bucket)
+    state = load_sync_state(bucket)
+    old_nodes, old_edges = state.get("nodes", {}), state.get("edges", {})
+
+    new_nodes, new_edges = {}, {}
+    upsert_nodes, upsert_relations = [], []
+
+    for node_id, data in graph.nodes(data=True):
+        record = node_record(node_id, data)
+        fp = _fingerprint(record)
+        new_nodes[node_id] = fp
+        if full or old_nodes.get(node_id) != fp:
+            upsert_nodes.append(record)
+
+    for u, v, data in graph.edges(data=True):
+        # Canonical orientation so re-pushing never MERGEs a reversed duplicate
+        record = edge_record(*sorted((u, v)), data)
+        key = _edge_key(u, v)
+        fp = _fingerprint(record)
+        new_edges[key] = [record["type"], fp]
+        previous = old_edges.get(key)
+        if full or previous is None or previous[1] != fp:
+            upsert_relations.append(record)
+
+    delete_node_ids = [node_id for node_id in old_nodes if node_id not in new_nodes]
+    removed_relations = []
+    for key, (rel_type, _) in old_edges.items():
+        if key not in new_edges or new_edges[key][0] != rel_type:
+            start, end = key.split(_EDGE_KEY_SEP, 1)
+            removed_relations.append({"start": start, "end": end, "type": rel_type})
+
+    return {
+        "upsert_nodes": upsert_nodes,
+        "upsert_relations": upsert_relations,
+        "delete_nodes": delete_node_ids,
+        "delete_relations": removed_relations,
+        "snapshot": {"nodes": new_nodes, "edges": new_edges},
+        "last_pushed_at": state.get("pushed_at"),
+    }
+
+def summarize_delta(bucket: str, delta: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "bucket": bucket,
+        "last_pushed_at": delta["last_pushed_at"],
+        "nodes_upserted": len(delta["upsert_nodes"]),
+        "relations_upserted": len(delta["upsert_relations"]),
+        "nodes_deleted": len(delta["delete_nodes"]),
+        "relations_deleted": len(delta["delete_relations"]),
+        "graph_nodes": len(delta["snapshot"]["nodes"]),
+        "graph_relations": len(delta["snapshot"]["edges"]),
+    }
+
+async def push_bucket_graph(bucket: str, mode: str = "incremental") -> Dict[str, Any]:
+    """
+    Sync one bucket's LightRAG graph to the configured graph backend.
+
+    mode="incremental" sends only nodes/relations added, changed or removed since
+    the last successful push; mode="full" re-sends everything (still applying
+    deletes for elements that disappeared since the last push).
+    """
+    if mode not in ("incremental", "full"):
+        raise ValueError(f"Unknown push mode '{mode}' (expected 'incremental' or 'full')")
+    if not os.path.isdir(os.path.join(WORKING_DIR, bucket)):
+        raise FileNotFoundError(f"Bucket '{bucket}' not found.")
+
+    lock = _push_locks.setdefault(bucket, asyncio.Lock())
+    async with lock:
+        started = time.time()
+        backend = get_graph_backend()
+        delta = await compute_graph_delta(bucket, full=(mode == "full"))
+
+        # Deletes first so a relation re-typed between pushes is removed before being re-merged
+        if delta["delete_relations"]:
+            await asyncio.to_thread(backend.delete_relations, delta["delete_relations"], bucket)
+        if delta["delete_nodes"]:
+            await asyncio.to_thread(backend.delete_nodes, delta["delete_nodes"], bucket)
+        if delta["upsert_nodes"] or delta["upsert_relations"]:
+            await asyncio.to_thread(backend.write_graph, delta["upsert_nodes"], delta["upsert_relations"], bucket)
+
+        # Only advance the snapshot once the backend accepted the whole delta
+        save_sync_state(bucket, {"pushed_at": time.time(), **delta["snapshot"]})
+
+        summary = summarize_delta(bucket, delta)
+        summary["mode"] = mode
+        summary["backend"] = backend.name
+        summary["duration_seconds"] = round(time.time() - started, 3)
+        print(f"[GRAPH SYNC] Pushed '{bucket}' ({mode}): "
+              f"+{summary['nodes_upserted']} nodes, +{summary['relations_upserted']} relations, "
+              f"-{summary['nodes_deleted']} nodes, -{summary['relations_deleted']} relations")
+        return summary
@@ -0,0 +1,209 @@
+# backend/core/idempotency.py
+
+import os
+import json
+import time
+import sqlite3
+import asyncio
+import hashlib
+from typing import Dict, Any, Callable, Awaitable, Tuple
+
+# Responses stored under an Idempotency-Key are replayed for this long
+IDEMPOTENCY_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", str(24 * 3600)))
+# A key still marked in progress after this long belongs to a worker that died; it may be reclaimed
+IDEMPOTENCY_PENDING_TIMEOUT = float(os.getenv("IDEMPOTENCY_PENDING_TIMEOUT", "3600"))
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+IDEMPOTENCY_DIR = os.getenv("IDEMPOTENCY_DIR", os.path.join(BASE_DIR, "idempotency"))
+IDEMPOTENCY_FILE = "keys.db"
+# How often a request waits for a duplicate being executed by another worker process
+POLL_SECONDS = 1.0
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAY_HEADER = "Idempotent-Replayed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    scope TEXT NOT NULL,
+    key TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    status TEXT NOT NULL,
+    response TEXT,
+    created REAL NOT NULL,
+    expires REAL NOT NULL,
+    PRIMARY KEY (scope, key)
+);
+CREATE INDEX IF NOT EXISTS idx_idempotency_expires ON idempotency_keys (expires);
+"""
+
+
+class IdempotencyConflict(Exception):
+    """The key was already used for a different request body"""
+
+
+# In-memory caches
+_ready = False
+_inflight: Dict[Tuple[str, str], Tuple[asyncio.Task, str]] = {}  # (scope, key) -> (task, fingerprint)
+
+
+def _connect() -> sqlite3.Connection:
+    global _ready
+    os.makedirs(IDEMPOTENCY_DIR, exist_ok=True)
+    conn = sqlite3.connect(os.path.join(IDEMPOTENCY_DIR, IDEMPOTENCY_FILE), timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA busy_timeout = 30000")
+    if not _ready:
+        conn.execute("PRAGMA journal_mode=WAL")
+        with conn:
+            conn.executescript(_SCHEMA)
+        _ready = True
+    return conn
+
+def _claim(scope: str, key: str, fingerprint: str) -> Dict[str, Any]:
+    """
+    Try to take ownership of a key.
+
+    Returns {"owner": True} when this request should execute, {"response": ...} for a
+    stored response, or {"pending": True} while another worker process runs it.
+    """
+    now = time.time()
+    conn = _connect()
+    try:
+        with conn:
+            conn.execute("DELETE FROM idempotency_keys WHERE expires < ?", (now,))
+            conn.execute(
+                "DELETE FROM idempotency_keys WHERE status = 'pending' AND created < ?",
+                (now - IDEMPOTENCY_PENDING_TIMEOUT,)
+            )
+            row = conn.execute(
+                "SELECT * FROM idempotency_keys WHERE scope = ? AND key = ?", (scope, key)
+            ).fetchone()
+            if row is None:
+                conn.execute(
+                    """
+                    INSERT INTO idempotency_keys (scope, key, fingerprint, status, created, expires)
+                    VALUES (?, ?, ?, 'pending', ?, ?)
+                    """,
+                    (scope, key, fingerprint, now, now + IDEMPOTENCY_PENDING_TIMEOUT)
+                )
+                return {"owner": True}
+        if row["fingerprint"] != fingerprint:
+            raise IdempotencyConflict(
+                f"{IDEMPOTENCY_HEADER} '{key}' was already used with a different request"
+            )
+        if row["status"] == "done":
+            return {"response": json.loads(row["response"])}
+        return {"pending": True}
+    finally:
+        conn.close()
+
+def _store(scope: str, key: str, response: Any):
+    now = time.time()
+    conn = _connect()
+    try:
+        with conn:
+            conn.execute(
+                """
+                UPDATE idempotency_keys SET status = 'done', response = ?, expires = ?
+                WHERE scope = ? AND key = ?
+                """,
+                (json.dumps(response, default=str), now + IDEMPOTENCY_TTL_SECONDS, scope, key)
+            )
+    finally:
+        conn.close()
+
+def _release(scope: str, key: str):
+    conn = _connect()
+    try:
+        with conn:
+            conn.execute(
+                "DELETE FROM idempotency_keys WHERE scope = ? AND key = ? AND status = 'pending'",
+                (scope, key)
+            )
+    finally:
+        conn.close()
+
+async def _execute(scope: str, key: str, work: Callable[[], Awaitable[Any]],
+                   storable: Callable[[Any], bool]) -> Tuple[Any, bool]:
+    """Run work() for a claimed key; returns (response, stored)"""
+    try:
+        response = await work()
+    except BaseException:
+        # Failed or abandoned: the key is free for a retry
+        _release(scope, key)
+        raise
+    finally:
+        # Cleared before any waiter wakes up, so waiters never see a finished task
+        _inflight.pop((scope, key), None)
+    if not storable(response):
+        # A failure reported in the response: a retry should run the work again
+        print(f"[IDEMPOTENCY] {scope} key {key}: unsuccessful response not stored")
+        _release(scope, key)
+        return response, False
+    try:
+        _store(scope, key, response)
+    except sqlite3.Error as e:
+        print(f"[IDEMPOTENCY] Could not store response for {scope} key {key}: {str(e)}")
+        _release(scope, key)
+        return response, False
+    return response, True
+
+
+# ——— Public API ———
+
+def successful_response(response: Any) -> bool:
+    """Default storable check: a response carrying a status is stored only on success"""
+    return not isinstance(response, dict) or response.get("status", "success") == "success"
+
+def request_fingerprint(payload: Dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+async def run_idempotent(scope: str, key: str, fingerprint: str,
+                         work: Callable[[], Awaitable[Any]],
+                         storable: Callable[[Any], bool] = successful_response) -> Tuple[Any, bool]:
+    """
+    Execute work() at most once per (scope, key) within IDEMPOTENCY_TTL_SECONDS.
+
+    Returns (response, replayed). A duplicate arriving while the original is still
+    running waits for it; if the original fails, the duplicate runs the work itself.
+    Only responses passing storable are stored and replayed; for any other response
+    (or an exception) the key is released so a retry runs the work again. The work
+    is not cancelled when the request that started it goes away, so a retry can
+    attach to it. Without a key, work() simply runs.
+
+    Raises IdempotencyConflict when the key was used for a different request body.
+    """
+    if not key:
+        return await work(), False
+
+    while True:
+        if (scope, key) in _inflight:
+            running, running_fingerprint = _inflight[(scope, key)]
+            if running_fingerprint != fingerprint:
+                raise IdempotencyConflict(f"{IDEMPOTENCY_HEADER} '{key}' was already used with a different request")
+            print(f"[IDEMPOTENCY] {scope} key {key}: waiting for the original request")
+            try:
+                response, stored = await asyncio.shield(running)
+                if stored:
+                    return response, True
+                continue
+            except asyncio.CancelledError:
+                if running.cancelled():
+                    continue
+                raise
+            except Exception:
+                continue
+
+        claim = _claim(scope, key, fingerprint)
+        if "response" in claim:
+            print(f"[IDEMPOTENCY] {scope} key {key}: replaying stored response")
+            return claim["response"], True
+        if claim.get("pending"):
+            # Being executed by another worker process
+            await asyncio.sleep(POLL_SECONDS)
+            continue
+
+        task = asyncio.get_running_loop().create_task(_execute(scope, key, work, storable))
+        _inflight[(scope, key)] = (task, fingerprint)
+        # Keeps running if this request goes away; retrieve its outcome even then
+        task.add_done_callback(lambda done: done.cancelled() or done.exception())
+        response, _ = await asyncio.shield(task)
+        return response, False
@@ -0,0 +1,191 @@
+# backend/core/ingest_queue.py
+
+import os
+import sys
+import time
+import uuid
+import asyncio
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional
+
+from lightrag.utils import compute_mdhash_id, clean_text
+
+from backend.core.lightrag_interface import WORKING_DIR, ingest_text
+from backend.core.document_registry import get_document
+from backend.core.llm_gateway import use_lane
+
+# Background workers pulling from the queue. Ingests into one bucket still run one at
+# a time (bucket lock) and extraction is capped process-wide by the LightRAG pipeline gate.
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))
+# Finished jobs kept for status queries before the oldest are dropped
+JOB_HISTORY = int(os.getenv("INGEST_JOB_HISTORY", "500"))
+# Queued jobs hold their document text until a worker starts them; beyond either
+# limit new documents are refused until the queue drains
+MAX_QUEUED_JOBS = int(os.getenv("INGEST_QUEUE_MAX_JOBS", "200"))
+MAX_QUEUED_BYTES = int(os.getenv("INGEST_QUEUE_MAX_BYTES", str(256 * 1024 * 1024)))
+# Seconds suggested to a client whose document was refused
+QUEUE_FULL_RETRY_AFTER = int(os.getenv("INGEST_QUEUE_RETRY_AFTER", "30"))
+
+
+class IngestQueueFull(Exception):
+    """The queue holds as many jobs or as much document text as it may"""
+
+# In-memory caches
+_queue: Optional[asyncio.Queue] = None
+_workers: List[asyncio.Task] = []
+_jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_active_by_doc: Dict[tuple, str] = {}  # (bucket, doc_id) -> job_id of a queued/running job
+_queued_bytes = 0  # memory held by the text of queued jobs
+
+
+def _public(job: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: value for key, value in job.items() if not key.startswith("_")}
+
+def _prune_history():
+    finished = [job_id for job_id, job in _jobs.items() if job["status"] in ("done", "failed")]
+    for job_id in finished[:max(len(finished) - JOB_HISTORY, 0)]:
+        _jobs.pop(job_id, None)
+
+def _take_content(job: Dict[str, Any]) -> str:
+    global _queued_bytes
+    content = job.pop("_content")
+    _queued_bytes -= sys.getsizeof(content)
+    return content
+
+async def _worker(worker_id: int):
+    while True:
+        job_id = await _queue.get()
+        job = _jobs.get(job_id)
+        try:
+            if job is None:
+                continue
+            active_key = (job["bucket"], job["doc_id"])
+            job["status"] = "running"
+            job["started"] = time.time()
+            print(f"[INGEST QUEUE] Worker {worker_id} started job {job_id} ({job['bucket']}/{job['filename']})")
+            try:
+                with use_lane("batch"):
+                    result = await ingest_text(job["bucket"], _take_content(job), job["filename"], progress=job["progress"])
+                job["result"] = result
+                job["doc_id"] = result.get("doc_id", job["doc_id"])
+                job["status"] = "failed" if result.get("status") == "failed" else "done"
+            except Exception as e:
+                print(f"[INGEST QUEUE] Job {job_id} failed: {type(e).__name__}: {str(e)}")
+                job["status"] = "failed"
+                job["error"] = str(e)
+            job["finished"] = time.time()
+            job["duration_seconds"] = round(job["finished"] - job["started"], 3)
+            _active_by_doc.pop(active_key, None)
+            print(f"[INGEST QUEUE] Job {job_id} {job['status']} in {job['duration_seconds']}s")
+            _prune_history()
+        finally:
+            _queue.task_done()
+
+def ensure_workers():
+    """Start the queue and its workers on the running loop if they are not already running"""
+    global _queue
+    if _queue is None:
+        _queue = asyncio.Queue()
+    alive = [task for task in _workers if not task.done()]
+    loop = asyncio.get_running_loop()
+    for worker_id in range(len(alive), INGEST_WORKERS):
+        alive.append(loop.create_task(_worker(worker_id)))
+    _workers[:] = alive
+
+async def stop_workers():
+    for task in _workers:
+        task.cancel()
+    for task in _workers:
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+    _workers.clear()
+
+
+# ——— Public API ———
+
+def check_capacity(size: int = 0):
+    """Raise IngestQueueFull unless a document of about size bytes can be queued now"""
+    depth = _queue.qsize() if _queue is not None else 0
+    if depth >= MAX_QUEUED_JOBS:
+        raise IngestQueueFull(f"Ingest queue is full ({depth} jobs waiting)")
+    # A document larger than the whole budget is still accepted into an empty queue
+    if _queued_bytes and _queued_bytes + size > MAX_QUEUED_BYTES:
+        raise IngestQueueFull(f"Ingest queue is full ({_queued_bytes} bytes of documents waiting)")
+
+def enqueue_document(bucket: str, content: str, filename: str = "unknown") -> Dict[str, Any]:
+    """
+    Accept a document for background ingestion and return its job record.
+
+    A document already queued or running in the same bucket is not queued twice;
+    the existing job is returned instead. Raises IngestQueueFull when the queue
+    is at MAX_QUEUED_JOBS or the text would take it past MAX_QUEUED_BYTES.
+    """
+    global _queued_bytes
+    ensure_workers()
+    doc_id = compute_mdhash_id(clean_text(content), prefix="doc-")
+    active = _active_by_doc.get((bucket, doc_id))
+    if active in _jobs:
+        return _public(_jobs[active])
+    size = sys.getsizeof(content)
+    check_capacity(size)
+
+    job_id = uuid.uuid4().hex
+    job = {
+        "job_id": job_id,
+        "bucket": bucket,
+        "doc_id": doc_id,
+        "filename": filename,
+        "status": "queued",
+        "queued": time.time(),
+        "started": None,
+        "finished": None,
+        "progress": {"chunks_processed": 0, "chunks_total": None, "entities_found": 0, "relations_found": 0},
+        "result": None,
+        "error": None,
+        "_content": content,
+    }
+    _jobs[job_id] = job
+    _active_by_doc[(bucket, doc_id)] = job_id
+    _queued_bytes += size
+    _queue.put_nowait(job_id)
+    print(f"[INGEST QUEUE] Queued {bucket}/{filename} as job {job_id} (queue depth {_queue.qsize()})")
+    return _public(job)
+
+def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    job = _jobs.get(job_id)
+    return _public(job) if job else None
+
+def list_jobs(bucket: str = None, status: str = None) -> List[Dict[str, Any]]:
+    return [
+        _public(job) for job in reversed(_jobs.values())
+        if (bucket is None or job["bucket"] == bucket) and (status is None or job["status"] == status)
+    ]
+
+def document_progress(bucket: str, doc_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Ingestion state of one document: its most recent job in this process if any,
+    otherwise the persistent registry row (e.g. ingested by another worker).
+    """
+    for job in reversed(_jobs.values()):
+        if job["bucket"] == bucket and job["doc_id"] == doc_id:
+            return {"source": "queue", **_public(job)}
+    bucket_path = os.path.join(WORKING_DIR, bucket)
+    if not os.path.isdir(bucket_path):
+        return None
+    document = get_document(bucket_path, doc_id)
+    return {"source": "registry", **document} if document else None
+
+def queue_stats() -> Dict[str, Any]:
+    counts: Dict[str, int] = {}
+    for job in _jobs.values():
+        counts[job["status"]] = counts.get(job["status"], 0) + 1
+    return {
+        "workers": len([task for task in _workers if not task.done()]),
+        "queue_depth": _queue.qsize() if _queue is not None else 0,
+        "queued_bytes": _queued_bytes,
+        "max_jobs": MAX_QUEUED_JOBS,
+        "max_bytes": MAX_QUEUED_BYTES,
+        "jobs": counts,
+    }
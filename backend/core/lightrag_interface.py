@@ -1,13 +1,36 @@
 # backend/core/lightrag_interface.py
 
 import os
+import re
+import json
+import time
 import shutil
+import hashlib
 import asyncio
+import itertools
+from collections import OrderedDict, deque
+from xml.sax.saxutils import escape as xml_escape, quoteattr
 
+import networkx as nx
 from lightrag import LightRAG, QueryParam
 from lightrag.llm.openai import openai_embed, gpt_4o_mini_complete
-from lightrag.kg.shared_storage import initialize_pipeline_status  # ✅ Critical import
-from lightrag.utils import setup_logger
+from lightrag.kg.shared_storage import initialize_pipeline_status, get_namespace_data  # ✅ Critical import
+from lightrag.utils import setup_logger, compute_mdhash_id, clean_text
+from lightrag.prompt import PROMPTS
+
+from backend.core.llm_gateway import gated
+from backend.core.embedding_cache import cached_embedding_func
+from backend.core.mmap_vector_storage import resolve_vector_storage
+import backend.core.ann_vector_storage  # registers IvfVectorDBStorage
+from backend.core.singleflight import coalesce, flight_key
+from backend.core.document_registry import (
+    register_document, update_document, get_document, find_by_hash,
+    find_by_filename, list_documents, remove_document, forget_bucket, document_totals,
+)
+from backend.core.query_planner import plan_query, QueryTimer, forget_bucket_latency
+from backend.core.bucket_summary import (
+    SUMMARY_ENABLED, SUMMARY_RETRY_SECONDS, load_summary, summary_is_current, update_summary,
+)
 
 # Initialize LightRAG logging
 setup_logger("lightrag", level="INFO")
@@ -17,10 +40,41 @@ BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 WORKING_DIR = os.path.join(BASE_DIR, "lightrag_working_dir")
 os.makedirs(WORKING_DIR, exist_ok=True)
 
+# Documents per ainsert call for batch ingestion
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "16"))
+# Concurrent LLM calls per LightRAG instance; with one pipeline at a time this is the
+# global cap on extraction calls (queries share the limiter but are served first)
+LLM_CONCURRENCY = int(os.getenv("INGEST_LLM_CONCURRENCY", os.getenv("MAX_ASYNC", "4")))
+# Completions through the LLM gateway: LightRAG-internal calls (entity extraction,
+# description summaries) ride the batch lane, user-facing queries the interactive lane
+_batch_complete = gated("openai", gpt_4o_mini_complete, lane="batch")
+_interactive_complete = gated("openai", gpt_4o_mini_complete, lane="interactive")
+# Shared by every bucket: chunks, entities and queries already embedded anywhere are not sent again
+_embed = cached_embedding_func(openai_embed)
+# Vector storage of every bucket: LightRAG's in-memory NanoVectorDBStorage (default),
+# MmapVectorDBStorage (memory-mapped, int8-quantized; see mmap_vector_storage),
+# IvfVectorDBStorage (the same plus an approximate IVF index; see ann_vector_storage)
+# or the "package.module.ClassName" of another BaseVectorStorage
+VECTOR_STORAGE = resolve_vector_storage(os.getenv("VECTOR_STORAGE", "NanoVectorDBStorage"))
+# Characters of document content echoed to the logs during ingestion (0 disables)
+LOG_PREVIEW_CHARS = int(os.getenv("INGEST_LOG_PREVIEW_CHARS", "200"))
+# Bucket sets whose loaded graphs (and paging cursors) are kept for graph export pages
+EXPORT_CURSORS = int(os.getenv("GRAPH_EXPORT_CURSORS", "8"))
+
 # In-memory caches
 _rag_instances: dict[str, LightRAG] = {}
 _initialized_buckets: set[str] = set()
-_bucket_docs: dict[str, list[str]] = {}
+_graph_versions: dict[str, int] = {}  # bumped whenever this process changes a bucket's graph
+_bucket_locks: dict[str, asyncio.Lock] = {}
+_summary_tasks: dict[str, asyncio.Task] = {}
+_summary_pending: set[str] = set()  # buckets changed while their summary was being refreshed
+_summary_attempts: dict[str, float] = {}  # bucket -> when its last summary refresh started
+_export_cursors: "OrderedDict[tuple, dict]" = OrderedDict()  # bucket set -> graphs, versions, walks
+
+# LightRAG keeps a single pipeline status per process: an ainsert issued while another
+# bucket's pipeline is busy returns immediately and leaves its documents pending.
+# Extraction therefore runs one pipeline at a time, each with LLM_CONCURRENCY calls in flight.
+_pipeline_gate = asyncio.Lock()
 
 async def init_rag():
     """FastAPI startup hook (noop)."""
@@ -35,8 +89,12 @@ def _make_instance(bucket: str) -> LightRAG:
     
     return LightRAG(
         working_dir=bucket_path,
-        embedding_func=openai_embed,
-        llm_model_func=gpt_4o_mini_complete,
+        embedding_func=_embed,
+        vector_storage=VECTOR_STORAGE,
+        llm_model_func=_batch_complete,
+        # Unchanged chunks of a re-uploaded file reuse their cached extraction
+        enable_llm_cache_for_entity_extract=True,
+        llm_model_max_async=LLM_CONCURRENCY,
     )
 
 async def _ensure_initialized(bucket: str) -> LightRAG:
@@ -86,26 +144,190 @@ async def delete_bucket(bucket: str):
         except:
             pass  # Ignore cleanup errors
     
+    summary_task = _summary_tasks.pop(bucket, None)
+    if summary_task:
+        summary_task.cancel()
+    _summary_pending.discard(bucket)
+    _summary_attempts.pop(bucket, None)
+    
     shutil.rmtree(path)
     _rag_instances.pop(bucket, None)
     _initialized_buckets.discard(bucket)
-    _bucket_docs.pop(bucket, None)
+    forget_bucket(path)
+    forget_bucket_latency(bucket)
+    for key in [key for key in _export_cursors if bucket in key]:
+        del _export_cursors[key]
+    bump_graph_version(bucket)
     return {"status": "deleted", "bucket": bucket}
 
-async def ingest_file(bucket: str, file_path: str):
+async def _plan_document(rag: LightRAG, bucket_path: str, content: str, filename: str) -> dict:
+    """
+    Decide what ingesting one document involves.
+
+    Returns {"duplicate": result} for an exact re-upload, otherwise the document
+    id, hashes, the superseded document (same filename, older content) if any,
+    and chunk reuse statistics.
+    """
+    encoded = content.encode("utf-8")
+    content_hash = hashlib.sha256(encoded).hexdigest()
+    
+    # Exact re-upload: nothing to chunk, extract or embed. Only finished documents count:
+    # plans are made under the bucket lock, so a "processing" row seen here is left over
+    # from an ingest that died, and LightRAG resumes it (documents queued or running in
+    # the ingest queue were already deduplicated when they were enqueued).
+    existing = find_by_hash(bucket_path, content_hash)
+    if existing and existing["status"] == "processed":
+        print(f"[LIGHTRAG] ♻️ Duplicate of {existing['doc_id']} ({existing['filename']}), skipping ingestion")
+        return {"duplicate": {
+            "status": "duplicate",
+            "doc_id": existing["doc_id"],
+            "filename": filename,
+            "duplicate_of": existing["filename"],
+            "document_status": existing["status"],
+        }}
+    
+    # Same id LightRAG would derive itself, fixed up front so the registry row and
+    # LightRAG's doc status refer to the same document
+    doc_id = compute_mdhash_id(clean_text(content), prefix="doc-")
+    
+    # A new version of a file already in the bucket replaces the old document
+    previous = find_by_filename(bucket_path, filename) if filename != "unknown" else None
+    if previous and (previous["doc_id"] == doc_id or previous["status"] != "processed"):
+        previous = None
+    chunk_stats = await _chunk_reuse_stats(rag, content)
+    if previous:
+        print(f"[LIGHTRAG] 🔁 New version of {filename}: {chunk_stats['chunks_reused']} of "
+              f"{chunk_stats['chunks_total']} chunks unchanged")
+    
+    return {
+        "doc_id": doc_id,
+        "filename": filename,
+        "content_hash": content_hash,
+        "size_bytes": len(encoded),
+        "previous": previous,
+        "chunk_stats": chunk_stats,
+    }
+
+async def _finish_document(rag: LightRAG, bucket_path: str, plan: dict, started: float) -> dict:
+    """Record LightRAG's outcome for a planned document and retire the version it replaces"""
+    doc_id = plan["doc_id"]
+    
+    # LightRAG records per-document failures in doc status instead of raising
+    status = await rag.doc_status.get_by_id(doc_id) or {}
+    state = str(status.get("status", "processed")).split(".")[-1].lower()
+    update_document(
+        bucket_path, doc_id,
+        status=state,
+        chunk_count=status.get("chunks_count"),
+        ingest_seconds=round(time.time() - started, 3),
+        error=status.get("error"),
+    )
+    print(f"[LIGHTRAG] 📄 {doc_id} status: {state}, chunks: {status.get('chunks_count')}")
+    
+    result = {"status": "success" if state == "processed" else state, "doc_id": doc_id, "filename": plan["filename"]}
+    if status.get("error"):
+        result["error"] = status["error"]
+    result.update(plan["chunk_stats"])
+    
+    # Chunks shared with the new version now belong to it (chunk ids are content
+    # hashes), so deleting the old document only drops what actually changed
+    previous = plan["previous"]
+    if previous and state == "processed":
+        await rag.adelete_by_doc_id(previous["doc_id"])
+        remove_document(bucket_path, previous["doc_id"])
+        result["replaced"] = previous["doc_id"]
+        print(f"[LIGHTRAG] 🗑️ Removed superseded document {previous['doc_id']}")
+    return result
+
+def bucket_lock(bucket: str) -> asyncio.Lock:
+    """Serializes everything that mutates one bucket's LightRAG storage in this process"""
+    return _bucket_locks.setdefault(bucket, asyncio.Lock())
+
+_CHUNK_DONE = re.compile(r"^Chunk (\d+) of (\d+) extracted (\d+) Ent \+ (\d+) Rel")
+
+async def _track_pipeline_progress(doc_id: str, progress: dict, interval: float = 1.0):
+    """
+    Mirror LightRAG's pipeline messages for one document into progress.
+
+    LightRAG only reports extraction progress as status messages, so count the
+    "Chunk i of n extracted ..." lines logged after it started on this document.
+    """
+    status = await get_namespace_data("pipeline_status")
+    marker = f"Processing d-id: {doc_id}"
+    while True:
+        messages = list(status.get("history_messages", []))
+        if marker in messages:
+            chunks = entities = relations = 0
+            for message in messages[messages.index(marker) + 1:]:
+                match = _CHUNK_DONE.match(message)
+                if match:
+                    chunks += 1
+                    progress["chunks_total"] = int(match.group(2))
+                    entities += int(match.group(3))
+                    relations += int(match.group(4))
+            progress.update({"chunks_processed": chunks, "entities_found": entities, "relations_found": relations})
+        await asyncio.sleep(interval)
+
+async def _run_pipeline(rag: LightRAG, contents: list[str], doc_ids: list[str],
+                        file_paths: list[str], progress: dict = None):
+    """rag.ainsert behind the process-wide pipeline gate, optionally reporting progress for a single document"""
+    async with _pipeline_gate:
+        tracker = None
+        if progress is not None and len(doc_ids) == 1:
+            tracker = asyncio.create_task(_track_pipeline_progress(doc_ids[0], progress))
+        try:
+            await rag.ainsert(contents, ids=doc_ids, file_paths=file_paths)
+        finally:
+            if tracker is not None:
+                tracker.cancel()
+                try:
+                    await tracker
+                except asyncio.CancelledError:
+                    pass
+
+def content_preview(content: str, limit: int = None) -> str:
+    """Single-line, length-bounded excerpt of a document for logs"""
+    limit = LOG_PREVIEW_CHARS if limit is None else limit
+    if limit <= 0:
+        return "<preview disabled>"
+    excerpt = " ".join(content[:limit].split())
+    return excerpt + ("..." if len(content) > limit else "")
+
+async def ingest_file(bucket: str, file_path: str, filename: str = None):
+    print(f"[LIGHTRAG] File: {file_path}")
+    with open(file_path, "r", encoding="utf-8") as f:
+        content = f.read()
+    return await ingest_text(bucket, content, filename or os.path.basename(file_path))
+
+async def ingest_text(bucket: str, content: str, filename: str = "unknown", progress: dict = None):
+    """
+    Ingest one document. Ingests into the same bucket run one at a time; pass a
+    dict as progress to have it updated with extraction counts while LightRAG runs.
+    """
+    async with bucket_lock(bucket):
+        result = await _ingest_text(bucket, content, filename, progress)
+    schedule_summary_refresh(bucket)
+    return result
+
+async def _ingest_text(bucket: str, content: str, filename: str, progress: dict = None):
     print(f"[LIGHTRAG] 🚀 Starting document ingestion")
     print(f"[LIGHTRAG] Bucket: {bucket}")
-    print(f"[LIGHTRAG] File: {file_path}")
+    print(f"[LIGHTRAG] Filename: {filename}")
     
     # Ensure LightRAG is properly initialized
     rag = await _ensure_initialized(bucket)
-    
-    # Read file content
-    with open(file_path, "r", encoding="utf-8") as f:
-        content = f.read()
+    bucket_path = os.path.join(WORKING_DIR, bucket)
     
     print(f"[LIGHTRAG] Document length: {len(content)} characters")
-    print(f"[LIGHTRAG] Content preview: {content[:200]}...")
+    print(f"[LIGHTRAG] Content preview: {content_preview(content)}")
+    
+    plan = await _plan_document(rag, bucket_path, content, filename)
+    if "duplicate" in plan:
+        return {"bucket": bucket, **plan["duplicate"]}
+    
+    doc_id = plan["doc_id"]
+    register_document(bucket_path, doc_id, filename, plan["content_hash"], plan["size_bytes"])
+    started = time.time()
     
     try:
         print(f"[LIGHTRAG] 📝 Calling rag.ainsert() - this should trigger full processing pipeline")
@@ -117,39 +339,22 @@ async def ingest_file(bucket: str, file_path: str):
         # 4. Embedding generation
         # 5. Vector storage
         # 6. Knowledge graph construction
-        doc_id = await rag.ainsert(content)
+        await _run_pipeline(rag, [content], [doc_id], [filename], progress)
         
         print(f"[LIGHTRAG] ✅ Document processing completed!")
         print(f"[LIGHTRAG] Document ID: {doc_id}")
         
-        # Verify that processing actually happened
-        print(f"[LIGHTRAG] 🔍 Checking storage state after processing...")
-        
-        # Check entities
-        if hasattr(rag, 'entities_vdb') and rag.entities_vdb:
-            entity_count = len(rag.entities_vdb.data) if hasattr(rag.entities_vdb, 'data') else 0
-            print(f"[LIGHTRAG] 🎯 Entities stored: {entity_count}")
-        
-        # Check relationships  
-        if hasattr(rag, 'relationships_vdb') and rag.relationships_vdb:
-            rel_count = len(rag.relationships_vdb.data) if hasattr(rag.relationships_vdb, 'data') else 0
-            print(f"[LIGHTRAG] 🔗 Relationships stored: {rel_count}")
-            
-        # Check chunks
-        if hasattr(rag, 'chunks_vdb') and rag.chunks_vdb:
-            chunk_count = len(rag.chunks_vdb.data) if hasattr(rag.chunks_vdb, 'data') else 0
-            print(f"[LIGHTRAG] 📄 Chunks stored: {chunk_count}")
-        
-        # fallback if no doc_id was returned
-        if not doc_id:
-            doc_id = f"doc-{hash(content)}"
-            print(f"[LIGHTRAG] Generated fallback doc_id: {doc_id}")
-        
-        _bucket_docs.setdefault(bucket, []).append(doc_id)
-        
-        return {"status": "success", "bucket": bucket, "doc_id": doc_id}
+        result = await _finish_document(rag, bucket_path, plan, started)
+        bump_graph_version(bucket)
+        return {"bucket": bucket, **result}
         
     except Exception as e:
+        update_document(
+            bucket_path, doc_id,
+            status="failed",
+            ingest_seconds=round(time.time() - started, 3),
+            error=str(e),
+        )
         print(f"[LIGHTRAG] ❌ Error during document processing:")
         print(f"[LIGHTRAG] Error type: {type(e).__name__}")
         print(f"[LIGHTRAG] Error message: {str(e)}")
@@ -157,30 +362,241 @@ async def ingest_file(bucket: str, file_path: str):
         traceback.print_exc()
         raise e
 
-async def list_bucket_files(bucket: str):
-    docs = _bucket_docs.get(bucket, [])
-    return [{"doc_id": doc_id, "filename": "unknown"} for doc_id in docs]
+async def ingest_documents(bucket: str, documents: list[tuple[str, str]], batch_size: int = None):
+    """
+    Ingest many (filename, content) documents into one bucket.
+
+    Documents are handed to LightRAG in batches of batch_size per ainsert call;
+    within a batch LightRAG processes up to max_parallel_insert documents
+    concurrently (MAX_PARALLEL_INSERT). Returns one result per input document,
+    in input order; a failing batch marks its documents failed and the
+    remaining batches still run.
+    """
+    async with bucket_lock(bucket):
+        result = await _ingest_documents(bucket, documents, batch_size)
+    schedule_summary_refresh(bucket)
+    return result
+
+async def _ingest_documents(bucket: str, documents: list[tuple[str, str]], batch_size: int = None):
+    batch_size = batch_size or INGEST_BATCH_SIZE
+    print(f"[LIGHTRAG] 🚀 Starting batch ingestion of {len(documents)} documents into {bucket}")
+    
+    rag = await _ensure_initialized(bucket)
+    bucket_path = os.path.join(WORKING_DIR, bucket)
+    
+    results: list[dict] = [None] * len(documents)
+    pending: list[tuple[int, dict, str]] = []  # (input index, plan, content)
+    planned_ids: dict[str, str] = {}  # doc_id -> filename, for duplicates inside the batch
+    
+    for index, (filename, content) in enumerate(documents):
+        plan = await _plan_document(rag, bucket_path, content, filename)
+        if "duplicate" in plan:
+            results[index] = plan["duplicate"]
+        elif plan["doc_id"] in planned_ids:
+            results[index] = {
+                "status": "duplicate",
+                "doc_id": plan["doc_id"],
+                "filename": filename,
+                "duplicate_of": planned_ids[plan["doc_id"]],
+                "document_status": "processing",
+            }
+        else:
+            planned_ids[plan["doc_id"]] = filename
+            pending.append((index, plan, content))
+    
+    for offset in range(0, len(pending), batch_size):
+        batch = pending[offset:offset + batch_size]
+        for _, plan, _ in batch:
+            register_document(bucket_path, plan["doc_id"], plan["filename"], plan["content_hash"], plan["size_bytes"])
+        started = time.time()
+        
+        try:
+            print(f"[LIGHTRAG] 📝 ainsert batch {offset // batch_size + 1}: {len(batch)} documents")
+            await _run_pipeline(
+                rag,
+                [content for _, _, content in batch],
+                [plan["doc_id"] for _, plan, _ in batch],
+                [plan["filename"] for _, plan, _ in batch],
+            )
+        except Exception as e:
+            print(f"[LIGHTRAG] ❌ Batch failed: {type(e).__name__}: {str(e)}")
+            for index, plan, _ in batch:
+                update_document(
+                    bucket_path, plan["doc_id"],
+                    status="failed",
+                    ingest_seconds=round(time.time() - started, 3),
+                    error=str(e),
+                )
+                results[index] = {"status": "failed", "doc_id": plan["doc_id"], "filename": plan["filename"], "error": str(e)}
+            continue
+        
+        for index, plan, _ in batch:
+            results[index] = await _finish_document(rag, bucket_path, plan, started)
+        bump_graph_version(bucket)
+    
+    counts: dict[str, int] = {}
+    for result in results:
+        counts[result["status"]] = counts.get(result["status"], 0) + 1
+    print(f"[LIGHTRAG] ✅ Batch ingestion finished: {counts}")
+    return {"bucket": bucket, "total": len(documents), "counts": counts, "documents": results}
+
+async def _chunk_reuse_stats(rag: LightRAG, content: str) -> dict:
+    """
+    Count how many of the document's chunks are already stored in the bucket.
+
+    Chunk ids are content hashes and entity extraction is served from LightRAG's
+    LLM cache for chunks it has seen before, so only new chunks cost LLM calls.
+    """
+    chunks = await asyncio.to_thread(
+        rag.chunking_func,
+        rag.tokenizer,
+        clean_text(content),
+        None,
+        False,
+        rag.chunk_overlap_token_size,
+        rag.chunk_token_size,
+    )
+    chunk_ids = {compute_mdhash_id(dp["content"], prefix="chunk-") for dp in chunks}
+    new_ids = await rag.text_chunks.filter_keys(chunk_ids)
+    return {
+        "chunks_total": len(chunk_ids),
+        "chunks_new": len(new_ids),
+        "chunks_reused": len(chunk_ids) - len(new_ids),
+    }
+
+async def list_bucket_files(bucket: str, status: str = None, limit: int = 1000, offset: int = 0):
+    bucket_path = os.path.join(WORKING_DIR, bucket)
+    if not os.path.isdir(bucket_path):
+        raise FileNotFoundError(f"Bucket '{bucket}' not found.")
+    return list_documents(bucket_path, status=status, limit=limit, offset=offset)
 
 async def delete_file(bucket: str, doc_id: str):
+    bucket_path = os.path.join(WORKING_DIR, bucket)
+    if not os.path.isdir(bucket_path):
+        raise FileNotFoundError(f"Bucket '{bucket}' not found.")
+    if get_document(bucket_path, doc_id) is None:
+        raise FileNotFoundError(f"Document '{doc_id}' not found in bucket '{bucket}'.")
+    
     rag = await _ensure_initialized(bucket)
-    await rag.delete(doc_id)
-    if bucket in _bucket_docs and doc_id in _bucket_docs[bucket]:
-        _bucket_docs[bucket].remove(doc_id)
+    async with bucket_lock(bucket):
+        await rag.adelete_by_doc_id(doc_id)
+        remove_document(bucket_path, doc_id)
+    bump_graph_version(bucket)
+    schedule_summary_refresh(bucket)
     return {"status": "deleted", "bucket": bucket, "doc_id": doc_id}
 
-async def query_bucket(bucket: str, query: str, user_prompt: str = "", mode: str = "hybrid"):
+# ——— Bucket summaries ———
+
+async def refresh_bucket_summary(bucket: str) -> dict:
+    """Update the bucket's stored summary now (see bucket_summary.update_summary)"""
+    bucket_path = os.path.join(WORKING_DIR, bucket)
+    if not os.path.isdir(bucket_path):
+        raise FileNotFoundError(f"Bucket '{bucket}' not found.")
+    rag = await _ensure_initialized(bucket)
+    processed = list_documents(bucket_path, status="processed", limit=1_000_000)
+    
+    async def load_contents(doc_ids: list[str]) -> dict[str, str]:
+        rows = await rag.full_docs.get_by_ids(doc_ids)
+        return {doc_id: (row or {}).get("content") for doc_id, row in zip(doc_ids, rows)}
+    
+    return await update_summary(bucket, bucket_path, processed, load_contents, _batch_complete)
+
+async def _summary_worker(bucket: str):
+    try:
+        while True:
+            _summary_pending.discard(bucket)
+            _summary_attempts[bucket] = time.time()
+            try:
+                await refresh_bucket_summary(bucket)
+            except FileNotFoundError:
+                break
+            except Exception as e:
+                print(f"[LIGHTRAG] ⚠️ Summary refresh for {bucket} failed: {type(e).__name__}: {str(e)}")
+            if bucket not in _summary_pending:
+                break
+    finally:
+        if _summary_tasks.get(bucket) is asyncio.current_task():
+            _summary_tasks.pop(bucket, None)
+
+def schedule_summary_refresh(bucket: str):
+    """
+    Refresh the bucket's summary in the background. One refresh runs per bucket at a
+    time; changes made while it runs are picked up by one more pass afterwards.
+    """
+    if not SUMMARY_ENABLED:
+        return
+    running = _summary_tasks.get(bucket)
+    if running and not running.done():
+        _summary_pending.add(bucket)
+        return
+    _summary_tasks[bucket] = asyncio.get_running_loop().create_task(_summary_worker(bucket))
+
+def get_bucket_summary(bucket: str):
+    """
+    The bucket's precomputed summary as {"bucket", "summary", "documents", "failed",
+    "updated", "current"}, or None when none exists yet. current is False while
+    documents added or removed since are still being summarized; a refresh is then
+    started unless one ran within SUMMARY_RETRY_SECONDS (failed documents are
+    counted in failed and retried by later refreshes).
+    """
+    bucket_path = os.path.join(WORKING_DIR, bucket)
+    if not os.path.isdir(bucket_path):
+        raise FileNotFoundError(f"Bucket '{bucket}' not found.")
+    stored = load_summary(bucket_path)
+    processed = [row["doc_id"] for row in list_documents(bucket_path, status="processed", limit=1_000_000)]
+    current = summary_is_current(stored, processed)
+    if not current and time.time() - _summary_attempts.get(bucket, 0) >= SUMMARY_RETRY_SECONDS:
+        # Also covers buckets ingested before summaries existed and ingests by other workers;
+        # rate limited so reads of a summary that keeps failing do not each cost LLM calls
+        schedule_summary_refresh(bucket)
+    if stored is None:
+        return None
+    return {
+        "bucket": bucket,
+        "summary": stored["summary"],
+        "documents": len(stored.get("documents", {})),
+        "failed": sum(1 for entry in stored.get("documents", {}).values() if "error" in entry),
+        "updated": stored.get("updated"),
+        "current": current,
+    }
+
+def plan_bucket_query(bucket: str, mode: str = "auto", latency_budget: float = None, top_k: int = None,
+                      only_need_context: bool = False) -> dict:
+    """Query mode and top_k for this bucket (see query_planner.plan_query)"""
+    bucket_path = os.path.join(WORKING_DIR, bucket)
+    chunks = document_totals(bucket_path)["chunks"] if os.path.isdir(bucket_path) else 0
+    return plan_query(bucket, chunks, latency_budget=latency_budget, mode=mode, top_k=top_k,
+                      only_need_context=only_need_context)
+
+async def query_bucket(bucket: str, query: str, user_prompt: str = "", mode: str = "auto",
+                       top_k: int = None, latency_budget: float = None):
+    """
+    Query a bucket; identical queries already in flight are joined rather than repeated.
+
+    mode="auto" lets the planner pick the mode and top_k from latency_budget (seconds)
+    and the bucket's size and latency history; the plan is returned with the result.
+    """
+    plan = plan_bucket_query(bucket, mode, latency_budget, top_k)
+    key = flight_key(bucket, query.strip(), (user_prompt or "").strip(), plan["mode"], plan["top_k"])
+    result = await coalesce("query_bucket", key, lambda: _query_bucket(bucket, query, user_prompt, plan["mode"], plan["top_k"]))
+    return {**result, "mode": plan["mode"], "plan": plan}
+
+async def _query_bucket(bucket: str, query: str, user_prompt: str, mode: str, top_k: int = None):
     print(f"[LIGHTRAG] 🔍 Query request:")
     print(f"[LIGHTRAG] Bucket: {bucket}")
     print(f"[LIGHTRAG] Query: {query[:100]}...")
-    print(f"[LIGHTRAG] Mode: {mode}")
+    print(f"[LIGHTRAG] Mode: {mode} (top_k={top_k})")
     
     rag = await _ensure_initialized(bucket)
     combined_query = f"{user_prompt.strip()}\n\n{query.strip()}" if user_prompt else query.strip()
     
     try:
         # Use the official QueryParam class
-        query_param = QueryParam(mode=mode)
-        result = await rag.aquery(combined_query, param=query_param)
+        query_param = QueryParam(mode=mode, model_func=_interactive_complete)
+        if top_k:
+            query_param.top_k = top_k
+        with QueryTimer(bucket, mode):
+            result = await rag.aquery(combined_query, param=query_param)
         
         print(f"[LIGHTRAG] ✅ Query successful!")
         print(f"[LIGHTRAG] Result length: {len(result) if result else 0}")
@@ -194,26 +610,250 @@ async def query_bucket(bucket: str, query: str, user_prompt: str = "", mode: str
         traceback.print_exc()
         return {"bucket": bucket, "result": "Sorry, I'm not able to provide an answer to that question.[query-error]"}
 
-async def export_graph():
-    if not _rag_instances:
-        return {"nodes": [], "rels": []}
-    rag = list(_rag_instances.values())[0]
-    g = rag.graph
-    nodes = [
-        {
-            "id": n[0],
-            "labels": list(n[1].get("labels", [])),
-            "props": {k: v for k, v in n[1].items() if k != "labels"},
-        }
-        for n in g.nodes(data=True)
-    ]
-    rels = [
-        {
-            "start": u,
-            "end": v,
-            "type": data.get("type", "RELATED"),
-            "props": {k: v for k, v in data.items() if k != "type"},
-        }
-        for u, v, data in g.edges(data=True)
-    ]
+# Sections of LightRAG's context-only output: "-----Entities(KG)-----" followed by a ```json block
+_CONTEXT_SECTION = re.compile(r"-{3,}\s*([A-Za-z ]+?)(?:\((?:KG|DC)\))?\s*-{3,}\s*```json\s*(.*?)\s*```", re.S)
+_CONTEXT_KEYS = {"entities": "entities", "relationships": "relations", "document chunks": "chunks"}
+
+def _parse_context(text: str) -> dict:
+    sections = {"entities": [], "relations": [], "chunks": []}
+    found = False
+    for title, body in _CONTEXT_SECTION.findall(text or ""):
+        name = _CONTEXT_KEYS.get(title.strip().lower())
+        if not name:
+            continue
+        try:
+            rows = json.loads(body)
+        except json.JSONDecodeError:
+            continue
+        sections[name] = [row for row in rows if isinstance(row, dict)]
+        found = True
+    raw = None if found else (text or "").strip()
+    # LightRAG's "nothing relevant found" reply is not context
+    return {**sections, "raw": None if raw == PROMPTS["fail_response"] else raw or None}
+
+async def retrieve_context(bucket: str, query: str, mode: str = "auto", top_k: int = None,
+                           latency_budget: float = None) -> dict:
+    """
+    Retrieval-only query: ranked entities, relationships and source chunks for the
+    query, without LightRAG writing an answer from them (QueryParam.only_need_context).
+
+    Keyword extraction still takes one LLM call in graph modes; "naive" needs none.
+    mode="auto" plans mode and top_k as in query_bucket.
+    Returns {"bucket", "mode", "plan", "entities", "relations", "chunks", "raw"}, where
+    raw holds any text LightRAG returned that is not structured context (for example
+    an answer cached for the same query, or its no-context reply).
+    """
+    if not os.path.isdir(os.path.join(WORKING_DIR, bucket)):
+        raise FileNotFoundError(f"Bucket '{bucket}' not found.")
+    plan = plan_bucket_query(bucket, mode, latency_budget, top_k, only_need_context=True)
+    key = flight_key(bucket, query.strip(), plan["mode"], plan["top_k"])
+    result = await coalesce("retrieve_context", key, lambda: _retrieve_context(bucket, query, plan["mode"], plan["top_k"]))
+    return {**result, "plan": plan}
+
+async def _retrieve_context(bucket: str, query: str, mode: str, top_k: int = None) -> dict:
+    rag = await _ensure_initialized(bucket)
+    query_param = QueryParam(mode=mode, only_need_context=True, model_func=_interactive_complete)
+    if top_k:
+        query_param.top_k = top_k
+    with QueryTimer(bucket, mode, only_need_context=True) as timer:
+        context = await rag.aquery(query.strip(), param=query_param)
+    parsed = _parse_context(context if isinstance(context, str) else "")
+    print(f"[LIGHTRAG] Retrieved context from {bucket} ({mode}, top_k={top_k}) in {timer.seconds:.2f}s: "
+          f"{len(parsed['entities'])} entities, {len(parsed['relations'])} relations, {len(parsed['chunks'])} chunks")
+    return {"bucket": bucket, "mode": mode, **parsed}
+
+# ——— Knowledge graph access ———
+
+GRAPH_FILE = "graph_chunk_entity_relation.graphml"
+
+def bump_graph_version(bucket: str):
+    _graph_versions[bucket] = _graph_versions.get(bucket, 0) + 1
+
+def graph_version(bucket: str) -> tuple:
+    """Changes whenever the bucket's graph may have changed (in this process or on disk)"""
+    graph_path = os.path.join(WORKING_DIR, bucket, GRAPH_FILE)
+    try:
+        mtime = os.stat(graph_path).st_mtime_ns
+    except OSError:
+        mtime = None
+    return (_graph_versions.get(bucket, 0), mtime)
+
+async def get_bucket_graph(bucket: str) -> nx.Graph:
+    """Return the bucket's knowledge graph without forcing a LightRAG initialization.
+
+    Uses the live in-memory graph when the bucket is already initialized,
+    otherwise reads the persisted GraphML file.
+    """
+    if bucket in _initialized_buckets:
+        storage = _rag_instances[bucket].chunk_entity_relation_graph
+        if hasattr(storage, "_get_graph"):
+            return await storage._get_graph()
+    
+    graph_path = os.path.join(WORKING_DIR, bucket, GRAPH_FILE)
+    if not os.path.exists(graph_path):
+        return nx.Graph()
+    return await asyncio.to_thread(nx.read_graphml, graph_path)
+
+def node_record(node_id: str, data: dict) -> dict:
+    """Shape a graph node as {"id", "labels", "props"} for graph backends"""
+    labels = data.get("labels") or ([data["entity_type"]] if data.get("entity_type") else [])
+    if isinstance(labels, str):
+        labels = [labels]
+    return {
+        "id": node_id,
+        "labels": [str(l).strip('"') for l in labels if l],
+        "props": {k: v for k, v in data.items() if k != "labels"},
+    }
+
+def edge_record(u: str, v: str, data: dict) -> dict:
+    """Shape a graph edge as {"start", "end", "type", "props"} for graph backends"""
+    return {
+        "start": u,
+        "end": v,
+        "type": data.get("type", "RELATED"),
+        "props": {k: val for k, val in data.items() if k != "type"},
+    }
+
+async def _load_graphs(buckets: list[str], snapshot: bool = False) -> dict[str, nx.Graph]:
+    graphs = {}
+    for bucket in buckets:
+        g = await get_bucket_graph(bucket)
+        # Streaming yields to the event loop, so live graphs must not change underneath us
+        graphs[bucket] = g.copy() if snapshot and bucket in _initialized_buckets else g
+    return graphs
+
+def _iter_nodes(graphs: dict[str, nx.Graph], merge: bool = True):
+    """Yield node records across buckets; with merge, each entity id is emitted once"""
+    names = list(graphs)
+    for i, bucket in enumerate(names):
+        g = graphs[bucket]
+        for node_id, data in g.nodes(data=True):
+            if merge:
+                # Already emitted from an earlier bucket
+                if any(graphs[prev].has_node(node_id) for prev in names[:i]):
+                    continue
+                member_of = [b for b in names[i:] if graphs[b].has_node(node_id)]
+            else:
+                member_of = [bucket]
+            record = node_record(node_id, data)
+            record["buckets"] = member_of
+            yield record
+
+def _iter_edges(graphs: dict[str, nx.Graph], merge: bool = True):
+    """Yield edge records across buckets; with merge, each endpoint pair is emitted once"""
+    names = list(graphs)
+    for i, bucket in enumerate(names):
+        g = graphs[bucket]
+        for u, v, data in g.edges(data=True):
+            if merge:
+                if any(graphs[prev].has_edge(u, v) for prev in names[:i]):
+                    continue
+                member_of = [b for b in names[i:] if graphs[b].has_edge(u, v)]
+            else:
+                member_of = [bucket]
+            record = edge_record(u, v, data)
+            record["buckets"] = member_of
+            yield record
+
+def _resolve_export_buckets(buckets) -> list[str]:
+    if buckets is None:
+        return [b for b in os.listdir(WORKING_DIR) if os.path.isdir(os.path.join(WORKING_DIR, b))]
+    if isinstance(buckets, str):
+        buckets = [buckets]
+    missing = [b for b in buckets if not os.path.isdir(os.path.join(WORKING_DIR, b))]
+    if missing:
+        raise FileNotFoundError(f"Bucket(s) not found: {', '.join(missing)}")
+    return list(dict.fromkeys(buckets))
+
+async def export_graph(buckets=None, merge: bool = True):
+    """Export nodes and relations of one or more buckets (all buckets by default)"""
+    graphs = await _load_graphs(_resolve_export_buckets(buckets))
+    nodes = list(_iter_nodes(graphs, merge))
+    rels = list(_iter_edges(graphs, merge))
     return nodes, rels
+
+async def _export_walk(bucket_names: list[str], kind: str, merge: bool) -> tuple:
+    """Graphs of an export, loaded once per graph version, and the paging cursor of kind/merge"""
+    key = tuple(bucket_names)
+    versions = [graph_version(b) for b in bucket_names]
+    export = _export_cursors.get(key)
+    if export is None or export["versions"] != versions:
+        # Snapshots, so a cursor never walks a live graph that changed between pages
+        graphs = await _load_graphs(bucket_names, snapshot=True)
+        export = {"versions": versions, "graphs": graphs, "walks": {}}
+        _export_cursors[key] = export
+    _export_cursors.move_to_end(key)
+    while len(_export_cursors) > EXPORT_CURSORS:
+        _export_cursors.popitem(last=False)
+    return export["graphs"], export["walks"].setdefault((kind, merge), {"position": None})
+
+async def export_graph_page(buckets=None, kind: str = "nodes", offset: int = 0,
+                            limit: int = 1000, merge: bool = True):
+    """
+    One page of nodes or edges.
+
+    The graphs are loaded once per graph version and the walk over them resumes
+    where the previous page stopped, so paging through in order is linear overall.
+    Any other offset (or a changed graph) walks again from the start.
+    """
+    if kind not in ("nodes", "edges"):
+        raise ValueError("kind must be 'nodes' or 'edges'")
+    bucket_names = _resolve_export_buckets(buckets)
+    graphs, walk = await _export_walk(bucket_names, kind, merge)
+    if walk["position"] != offset:
+        walk["records"] = _iter_nodes(graphs, merge) if kind == "nodes" else _iter_edges(graphs, merge)
+        walk["ahead"] = []
+        deque(itertools.islice(walk["records"], offset), maxlen=0)
+    # Fetch one extra item to know whether another page exists; it opens the next page
+    items = walk["ahead"] + list(itertools.islice(walk["records"], limit + 1 - len(walk["ahead"])))
+    walk["ahead"] = items[limit:]
+    walk["position"] = offset + limit
+    has_more = len(items) > limit
+    return {
+        "buckets": bucket_names,
+        "kind": kind,
+        "offset": offset,
+        "limit": limit,
+        "items": items[:limit],
+        "next_offset": offset + limit if has_more else None,
+    }
+
+async def stream_graph_ndjson(buckets=None, merge: bool = True):
+    """Stream nodes then edges as newline-delimited JSON records"""
+    graphs = await _load_graphs(_resolve_export_buckets(buckets), snapshot=True)
+    for record in _iter_nodes(graphs, merge):
+        yield json.dumps({"kind": "node", **record}, default=str) + "\n"
+    for record in _iter_edges(graphs, merge):
+        yield json.dumps({"kind": "edge", **record}, default=str) + "\n"
+
+def _graphml_data(keys: dict[str, str], values: dict) -> str:
+    return "".join(
+        f'<data key="{keys[k]}">{xml_escape(str(v))}</data>'
+        for k, v in values.items() if k in keys and v is not None
+    )
+
+async def stream_graph_graphml(buckets=None, merge: bool = True):
+    """Stream the (merged) graph as GraphML, one element per chunk"""
+    graphs = await _load_graphs(_resolve_export_buckets(buckets), snapshot=True)
+    
+    # Attribute keys must be declared before any element
+    node_attrs = sorted({k for g in graphs.values() for _, d in g.nodes(data=True) for k in d} | {"buckets"})
+    edge_attrs = sorted({k for g in graphs.values() for _, _, d in g.edges(data=True) for k in d} | {"buckets"})
+    node_keys = {name: f"n{i}" for i, name in enumerate(node_attrs)}
+    edge_keys = {name: f"e{i}" for i, name in enumerate(edge_attrs)}
+    
+    yield ('<?xml version="1.0" encoding="utf-8"?>\n'
+           '<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n')
+    for name, key in node_keys.items():
+        yield f'<key id="{key}" for="node" attr.name={quoteattr(name)} attr.type="string"/>\n'
+    for name, key in edge_keys.items():
+        yield f'<key id="{key}" for="edge" attr.name={quoteattr(name)} attr.type="string"/>\n'
+    yield '<graph edgedefault="undirected">\n'
+    for record in _iter_nodes(graphs, merge):
+        values = {**record["props"], "buckets": ",".join(record["buckets"])}
+        yield f'<node id={quoteattr(record["id"])}>{_graphml_data(node_keys, values)}</node>\n'
+    for record in _iter_edges(graphs, merge):
+        values = {**record["props"], "buckets": ",".join(record["buckets"])}
+        yield (f'<edge source={quoteattr(record["start"])} target={quoteattr(record["end"])}>'
+               f'{_graphml_data(edge_keys, values)}</edge>\n')
+    yield '</graph>\n</graphml>\n'
@@ -7,6 +7,8 @@ from typing import Dict, Any, List
 from lightrag import LightRAG
 from lightrag.utils import logger
 
+from backend.core.llm_resilience import call_provider, PROVIDER_TIMEOUT
+
 # Initialize LightRAG logging
 logger.info("Loading Perplexity integration module")
 
@@ -45,28 +47,27 @@ async def perplexity_model_if_cache(
             "temperature": kwargs.get("temperature", 0.7),
         }
         
-        # Make API request
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.post(
-                "https://api.perplexity.ai/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {api_key}",
-                    "Content-Type": "application/json"
-                },
-                json=payload
-            )
-            
-            if response.status_code != 200:
-                error_msg = f"Perplexity API error {response.status_code}: {response.text}"
-                logger.error(error_msg)
-                raise Exception(error_msg)
-            
-            result = response.json()
-            content = result["choices"][0]["message"]["content"]
-            
-            logger.info(f"Perplexity generation successful: {len(content)} characters")
-            return content
-            
+        async def post():
+            async with httpx.AsyncClient(timeout=PROVIDER_TIMEOUT) as client:
+                response = await client.post(
+                    "https://api.perplexity.ai/chat/completions",
+                    headers={
+                        "Authorization": f"Bearer {api_key}",
+                        "Content-Type": "application/json"
+                    },
+                    json=payload
+                )
+                response.raise_for_status()
+                return response
+        
+        # Make API request (gateway limits, retries on retryable statuses, circuit breaker)
+        response = await call_provider("perplexity", post)
+        result = response.json()
+        content = result["choices"][0]["message"]["content"]
+        
+        logger.info(f"Perplexity generation successful: {len(content)} characters")
+        return content
+        
     except Exception as e:
         logger.error(f"Perplexity API call failed: {str(e)}")
         raise
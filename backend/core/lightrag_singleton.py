@@ -1,11 +1,18 @@
 from lightrag import LightRAG
 from lightrag.llm.openai import gpt_4o_mini_complete, openai_embed
+from backend.core.llm_gateway import gated
+from backend.core.embedding_cache import cached_embedding_func
+
+# Completion through the LLM gateway's interactive lane. Pass it as QueryParam.model_func
+# so a cancelled query cancels its LLM call too (LightRAG's own limiter finishes calls
+# it has already started even when nobody is waiting for them any more).
+interactive_complete = gated("openai", gpt_4o_mini_complete, lane="interactive")
 
 # ✅ Singleton instance (created once)
 _lightrag = LightRAG(
     working_dir="./lightrag_working_dir",
-    embedding_func=openai_embed,
-    llm_model_func=gpt_4o_mini_complete
+    embedding_func=cached_embedding_func(openai_embed),
+    llm_model_func=interactive_complete
 )
 
 # ✅ Accessor function (import this safely anywhere)
@@ -0,0 +1,200 @@
+# backend/core/llm_gateway.py
+
+import os
+import time
+import asyncio
+import functools
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Any, Callable, Awaitable
+
+# Lanes in priority order: a free slot always goes to the first lane with waiters
+LANES = ("interactive", "batch")
+
+# Requests per minute, burst size and concurrent calls per provider; override with
+# LLM_<PROVIDER>_RPM / LLM_<PROVIDER>_BURST / LLM_<PROVIDER>_CONCURRENCY
+PROVIDER_DEFAULTS = {
+    "openai": {"rpm": 500, "burst": 50, "concurrency": 16},
+    "perplexity": {"rpm": 50, "burst": 5, "concurrency": 4},
+}
+FALLBACK_DEFAULTS = {"rpm": 60, "burst": 5, "concurrency": 4}
+
+# Lane used by calls that do not name one (ingestion switches to "batch")
+_current_lane: contextvars.ContextVar[str] = contextvars.ContextVar("llm_lane", default="interactive")
+
+
+@contextmanager
+def use_lane(lane: str):
+    """Route LLM calls made inside the block (and tasks it spawns) through the given lane"""
+    if lane not in LANES:
+        raise ValueError(f"Unknown LLM lane '{lane}' (expected one of {LANES})")
+    token = _current_lane.set(lane)
+    try:
+        yield
+    finally:
+        _current_lane.reset(token)
+
+
+class TokenBucket:
+    """Classic token bucket: refills at rate tokens/second up to capacity"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, cost: float = 1.0):
+        # Waiters queue on the lock, so tokens are handed out in arrival order
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= cost:
+                    self.tokens -= cost
+                    return
+                await asyncio.sleep((cost - self.tokens) / self.rate)
+
+    def available(self) -> float:
+        self._refill()
+        return self.tokens
+
+
+class PrioritySlots:
+    """Counting semaphore whose waiters are served lane by lane, FIFO within a lane"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.in_use = 0
+        self._waiters: Dict[str, deque] = {lane: deque() for lane in LANES}
+
+    def waiting(self, lane: str) -> int:
+        return sum(1 for fut in self._waiters[lane] if not fut.done())
+
+    async def acquire(self, lane: str):
+        if self.in_use < self.limit and not any(self.waiting(l) for l in LANES):
+            self.in_use += 1
+            return
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters[lane].append(fut)
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.cancelled():
+                try:
+                    self._waiters[lane].remove(fut)
+                except ValueError:
+                    pass
+            else:
+                # The slot was handed over just as we were cancelled: pass it on
+                self.release()
+            raise
+
+    def release(self):
+        for lane in LANES:
+            waiters = self._waiters[lane]
+            while waiters:
+                fut = waiters.popleft()
+                if not fut.done():
+                    # Hand the slot straight to the next waiter; in_use stays the same
+                    fut.set_result(None)
+                    return
+        self.in_use -= 1
+
+
+class ProviderGate:
+    """Rate limit, concurrency cap and counters for one LLM provider"""
+
+    def __init__(self, name: str):
+        defaults = PROVIDER_DEFAULTS.get(name, FALLBACK_DEFAULTS)
+        prefix = f"LLM_{name.upper()}_"
+        self.name = name
+        self.rpm = float(os.getenv(prefix + "RPM", defaults["rpm"]))
+        self.burst = float(os.getenv(prefix + "BURST", defaults["burst"]))
+        self.concurrency = int(os.getenv(prefix + "CONCURRENCY", defaults["concurrency"]))
+        self.bucket = TokenBucket(self.rpm / 60.0, max(self.burst, 1.0))
+        self.slots = PrioritySlots(self.concurrency)
+        self.stats = {
+            lane: {"completed": 0, "failed": 0, "cancelled": 0, "wait_seconds": 0.0, "max_wait_seconds": 0.0}
+            for lane in LANES
+        }
+
+    async def run(self, call: Callable[[], Awaitable[Any]], lane: str) -> Any:
+        queued_at = time.monotonic()
+        await self.slots.acquire(lane)
+        stats = self.stats[lane]
+        try:
+            await self.bucket.acquire()
+            waited = time.monotonic() - queued_at
+            stats["wait_seconds"] += waited
+            stats["max_wait_seconds"] = max(stats["max_wait_seconds"], waited)
+            result = await call()
+            stats["completed"] += 1
+            return result
+        except asyncio.CancelledError:
+            stats["cancelled"] += 1
+            raise
+        except Exception:
+            stats["failed"] += 1
+            raise
+        finally:
+            self.slots.release()
+
+    def metrics(self) -> Dict[str, Any]:
+        lanes = {}
+        for lane, stats in self.stats.items():
+            finished = stats["completed"] + stats["failed"] + stats["cancelled"]
+            lanes[lane] = {
+                **stats,
+                "wait_seconds": round(stats["wait_seconds"], 3),
+                "max_wait_seconds": round(stats["max_wait_seconds"], 3),
+                "avg_wait_seconds": round(stats["wait_seconds"] / finished, 3) if finished else 0.0,
+                "queue_depth": self.slots.waiting(lane),
+            }
+        return {
+            "provider": self.name,
+            "limits": {"rpm": self.rpm, "burst": self.burst, "concurrency": self.concurrency},
+            "in_flight": self.slots.in_use,
+            "queue_depth": sum(self.slots.waiting(lane) for lane in LANES),
+            "tokens_available": round(self.bucket.available(), 2),
+            "lanes": lanes,
+        }
+
+
+# In-memory caches
+_gates: Dict[str, ProviderGate] = {}
+
+def get_gate(provider: str) -> ProviderGate:
+    if provider not in _gates:
+        _gates[provider] = ProviderGate(provider)
+    return _gates[provider]
+
+
+# ——— Public API ———
+
+async def submit(provider: str, call: Callable[[], Awaitable[Any]], lane: str = None) -> Any:
+    """Run call() once the provider has a free slot (in lane priority order) and a rate-limit token"""
+    lane = lane or _current_lane.get()
+    if lane not in LANES:
+        raise ValueError(f"Unknown LLM lane '{lane}' (expected one of {LANES})")
+    return await get_gate(provider).run(call, lane)
+
+def gated(provider: str, func: Callable[..., Awaitable[Any]], lane: str = None) -> Callable[..., Awaitable[Any]]:
+    """
+    Wrap an async completion function so every call goes through the gateway.
+
+    lane=None resolves the lane per call from the caller's context (see use_lane).
+    """
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await submit(provider, lambda: func(*args, **kwargs), lane)
+    return wrapper
+
+def gateway_metrics() -> Dict[str, Any]:
+    return {"providers": {name: gate.metrics() for name, gate in _gates.items()}, "lanes": list(LANES)}
@@ -0,0 +1,187 @@
+# backend/core/llm_hedging.py
+
+import os
+import time
+import asyncio
+from collections import deque
+from typing import Dict, Any, Callable, Awaitable, Optional
+
+from lightrag.llm.openai import gpt_4o_mini_complete
+
+from backend.core.llm_gateway import submit
+
+# "off" (default), "same" (hedge to the primary provider) or "fallback" (hedge to the fallback provider)
+HEDGE_MODE = os.getenv("LLM_HEDGE", "off").lower()
+HEDGE_MODES = ("off", "same", "fallback")
+# Fire the hedge once the primary is slower to its first token than this percentile of recent calls
+HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+# Deadline used until a provider has enough first-token samples for a percentile
+HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+HEDGE_DEFAULT_DELAY = float(os.getenv("LLM_HEDGE_DEFAULT_DELAY", "4"))
+TTFT_WINDOW = int(os.getenv("LLM_HEDGE_WINDOW", "200"))
+
+# An attempt streams one completion and returns its full text; it must call
+# on_first_token() as soon as the first piece of output arrives.
+Attempt = Callable[[Callable[[], None]], Awaitable[str]]
+
+
+class FirstTokenTracker:
+    """Sliding window of time-to-first-token samples for one provider"""
+
+    def __init__(self, window: int = TTFT_WINDOW):
+        self.samples: deque = deque(maxlen=window)
+
+    def record(self, seconds: float):
+        self.samples.append(seconds)
+
+    def percentile(self, p: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, max(0, int(round(p / 100.0 * len(ordered))) - 1))
+        return ordered[index]
+
+    def deadline(self) -> float:
+        if len(self.samples) < HEDGE_MIN_SAMPLES:
+            return HEDGE_DEFAULT_DELAY
+        return self.percentile(HEDGE_PERCENTILE)
+
+
+# In-memory caches
+_trackers: Dict[str, FirstTokenTracker] = {}
+_stats = {"requests": 0, "hedged": 0, "primary_wins": 0, "hedge_wins": 0, "failed": 0}
+
+def get_tracker(provider: str) -> FirstTokenTracker:
+    if provider not in _trackers:
+        _trackers[provider] = FirstTokenTracker()
+    return _trackers[provider]
+
+def hedging_metrics() -> Dict[str, Any]:
+    hedged = _stats["hedged"]
+    return {
+        "mode": HEDGE_MODE,
+        "percentile": HEDGE_PERCENTILE,
+        **_stats,
+        "hedge_rate": round(hedged / _stats["requests"], 4) if _stats["requests"] else 0.0,
+        "hedge_win_rate": round(_stats["hedge_wins"] / hedged, 4) if hedged else 0.0,
+        "first_token_seconds": {
+            provider: {
+                "samples": len(tracker.samples),
+                "p50": tracker.percentile(50),
+                "p95": tracker.percentile(95),
+                "p99": tracker.percentile(99),
+                "hedge_deadline": tracker.deadline(),
+            }
+            for provider, tracker in _trackers.items()
+        },
+    }
+
+
+async def _cancel(tasks):
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+# ——— Public API ———
+
+def openai_attempt(prompt: str) -> Attempt:
+    """Attempt streaming a gpt-4o-mini completion through the gateway's interactive lane"""
+    async def attempt(on_first_token):
+        async def stream():
+            response = await gpt_4o_mini_complete(prompt, stream=True)
+            if isinstance(response, str):
+                on_first_token()
+                return response
+            parts = []
+            async for chunk in response:
+                if chunk:
+                    if not parts:
+                        on_first_token()
+                    parts.append(chunk)
+            return "".join(parts)
+        return await submit("openai", stream, lane="interactive")
+    return attempt
+
+async def hedged_completion(primary_provider: str, primary: Attempt,
+                            backup_provider: str, backup: Attempt) -> Dict[str, Any]:
+    """
+    Run primary; if it has not produced a first token by the provider's hedge
+    deadline, start backup as well. Whichever streams its first token first
+    wins and the other is cancelled. A request that fails before its first token
+    leaves the race to the other one.
+
+    Returns {"text", "provider", "hedged", "winner": "primary"|"hedge"}.
+    """
+    _stats["requests"] += 1
+    loop = asyncio.get_running_loop()
+    winner = loop.create_future()
+    started = {}
+
+    first_tokens = set()
+
+    def first_token_callback(label: str, provider: str):
+        def on_first_token():
+            first_tokens.add(label)
+            get_tracker(provider).record(time.monotonic() - started[label])
+            if not winner.done():
+                winner.set_result(label)
+        return on_first_token
+
+    def launch(label: str, provider: str, attempt: Attempt) -> asyncio.Task:
+        started[label] = time.monotonic()
+        return loop.create_task(attempt(first_token_callback(label, provider)))
+
+    providers = {"primary": primary_provider, "hedge": backup_provider}
+    tasks = {"primary": launch("primary", primary_provider, primary)}
+    deadline = get_tracker(primary_provider).deadline()
+    hedged = False
+    errors = {}
+
+    try:
+        await asyncio.wait([winner, tasks["primary"]], timeout=deadline, return_when=asyncio.FIRST_COMPLETED)
+        primary_failed = tasks["primary"].done() and tasks["primary"].exception() is not None
+        if not winner.done() and (primary_failed or not tasks["primary"].done()):
+            hedged = True
+            _stats["hedged"] += 1
+            if primary_failed:
+                print(f"[LLM HEDGE] {primary_provider} failed before its first token, "
+                      f"hedging to {backup_provider}")
+            else:
+                print(f"[LLM HEDGE] No first token from {primary_provider} after {deadline:.2f}s, "
+                      f"hedging to {backup_provider}")
+            tasks["hedge"] = launch("hedge", backup_provider, backup)
+
+        pending = dict(tasks)
+        while not winner.done():
+            for label in [label for label, task in pending.items() if task.done()]:
+                task = pending.pop(label)
+                if task.exception() is None:
+                    # Completed without ever streaming a token (empty answer)
+                    winner.set_result(label)
+                    break
+                errors[label] = task.exception()
+                print(f"[LLM HEDGE] {label} ({providers[label]}) failed: {str(task.exception())[:200]}")
+            if winner.done():
+                break
+            if not pending:
+                _stats["failed"] += 1
+                raise errors.get("primary") or next(iter(errors.values()))
+            await asyncio.wait([winner, *pending.values()], return_when=asyncio.FIRST_COMPLETED)
+
+        label = winner.result()
+        if label == "hedge" and "primary" not in first_tokens and "primary" not in errors:
+            # The primary was at least this slow; without the sample the deadline would
+            # drift down to the fast calls that survive, and hedge ever more often
+            get_tracker(primary_provider).record(time.monotonic() - started["primary"])
+        await _cancel([task for other, task in tasks.items() if other != label])
+        text = await tasks[label]
+    except asyncio.CancelledError:
+        await _cancel(list(tasks.values()))
+        raise
+
+    if label == "hedge":
+        _stats["hedge_wins"] += 1
+    else:
+        _stats["primary_wins"] += 1
+    return {"text": text, "provider": providers[label], "hedged": hedged, "winner": label}
@@ -0,0 +1,172 @@
+# backend/core/llm_resilience.py
+
+import os
+import time
+import random
+import asyncio
+from typing import Dict, Any, Callable, Awaitable
+
+import httpx
+
+from backend.core.llm_gateway import submit
+
+# Provider HTTP timeouts: fail fast on connect, allow long generations once connected
+CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT", "60"))
+PROVIDER_TIMEOUT = httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT)
+
+RETRY_ATTEMPTS = int(os.getenv("LLM_RETRY_ATTEMPTS", "3"))
+RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", "0.5"))
+RETRY_MAX_DELAY = float(os.getenv("LLM_RETRY_MAX_DELAY", "8"))
+RETRYABLE_STATUSES = {408, 409, 425, 429, 500, 502, 503, 504}
+
+BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a provider whose circuit breaker is open"""
+
+    def __init__(self, provider: str, retry_in: float):
+        super().__init__(f"Circuit open for provider '{provider}', retry in {retry_in:.1f}s")
+        self.provider = provider
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure breaker for one provider.
+
+    closed    -> calls flow; BREAKER_FAILURES failures in a row open the circuit
+    open      -> calls are rejected until BREAKER_RESET_SECONDS have passed
+    half_open -> a single probe call is let through; success closes, failure re-opens
+    """
+
+    def __init__(self, provider: str, failure_threshold: int = BREAKER_FAILURES,
+                 reset_seconds: float = BREAKER_RESET_SECONDS):
+        self.provider = provider
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.stats = {"successes": 0, "failures": 0, "rejected": 0, "opened": 0}
+
+    def allow(self) -> bool:
+        if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_seconds:
+            self.state = "half_open"
+            self.probe_in_flight = False
+        if self.state == "closed":
+            return True
+        if self.state == "half_open" and not self.probe_in_flight:
+            self.probe_in_flight = True
+            return True
+        self.stats["rejected"] += 1
+        return False
+
+    def retry_in(self) -> float:
+        return max(self.reset_seconds - (time.monotonic() - self.opened_at), 0.0)
+
+    def record_success(self):
+        self.stats["successes"] += 1
+        self.failures = 0
+        if self.state != "closed":
+            print(f"[LLM] Circuit for '{self.provider}' closed again")
+        self.state = "closed"
+        self.probe_in_flight = False
+
+    def record_failure(self):
+        self.stats["failures"] += 1
+        self.failures += 1
+        self.probe_in_flight = False
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                self.stats["opened"] += 1
+                print(f"[LLM] Circuit for '{self.provider}' opened after {self.failures} consecutive failures")
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "retry_in_seconds": round(self.retry_in(), 1) if self.state == "open" else 0.0,
+            **self.stats,
+        }
+
+
+# In-memory caches
+_breakers: Dict[str, CircuitBreaker] = {}
+
+def get_breaker(provider: str) -> CircuitBreaker:
+    if provider not in _breakers:
+        _breakers[provider] = CircuitBreaker(provider)
+    return _breakers[provider]
+
+def breaker_states() -> Dict[str, Any]:
+    return {name: breaker.snapshot() for name, breaker in _breakers.items()}
+
+
+def is_retryable(error: Exception) -> bool:
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in RETRYABLE_STATUSES
+    # Timeouts, refused/reset connections, protocol errors
+    return isinstance(error, httpx.TransportError)
+
+def _counts_against_provider(error: Exception) -> bool:
+    # A 4xx other than throttling is our request's fault, not a sign the provider is down
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code >= 500 or error.response.status_code in RETRYABLE_STATUSES
+    return isinstance(error, httpx.TransportError)
+
+def backoff_delay(attempt: int, error: Exception = None) -> float:
+    """Full-jitter exponential backoff, honouring a Retry-After header when the provider sends one"""
+    if isinstance(error, httpx.HTTPStatusError):
+        retry_after = error.response.headers.get("retry-after")
+        if retry_after:
+            try:
+                return min(float(retry_after), RETRY_MAX_DELAY)
+            except ValueError:
+                pass
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * (2 ** attempt)))
+
+
+# ——— Public API ———
+
+async def call_provider(provider: str, call: Callable[[], Awaitable[Any]], lane: str = None,
+                        attempts: int = None) -> Any:
+    """
+    Run a provider call through the LLM gateway with retries and the provider's breaker.
+
+    call() must raise for HTTP error statuses (response.raise_for_status()). Each
+    attempt takes its own gateway slot, so backoff sleeps do not hold capacity.
+    Raises CircuitOpenError without calling the provider while its circuit is open.
+    """
+    attempts = attempts or RETRY_ATTEMPTS
+    breaker = get_breaker(provider)
+
+    for attempt in range(attempts):
+        if not breaker.allow():
+            raise CircuitOpenError(provider, breaker.retry_in())
+        try:
+            result = await submit(provider, call, lane)
+        except asyncio.CancelledError:
+            # Abandoned by the caller: says nothing about provider health
+            breaker.probe_in_flight = False
+            raise
+        except Exception as e:
+            if _counts_against_provider(e):
+                breaker.record_failure()
+            else:
+                breaker.probe_in_flight = False
+            # No point backing off for a retry the open breaker would reject anyway
+            if not is_retryable(e) or attempt == attempts - 1 or breaker.state == "open":
+                raise
+            delay = backoff_delay(attempt, e)
+            print(f"[LLM] {provider} attempt {attempt + 1}/{attempts} failed ({type(e).__name__}: {(str(e).splitlines() or [''])[0][:200]}), "
+                  f"retrying in {delay:.2f}s")
+            await asyncio.sleep(delay)
+            continue
+        breaker.record_success()
+        return result
@@ -0,0 +1,654 @@
+# backend/core/mmap_vector_storage.py
+
+import os
+import json
+import time
+import base64
+import sqlite3
+import asyncio
+import importlib
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from lightrag.base import BaseVectorStorage
+from lightrag.kg import STORAGES, STORAGE_IMPLEMENTATIONS, STORAGE_ENV_REQUIREMENTS
+from lightrag.kg.shared_storage import get_storage_lock, get_update_flag, set_all_update_flags
+from lightrag.utils import compute_mdhash_id
+
+# "int8" scans one byte per dimension and rescores the best candidates with the float
+# vectors; "none" scans the float vectors directly
+VECTOR_QUANTIZATION = os.getenv("VECTOR_QUANTIZATION", "int8").lower()
+QUANTIZATIONS = ("int8", "none")
+# Candidates rescored with float vectors per requested result when quantized
+RESCORE_MULTIPLIER = int(os.getenv("VECTOR_RESCORE_MULTIPLIER", "4"))
+# Rewrite the vector files without deleted rows once this share of rows is dead
+COMPACT_RATIO = float(os.getenv("VECTOR_COMPACT_RATIO", "0.25"))
+# Rows scored per step, bounding the float copy made of quantized rows
+SCAN_BLOCK_ROWS = 16384
+# SQLite caps the number of bound parameters per statement
+LOOKUP_BATCH = 500
+
+# Ids and metadata of the stored rows, looked up on demand instead of held in memory.
+# Rows of the previous generation are kept until the next compaction, so a search that
+# started before a compaction can still name its results.
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS state (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    dim INTEGER NOT NULL,
+    generation INTEGER NOT NULL,
+    rows INTEGER NOT NULL,
+    quantization TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS vector_rows (
+    generation INTEGER NOT NULL,
+    row_index INTEGER NOT NULL,
+    doc_id TEXT,
+    PRIMARY KEY (generation, row_index)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_vector_rows_doc_id ON vector_rows (doc_id, generation);
+CREATE TABLE IF NOT EXISTS meta (
+    doc_id TEXT PRIMARY KEY,
+    meta TEXT NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+def _quantize(vectors: np.ndarray) -> tuple:
+    """Symmetric per-row int8 codes and the scale turning a code back into a float"""
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+def _append_rows(path: str, array: np.ndarray, offset: int):
+    # Bytes past offset are left over from a write whose state was never committed
+    with open(path, "r+b" if os.path.exists(path) else "wb") as f:
+        f.truncate(offset)
+        f.seek(offset)
+        f.write(np.ascontiguousarray(array).tobytes())
+
+def _batches(items: list, size: int = LOOKUP_BATCH):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+def _top(scores: np.ndarray, count: int) -> np.ndarray:
+    """Indices of the count highest scores, best first"""
+    count = min(count, len(scores))
+    if count <= 0:
+        return np.empty(0, dtype=np.int64)
+    picked = np.argpartition(-scores, count - 1)[:count]
+    return picked[np.argsort(-scores[picked])]
+
+
+@dataclass
+class MmapVectorDBStorage(BaseVectorStorage):
+    """
+    Vector storage keeping a bucket's embeddings in memory-mapped files.
+
+    Vectors are appended to vdb_<namespace>.<generation>.f32 (normalized float32
+    rows) and, when quantized, to matching .i8 codes and .scale files. Row ids and
+    metadata (chunk content included) live in the SQLite file vdb_<namespace>.mmap.db,
+    whose state row is committed last and says how many rows are valid. Opening a
+    bucket reads only that state and the numbers of deleted rows; vectors are paged
+    in by the mappings, shared between workers through the page cache, and ids and
+    metadata are looked up per query. Deleted or replaced rows are masked until
+    enough accumulate for a compaction into the next generation.
+
+    Queries score every live row (int8 codes when quantized, then the best
+    candidates again with their float vectors) plus vectors upserted since the
+    last save. An existing vdb_<namespace>.json of NanoVectorDBStorage, or a
+    vdb_<namespace>.mmap.json state of earlier versions, is imported on first use.
+
+    vector_db_storage_cls_kwargs may set "quantization" and "rescore_multiplier".
+    """
+
+    # Per-generation files, removed together once a compaction has replaced them
+    _GENERATION_FILES = ("f32", "i8", "scale")
+
+    def __post_init__(self):
+        self._storage_lock = None
+        self.storage_updated = None
+
+        kwargs = self.global_config.get("vector_db_storage_cls_kwargs", {})
+        cosine_threshold = kwargs.get("cosine_better_than_threshold")
+        if cosine_threshold is None:
+            raise ValueError("cosine_better_than_threshold must be specified in vector_db_storage_cls_kwargs")
+        self.cosine_better_than_threshold = cosine_threshold
+        self.quantization = str(kwargs.get("quantization", VECTOR_QUANTIZATION)).lower()
+        if self.quantization not in QUANTIZATIONS:
+            raise ValueError(f"Unknown vector quantization '{self.quantization}' (expected one of {QUANTIZATIONS})")
+        self.rescore_multiplier = max(1, int(kwargs.get("rescore_multiplier", RESCORE_MULTIPLIER)))
+
+        self._max_batch_size = self.global_config["embedding_batch_num"]
+        self._dim = self.embedding_func.embedding_dim
+        self._prefix = os.path.join(self.global_config["working_dir"], f"vdb_{self.namespace}")
+        self._db_file = f"{self._prefix}.mmap.db"
+        self._ready = False
+        self._load()
+
+    # ——— Files ———
+
+    def _path(self, kind: str, generation: int = None) -> str:
+        return f"{self._prefix}.{self._generation if generation is None else generation}.{kind}"
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self._db_file, timeout=30)
+        conn.execute("PRAGMA busy_timeout = 30000")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        if not self._ready:
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                conn.executescript(_SCHEMA)
+            self._ready = True
+        return conn
+
+    def _reset(self):
+        self._generation = 0
+        self._rows = 0
+        self._live = np.zeros(0, dtype=bool)
+        self._killed: set = set()  # stored rows deleted or replaced since the last save
+        self._changes: Dict[str, Optional[Dict[str, Any]]] = {}  # metadata since the last save; None once deleted
+        self._pending: Dict[str, np.ndarray] = {}  # upserted since the last save
+        self._vectors = self._codes = self._scales = None
+        self._dirty = False
+
+    def _load(self):
+        self._reset()
+        conn = self._connect()
+        try:
+            state = conn.execute("SELECT dim, generation, rows, quantization FROM state").fetchone()
+            dead = [] if state is None else [row for (row,) in conn.execute(
+                "SELECT row_index FROM vector_rows WHERE generation = ? AND doc_id IS NULL", (state[1],)
+            )]
+        finally:
+            conn.close()
+        if state is None:
+            self._import_legacy()
+            return
+        dim, self._generation, self._rows, quantization = state
+        if dim != self._dim:
+            raise ValueError(f"{self._db_file} holds {dim}-dimensional vectors, expected {self._dim}")
+
+        self._live = np.ones(self._rows, dtype=bool)
+        self._live[dead] = False
+        if quantization != self.quantization:
+            self._requantize()
+        self._map()
+
+    def _map(self):
+        self._vectors = self._codes = self._scales = None
+        if not self._rows:
+            return
+        self._vectors = np.memmap(self._path("f32"), dtype=np.float32, mode="r", shape=(self._rows, self._dim))
+        if self.quantization == "int8":
+            self._codes = np.memmap(self._path("i8"), dtype=np.int8, mode="r", shape=(self._rows, self._dim))
+            self._scales = np.memmap(self._path("scale"), dtype=np.float32, mode="r", shape=(self._rows,))
+
+    def _write_state(self, conn: sqlite3.Connection):
+        conn.execute(
+            "INSERT OR REPLACE INTO state (id, dim, generation, rows, quantization) VALUES (0, ?, ?, ?, ?)",
+            (self._dim, self._generation, self._rows, self.quantization)
+        )
+
+    def _requantize(self):
+        """(Re)build int8 codes of the current generation after the quantization setting changed"""
+        if self.quantization == "int8" and self._rows:
+            vectors = np.memmap(self._path("f32"), dtype=np.float32, mode="r", shape=(self._rows, self._dim))
+            for start in range(0, self._rows, SCAN_BLOCK_ROWS):
+                codes, scales = _quantize(np.asarray(vectors[start:start + SCAN_BLOCK_ROWS]))
+                _append_rows(self._path("i8"), codes, start * self._dim)
+                _append_rows(self._path("scale"), scales, start * 4)
+        conn = self._connect()
+        try:
+            with conn:
+                self._write_state(conn)
+        finally:
+            conn.close()
+
+    def _import_legacy(self):
+        state_file = f"{self._prefix}.mmap.json"
+        if os.path.exists(state_file):
+            self._import_state_file(state_file)
+        else:
+            self._import_nano()
+
+    def _import_state_file(self, state_file: str):
+        """Move ids and metadata of an earlier version's JSON state into the database"""
+        with open(state_file, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        if state["dim"] != self._dim:
+            raise ValueError(f"{state_file} holds {state['dim']}-dimensional vectors, expected {self._dim}")
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO vector_rows (generation, row_index, doc_id) VALUES (?, ?, ?)",
+                    [(state["generation"], row, doc_id) for row, doc_id in enumerate(state["ids"])]
+                )
+                conn.executemany(
+                    "INSERT OR REPLACE INTO meta (doc_id, meta) VALUES (?, ?)",
+                    [(doc_id, json.dumps(meta, ensure_ascii=False)) for doc_id, meta in state["meta"].items()]
+                )
+                conn.execute(
+                    "INSERT OR REPLACE INTO state (id, dim, generation, rows, quantization) VALUES (0, ?, ?, ?, ?)",
+                    (state["dim"], state["generation"], state["rows"], state.get("quantization", "none"))
+                )
+        finally:
+            conn.close()
+        os.remove(state_file)
+        print(f"[VECTOR STORAGE] Moved ids and metadata of {state['rows']} rows of {self.namespace} into {os.path.basename(self._db_file)}")
+        self._load()
+
+    def _import_nano(self):
+        legacy = f"{self._prefix}.json"
+        if not os.path.exists(legacy):
+            return
+        with open(legacy, "r", encoding="utf-8") as f:
+            storage = json.load(f)
+        if not storage.get("data"):
+            return
+        matrix = np.frombuffer(base64.b64decode(storage["matrix"]), dtype=np.float32).reshape(-1, self._dim)
+        for row, data in enumerate(storage["data"]):
+            self._changes[data["__id__"]] = {k: v for k, v in data.items() if k != "__id__"}
+            self._pending[data["__id__"]] = matrix[row]
+        self._dirty = True
+        self._save()
+        print(f"[VECTOR STORAGE] Imported {len(storage['data'])} vectors of {self.namespace} from {os.path.basename(legacy)}")
+
+    def _save(self):
+        if not self._dirty:
+            return
+        retired = None
+        killed_generation = self._generation
+        dead = self._rows - int(self._live.sum())
+        if dead and dead > COMPACT_RATIO * (self._rows + len(self._pending)):
+            retired = self._generation
+            added = self._compact()
+        else:
+            added = self._append_pending()
+
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany(
+                    "UPDATE vector_rows SET doc_id = NULL WHERE generation = ? AND row_index = ?",
+                    [(killed_generation, row) for row in self._killed]
+                )
+                if retired is not None:
+                    conn.execute("DELETE FROM vector_rows WHERE generation < ?", (retired,))
+                conn.executemany(
+                    "INSERT OR REPLACE INTO vector_rows (generation, row_index, doc_id) VALUES (?, ?, ?)",
+                    [(self._generation, row, doc_id) for row, doc_id in added]
+                )
+                conn.executemany(
+                    "DELETE FROM meta WHERE doc_id = ?",
+                    [(doc_id,) for doc_id, meta in self._changes.items() if meta is None]
+                )
+                conn.executemany(
+                    "INSERT OR REPLACE INTO meta (doc_id, meta) VALUES (?, ?)",
+                    [
+                        (doc_id, json.dumps(meta, ensure_ascii=False))
+                        for doc_id, meta in self._changes.items() if meta is not None
+                    ]
+                )
+                self._write_state(conn)
+        finally:
+            conn.close()
+        self._killed, self._changes = set(), {}
+        self._map()
+        if retired is not None:
+            # Other workers keep reading the old files through their open mappings until they reload
+            self._remove_generation(retired)
+            print(f"[VECTOR STORAGE] Compacted {self.namespace}: {self._rows} live rows in generation {self._generation}")
+        self._dirty = False
+
+    def _append_pending(self) -> List[tuple]:
+        """
+        Write pending vectors after the stored rows; they become valid once the state
+        is committed. Returns the (row, doc_id) pairs added.
+        """
+        if not self._pending:
+            return []
+        ids = list(self._pending)
+        vectors = np.vstack([self._pending[doc_id] for doc_id in ids]).astype(np.float32)
+        _append_rows(self._path("f32"), vectors, self._rows * self._dim * 4)
+        if self.quantization == "int8":
+            codes, scales = _quantize(vectors)
+            _append_rows(self._path("i8"), codes, self._rows * self._dim)
+            _append_rows(self._path("scale"), scales, self._rows * 4)
+        self._on_rows_added(vectors, self._rows)
+        added = [(self._rows + offset, doc_id) for offset, doc_id in enumerate(ids)]
+        self._live = np.concatenate([self._live, np.ones(len(ids), dtype=bool)])
+        self._rows += len(ids)
+        self._pending = {}
+        return added
+
+    def _compact(self) -> List[tuple]:
+        """Copy live rows, then pending vectors, into files of the next generation"""
+        old_vectors, old_live = self._vectors, self._live
+        conn = self._connect()
+        try:
+            stored = conn.execute(
+                "SELECT row_index, doc_id FROM vector_rows WHERE generation = ? AND doc_id IS NOT NULL ORDER BY row_index",
+                (self._generation,)
+            ).fetchall()
+        finally:
+            conn.close()
+        keep = [(row, doc_id) for row, doc_id in stored if row < len(old_live) and old_live[row]]
+        pending = self._pending
+        self._generation += 1
+        self._remove_generation(self._generation)  # leftovers of an interrupted compaction
+        self._rows = 0
+        self._live = np.zeros(0, dtype=bool)
+        self._on_compacted()
+        added = []
+        for block in _batches(keep, SCAN_BLOCK_ROWS):
+            rows = np.array([row for row, _ in block], dtype=np.int64)
+            self._pending = dict(zip([doc_id for _, doc_id in block], np.asarray(old_vectors[rows])))
+            added += self._append_pending()
+        self._pending = pending
+        return added + self._append_pending()
+
+    def _remove_generation(self, generation: int):
+        for kind in self._GENERATION_FILES:
+            path = self._path(kind, generation)
+            if os.path.exists(path):
+                os.remove(path)
+
+    # Hooks for indexes kept next to the vector files
+    def _on_rows_added(self, vectors: np.ndarray, first_row: int):
+        """Stored rows first_row.. now hold vectors"""
+
+    def _on_compacted(self):
+        """Row numbers are about to be reassigned from 0"""
+
+    # ——— Ids and metadata ———
+
+    def _stored_rows(self, doc_ids: List[str]) -> Dict[str, int]:
+        """Live stored row of each of the given ids that has one"""
+        found = {}
+        if not self._rows:
+            return found
+        conn = self._connect()
+        try:
+            for batch in _batches(doc_ids):
+                found.update(conn.execute(
+                    f"SELECT doc_id, row_index FROM vector_rows WHERE generation = ? AND doc_id IN ({','.join('?' * len(batch))})",
+                    (self._generation, *batch)
+                ).fetchall())
+        finally:
+            conn.close()
+        return {doc_id: row for doc_id, row in found.items() if row < self._rows and self._live[row]}
+
+    def _row_doc_ids(self, generation: int, rows: List[int]) -> Dict[int, str]:
+        """Ids stored at the given rows of a generation"""
+        found = {}
+        conn = self._connect()
+        try:
+            for batch in _batches(rows):
+                found.update(conn.execute(
+                    f"SELECT row_index, doc_id FROM vector_rows WHERE generation = ? AND doc_id IS NOT NULL "
+                    f"AND row_index IN ({','.join('?' * len(batch))})",
+                    (generation, *batch)
+                ).fetchall())
+        finally:
+            conn.close()
+        if generation == self._generation:
+            # Deleted since the search started but not saved yet
+            found = {row: doc_id for row, doc_id in found.items() if self._live[row]}
+        return found
+
+    def _metas(self, doc_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Metadata of the given ids that exist, unsaved changes included"""
+        found, stored = {}, []
+        for doc_id in dict.fromkeys(doc_ids):
+            if doc_id in self._changes:
+                if self._changes[doc_id] is not None:
+                    found[doc_id] = self._changes[doc_id]
+            else:
+                stored.append(doc_id)
+        if stored:
+            conn = self._connect()
+            try:
+                for batch in _batches(stored):
+                    found.update(
+                        (doc_id, json.loads(meta)) for doc_id, meta in conn.execute(
+                            f"SELECT doc_id, meta FROM meta WHERE doc_id IN ({','.join('?' * len(batch))})", batch
+                        )
+                    )
+            finally:
+                conn.close()
+        return found
+
+    def _all_metas(self) -> Dict[str, Dict[str, Any]]:
+        conn = self._connect()
+        try:
+            found = {
+                doc_id: json.loads(meta) for doc_id, meta in conn.execute("SELECT doc_id, meta FROM meta")
+                if doc_id not in self._changes
+            }
+        finally:
+            conn.close()
+        found.update((doc_id, meta) for doc_id, meta in self._changes.items() if meta is not None)
+        return found
+
+    # ——— Search ———
+
+    def _snapshot(self) -> dict:
+        """Everything a search needs, safe to use from a worker thread while upserts continue"""
+        pending_ids = list(self._pending)
+        return {
+            "generation": self._generation,
+            "vectors": self._vectors,
+            "codes": self._codes,
+            "scales": self._scales,
+            "live": self._live.copy(),
+            "pending_ids": pending_ids,
+            "pending": np.vstack([self._pending[doc_id] for doc_id in pending_ids]) if pending_ids else None,
+        }
+
+    def _score_rows(self, snapshot: dict, query: np.ndarray, rows: np.ndarray = None) -> np.ndarray:
+        """Approximate scores (int8 codes) or exact ones (float vectors) of stored rows, all rows by default"""
+        source = snapshot["codes"] if snapshot["codes"] is not None else snapshot["vectors"]
+        total = len(source) if rows is None else len(rows)
+        scores = np.empty(total, dtype=np.float32)
+        for start in range(0, total, SCAN_BLOCK_ROWS):
+            end = min(start + SCAN_BLOCK_ROWS, total)
+            picked = slice(start, end) if rows is None else rows[start:end]
+            block = np.asarray(source[picked], dtype=np.float32) @ query
+            if snapshot["codes"] is not None:
+                block *= snapshot["scales"][picked]
+            scores[start:end] = block
+        return scores
+
+    def _candidates(self, snapshot: dict, query: np.ndarray, count: int) -> np.ndarray:
+        """Stored rows worth rescoring exactly: here the best count by a full scan"""
+        scores = self._score_rows(snapshot, query)
+        scores[~snapshot["live"]] = -np.inf
+        return _top(scores, min(count, int(snapshot["live"].sum())))
+
+    def _search(self, snapshot: dict, query: np.ndarray, top_k: int) -> List[tuple]:
+        """Best (score, stored row or pending id) pairs"""
+        found = []
+        if snapshot["vectors"] is not None and snapshot["live"].any():
+            count = top_k * self.rescore_multiplier if snapshot["codes"] is not None else top_k
+            rows = np.sort(self._candidates(snapshot, query, count))
+            if len(rows):
+                exact = np.asarray(snapshot["vectors"][rows], dtype=np.float32) @ query
+                found += [(float(score), int(row)) for score, row in zip(exact, rows)]
+        if snapshot["pending"] is not None:
+            found += [(float(score), doc_id) for score, doc_id in zip(snapshot["pending"] @ query, snapshot["pending_ids"])]
+        found.sort(key=lambda item: item[0], reverse=True)
+        return [(score, key) for score, key in found[:top_k] if score > self.cosine_better_than_threshold]
+
+    # ——— Storage interface ———
+
+    async def initialize(self):
+        self.storage_updated = await get_update_flag(self.namespace)
+        self._storage_lock = get_storage_lock(enable_logging=False)
+
+    async def _refresh(self):
+        """Reload when another process saved this namespace since we last read it"""
+        async with self._storage_lock:
+            if self.storage_updated.value:
+                print(f"[VECTOR STORAGE] Process {os.getpid()} reloading {self.namespace} after an update by another process")
+                self._load()
+                self.storage_updated.value = False
+
+    def _record(self, doc_id: str, meta: Dict[str, Any], score: float = None) -> Dict[str, Any]:
+        record = {**meta, "__id__": doc_id, "id": doc_id, "created_at": meta.get("__created_at__")}
+        if score is not None:
+            record.update({"__metrics__": score, "distance": score})
+        return record
+
+    def _forget(self, doc_ids: List[str]):
+        for doc_id, row in self._stored_rows(doc_ids).items():
+            self._live[row] = False
+            self._killed.add(row)
+        for doc_id in doc_ids:
+            self._pending.pop(doc_id, None)
+            self._changes[doc_id] = None
+        self._dirty = True
+
+    async def upsert(self, data: dict[str, dict[str, Any]]) -> None:
+        if not data:
+            return
+        current_time = int(time.time())
+        contents = [value["content"] for value in data.values()]
+        batches = [contents[i:i + self._max_batch_size] for i in range(0, len(contents), self._max_batch_size)]
+        # Embed outside the lock, as the default storage does
+        embeddings = np.concatenate(await asyncio.gather(*(self.embedding_func(batch) for batch in batches)))
+        if len(embeddings) != len(data):
+            print(f"[VECTOR STORAGE] Embedding count mismatch for {self.namespace}: {len(embeddings)} != {len(data)}")
+            return
+
+        await self._refresh()
+        self._forget(list(data))
+        for (doc_id, value), vector in zip(data.items(), _normalize(embeddings)):
+            self._changes[doc_id] = {
+                "__created_at__": current_time,
+                **{key: val for key, val in value.items() if key in self.meta_fields},
+            }
+            self._pending[doc_id] = vector
+
+    async def query(self, query: str, top_k: int, ids: list[str] | None = None) -> list[dict[str, Any]]:
+        embedding = await self.embedding_func([query], _priority=5)
+        await self._refresh()
+        snapshot = self._snapshot()
+        found = await asyncio.to_thread(self._search, snapshot, _normalize(embedding[0]), top_k)
+        row_ids = self._row_doc_ids(snapshot["generation"], [key for _, key in found if isinstance(key, int)])
+        named = [(score, row_ids.get(key) if isinstance(key, int) else key) for score, key in found]
+        metas = self._metas([doc_id for _, doc_id in named if doc_id is not None])
+        return [self._record(doc_id, metas[doc_id], score) for score, doc_id in named if doc_id in metas]
+
+    @property
+    async def client_storage(self):
+        # LightRAG's document deletion scans all metadata through this
+        await self._refresh()
+        return {"data": [{**meta, "__id__": doc_id} for doc_id, meta in self._all_metas().items()]}
+
+    async def delete(self, ids: list[str]):
+        await self._refresh()
+        self._forget(list(ids))
+
+    async def delete_entity(self, entity_name: str) -> None:
+        await self.delete([compute_mdhash_id(entity_name, prefix="ent-")])
+
+    async def delete_entity_relation(self, entity_name: str) -> None:
+        await self._refresh()
+        conn = self._connect()
+        try:
+            doomed = {
+                doc_id for (doc_id,) in conn.execute(
+                    "SELECT doc_id FROM meta WHERE json_extract(meta, '$.src_id') = ?1 OR json_extract(meta, '$.tgt_id') = ?1",
+                    (entity_name,)
+                )
+                if doc_id not in self._changes
+            }
+        finally:
+            conn.close()
+        doomed.update(
+            doc_id for doc_id, meta in self._changes.items()
+            if meta is not None and (meta.get("src_id") == entity_name or meta.get("tgt_id") == entity_name)
+        )
+        if doomed:
+            self._forget(list(doomed))
+
+    async def get_by_id(self, id: str) -> dict[str, Any] | None:
+        await self._refresh()
+        meta = self._metas([id]).get(id)
+        return self._record(id, meta) if meta is not None else None
+
+    async def get_by_ids(self, ids: list[str]) -> list[dict[str, Any]]:
+        await self._refresh()
+        metas = self._metas(ids)
+        return [self._record(doc_id, metas[doc_id]) for doc_id in ids if doc_id in metas]
+
+    async def index_done_callback(self) -> bool:
+        async with self._storage_lock:
+            if self.storage_updated.value:
+                print(f"[VECTOR STORAGE] {self.namespace} was saved by another process, reloading instead of saving")
+                self._load()
+                self.storage_updated.value = False
+                return False
+            try:
+                self._save()
+            except (OSError, sqlite3.Error) as e:
+                print(f"[VECTOR STORAGE] Saving {self.namespace} failed: {str(e)}")
+                return False
+            await set_all_update_flags(self.namespace)
+            self.storage_updated.value = False
+            return True
+
+    async def drop(self) -> dict[str, str]:
+        try:
+            async with self._storage_lock:
+                # Includes a NanoVectorDBStorage file, which would otherwise be imported again
+                directory = os.path.dirname(self._prefix)
+                name = os.path.basename(self._prefix) + "."
+                for filename in os.listdir(directory):
+                    if filename.startswith(name):
+                        os.remove(os.path.join(directory, filename))
+                self._ready = False
+                self._reset()
+                await set_all_update_flags(self.namespace)
+                self.storage_updated.value = False
+            return {"status": "success", "message": "data dropped"}
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+
+
+# ——— Registration ———
+
+def register_vector_storage(name: str, import_path: str):
+    """Make a BaseVectorStorage class selectable as LightRAG(vector_storage=name)"""
+    STORAGES[name] = import_path
+    implementations = STORAGE_IMPLEMENTATIONS["VECTOR_STORAGE"]["implementations"]
+    if name not in implementations:
+        implementations.append(name)
+    STORAGE_ENV_REQUIREMENTS.setdefault(name, [])
+
+def resolve_vector_storage(spec: str) -> str:
+    """
+    Storage name to pass to LightRAG for a VECTOR_STORAGE setting: a registered name
+    (LightRAG's own or one of ours) or "package.module.ClassName" of any other
+    BaseVectorStorage, which is registered on the way.
+    """
+    if spec in STORAGES:
+        return spec
+    module_path, _, class_name = spec.rpartition(".")
+    if not module_path:
+        raise ValueError(f"Unknown vector storage '{spec}'")
+    if not issubclass(getattr(importlib.import_module(module_path), class_name), BaseVectorStorage):
+        raise ValueError(f"{spec} is not a BaseVectorStorage")
+    register_vector_storage(class_name, module_path)
+    return class_name
+
+
+register_vector_storage("MmapVectorDBStorage", __name__)
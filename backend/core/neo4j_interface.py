@@ -1,4 +1,6 @@
+
 import os
+from collections import defaultdict
 from neo4j import GraphDatabase
 from dotenv import load_dotenv
 
@@ -6,6 +8,19 @@ load_dotenv()  # will read NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD from your shell
 
 _driver = None
 
+# Every pushed node carries this label so MERGE/MATCH on id always hits the constraint index
+BASE_LABEL = "Entity"
+WRITE_BATCH_SIZE = int(os.getenv("NEO4J_WRITE_BATCH_SIZE", "1000"))
+
+# Labels whose id constraint/index has already been created in this process
+_indexed_labels: set[str] = set()
+# Whether nodes pushed before BASE_LABEL existed have been labelled in this process
+_base_label_migrated = False
+# Ids held by more than one of those nodes, found by the last migration attempt
+_base_label_conflicts: list[str] = []
+# Conflicting ids named in the error raised for them
+CONFLICT_SAMPLE = 20
+
 def init_neo4j():
     global _driver
     uri = os.getenv("NEO4J_URI", "bolt://localhost:7687")
@@ -17,32 +32,192 @@ def close_neo4j():
     global _driver
     if _driver:
         _driver.close()
+        _driver = None
+    _indexed_labels.clear()
+    global _base_label_migrated
+    _base_label_migrated = False
+    _base_label_conflicts.clear()
+
+def _get_driver():
+    if _driver is None:
+        init_neo4j()
+    return _driver
+
+def _quote(name: str) -> str:
+    """Backtick-quote a label or relationship type for interpolation into Cypher"""
+    return "`" + str(name).replace("`", "``") + "`"
+
+def _batches(rows: list, size: int = WRITE_BATCH_SIZE):
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
+def _run_batch(tx, query: str, rows: list[dict], bucket: str = None):
+    tx.run(query, rows=rows, bucket=bucket).consume()
+
+# Bucket membership: elements pushed from a bucket record it in a `buckets` list
+# so an incremental delete from one bucket never removes what another still has.
+_ADD_BUCKET = (
+    "SET {var}.buckets = CASE WHEN $bucket IN coalesce({var}.buckets, []) "
+    "THEN {var}.buckets ELSE coalesce({var}.buckets, []) + $bucket END"
+)
+_REMOVE_BUCKET = "SET {var}.buckets = [b IN coalesce({var}.buckets, []) WHERE b <> $bucket]"
+
+def migrate_base_label(strict: bool = True):
+    """
+    Add BASE_LABEL to nodes pushed by the writer that predates it, once per process.
+    Without it, MERGE on BASE_LABEL would not find them and create duplicates.
+
+    That writer MERGEd on id under each node's entity labels, and every node it
+    pushed carries LightRAG's entity_type property; only such nodes are labelled,
+    one label at a time. The same id may exist under two label sets: those nodes
+    are left unlabelled and, when strict, reported with an error instead of
+    breaking the id constraint. Non-strict callers (reads) only log them.
+    """
+    global _base_label_migrated
+    if _base_label_migrated or (_base_label_conflicts and not strict):
+        return
+    entity = _quote(BASE_LABEL)
+    conflicts, labelled = set(), 0
+    with _get_driver().session() as sess:
+        labels = [record["label"] for record in sess.run("CALL db.labels() YIELD label RETURN label")]
+        for label in labels:
+            if label == BASE_LABEL:
+                continue
+            legacy = f"MATCH (n:{_quote(label)}) WHERE n.id IS NOT NULL AND n.entity_type IS NOT NULL AND NOT n:{entity} "
+            conflicts.update(record["id"] for record in sess.run(
+                legacy
+                + "WITH n.id AS id, count(n) AS copies "
+                f"OPTIONAL MATCH (e:{entity} {{id: id}}) "
+                "WITH id, copies + count(e) AS total WHERE total > 1 RETURN id"
+            ))
+            query = legacy + f"AND NOT n.id IN $conflicts WITH n LIMIT $limit SET n:{entity} RETURN count(n) AS labelled"
+            while True:
+                count = sess.run(query, conflicts=list(conflicts), limit=WRITE_BATCH_SIZE).single()["labelled"]
+                labelled += count
+                if count < WRITE_BATCH_SIZE:
+                    break
+    if labelled:
+        print(f"[NEO4J] Labelled {labelled} existing nodes as {BASE_LABEL}")
+    _base_label_conflicts[:] = sorted(conflicts)
+    if conflicts:
+        sample = ", ".join(_base_label_conflicts[:CONFLICT_SAMPLE])
+        message = (
+            f"{len(conflicts)} node id(s) exist under more than one label set from before {BASE_LABEL} "
+            f"was introduced ({sample}{', ...' if len(conflicts) > CONFLICT_SAMPLE else ''}); "
+            f"merge or delete the extra nodes in Neo4j, then push again"
+        )
+        if strict:
+            raise RuntimeError(message)
+        print(f"[NEO4J] {message}")
+        return
+    _base_label_migrated = True
+
+def ensure_indexes(labels: set[str]):
+    """Create the id uniqueness constraint on BASE_LABEL and id indexes on other labels"""
+    # Raises for conflicting legacy nodes before the constraint would fail on them
+    migrate_base_label()
+    missing = ({BASE_LABEL} | set(labels)) - _indexed_labels
+    if not missing:
+        return
+    with _get_driver().session() as sess:
+        for label in sorted(missing):
+            if label == BASE_LABEL:
+                sess.run(f"CREATE CONSTRAINT IF NOT EXISTS FOR (n:{_quote(label)}) REQUIRE n.id IS UNIQUE").consume()
+            else:
+                sess.run(f"CREATE INDEX IF NOT EXISTS FOR (n:{_quote(label)}) ON (n.id)").consume()
+    _indexed_labels.update(missing)
 
-def write_graph(nodes: list[dict], relations: list[dict]):
+def _group_relations(relations: list[dict]) -> dict[str, list[dict]]:
+    rels_by_type: dict[str, list[dict]] = defaultdict(list)
+    for r in relations:
+        rels_by_type[r.get("type") or "RELATED"].append(
+            {"start": r["start"], "end": r["end"], "props": r.get("props", {})}
+        )
+    return rels_by_type
+
+def write_graph(nodes: list[dict], relations: list[dict], bucket: str = None):
     """
     nodes: list of {"id": str, "labels": [str], "props": {...}}
     relations: list of {"start": str, "end": str, "type": str, "props": {...}}
+    bucket: optional source bucket, recorded in each element's `buckets` list
+
+    Nodes are grouped by label set and relations by type, then written as
+    UNWIND batches of WRITE_BATCH_SIZE rows, each in its own write transaction.
     """
-    with _driver.session() as sess:
-        # merge nodes
-        for n in nodes:
-            labels = ":" + ":".join(n["labels"])
-            sess.run(
-                f"MERGE (a{labels} {{id:$id}}) "
-                "SET a += $props",
-                id=n["id"], props=n["props"]
+    nodes_by_labels: dict[tuple, list[dict]] = defaultdict(list)
+    for n in nodes:
+        labels = tuple(sorted({l for l in n.get("labels", []) if l and l != BASE_LABEL}))
+        nodes_by_labels[labels].append({"id": n["id"], "props": n.get("props", {})})
+
+    rels_by_type = _group_relations(relations)
+
+    ensure_indexes({l for labels in nodes_by_labels for l in labels})
+
+    with _get_driver().session() as sess:
+        # merge nodes (always on BASE_LABEL so the id constraint drives the lookup)
+        for labels, rows in nodes_by_labels.items():
+            extra_labels = "".join(f":{_quote(l)}" for l in labels)
+            query = (
+                "UNWIND $rows AS row "
+                f"MERGE (a:{_quote(BASE_LABEL)} {{id: row.id}}) "
+                "SET a += row.props"
+                + (f" SET a{extra_labels}" if extra_labels else "")
+                + (" " + _ADD_BUCKET.format(var="a") if bucket else "")
             )
+            for batch in _batches(rows):
+                sess.execute_write(_run_batch, query, batch, bucket)
+
         # merge relations
-        for r in relations:
-            sess.run(
-                "MATCH (a {id:$start}), (b {id:$end}) "
-                f"MERGE (a)-[rel:{r['type']}]->(b) "
-                "SET rel += $props",
-                start=r["start"], end=r["end"], props=r["props"]
+        for rel_type, rows in rels_by_type.items():
+            query = (
+                "UNWIND $rows AS row "
+                f"MATCH (a:{_quote(BASE_LABEL)} {{id: row.start}}) "
+                f"MATCH (b:{_quote(BASE_LABEL)} {{id: row.end}}) "
+                f"MERGE (a)-[rel:{_quote(rel_type)}]->(b) "
+                "SET rel += row.props"
+                + (" " + _ADD_BUCKET.format(var="rel") if bucket else "")
             )
+            for batch in _batches(rows):
+                sess.execute_write(_run_batch, query, batch, bucket)
+
+    return {"nodes": len(nodes), "relations": len(relations)}
+
+def delete_relations(relations: list[dict], bucket: str = None):
+    """
+    Remove relations (matched in either direction by endpoints and type).
+    With a bucket, the bucket is dropped from the relation's membership and the
+    relation is deleted only once no bucket references it any more.
+    """
+    migrate_base_label()
+    with _get_driver().session() as sess:
+        for rel_type, rows in _group_relations(relations).items():
+            query = (
+                "UNWIND $rows AS row "
+                f"MATCH (a:{_quote(BASE_LABEL)} {{id: row.start}})-[rel:{_quote(rel_type)}]-(b:{_quote(BASE_LABEL)} {{id: row.end}}) "
+                + (_REMOVE_BUCKET.format(var="rel") + " WITH rel WHERE size(rel.buckets) = 0 " if bucket else "")
+                + "DELETE rel"
+            )
+            for batch in _batches(rows):
+                sess.execute_write(_run_batch, query, batch, bucket)
+    return {"relations": len(relations)}
+
+def delete_nodes(node_ids: list[str], bucket: str = None):
+    """Remove nodes (and their relations), honouring bucket membership like delete_relations"""
+    rows = [{"id": node_id} for node_id in node_ids]
+    query = (
+        "UNWIND $rows AS row "
+        f"MATCH (a:{_quote(BASE_LABEL)} {{id: row.id}}) "
+        + (_REMOVE_BUCKET.format(var="a") + " WITH a WHERE size(a.buckets) = 0 " if bucket else "")
+        + "DETACH DELETE a"
+    )
+    migrate_base_label()
+    with _get_driver().session() as sess:
+        for batch in _batches(rows):
+            sess.execute_write(_run_batch, query, batch, bucket)
+    return {"nodes": len(node_ids)}
 
 def fetch_graph(limit=100):
-    with _driver.session() as sess:
+    with _get_driver().session() as sess:
         result = sess.run(
             "MATCH (a)-[r]->(b) "
             "RETURN a.id AS from, type(r) AS type, b.id AS to "
@@ -50,4 +225,3 @@ def fetch_graph(limit=100):
             l=limit
         )
         return [dict(record) for record in result]
-
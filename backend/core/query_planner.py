@@ -0,0 +1,160 @@
+# backend/core/query_planner.py
+
+import os
+import time
+from collections import deque
+from typing import Dict, Any, Optional
+
+# Modes from richest to cheapest. naive is vector search over chunks only (no keyword
+# LLM call); local/global walk the entity/relationship graph; hybrid does both.
+MODE_PREFERENCE = ("hybrid", "local", "global", "naive")
+QUERY_MODES = MODE_PREFERENCE + ("auto",)
+
+# Latency assumed for a mode until a bucket has LATENCY_MIN_SAMPLES measurements of it,
+# for a bucket of PRIOR_REFERENCE_CHUNKS chunks (scaled up for larger buckets)
+PRIOR_SECONDS = {"naive": 0.6, "local": 2.5, "global": 2.5, "hybrid": 4.0}
+PRIOR_REFERENCE_CHUNKS = 1000
+LATENCY_MIN_SAMPLES = int(os.getenv("QUERY_LATENCY_MIN_SAMPLES", "5"))
+LATENCY_WINDOW = int(os.getenv("QUERY_LATENCY_WINDOW", "50"))
+# Estimate a mode by this percentile of its recent latencies, so a plan usually fits its budget
+LATENCY_PERCENTILE = float(os.getenv("QUERY_LATENCY_PERCENTILE", "90"))
+
+# top_k grows with the square root of the bucket's chunk count within these bounds
+TOP_K_MIN = int(os.getenv("QUERY_TOP_K_MIN", "5"))
+TOP_K_MAX = int(os.getenv("QUERY_TOP_K_MAX", "40"))
+
+
+class LatencyHistory:
+    """Sliding window of query latencies for one bucket, mode and kind of query"""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self.samples: deque = deque(maxlen=window)
+
+    def record(self, seconds: float):
+        self.samples.append(seconds)
+
+    def percentile(self, p: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, max(0, int(round(p / 100.0 * len(ordered))) - 1))
+        return ordered[index]
+
+
+# In-memory caches
+# (bucket, mode, only_need_context) -> latencies; context-only retrieval skips the
+# answer LLM call, so it is much faster than a full query and is measured apart
+_history: Dict[tuple, LatencyHistory] = {}
+
+
+def _history_for(bucket: str, mode: str, only_need_context: bool = False) -> LatencyHistory:
+    key = (bucket, mode, bool(only_need_context))
+    if key not in _history:
+        _history[key] = LatencyHistory()
+    return _history[key]
+
+def _estimate(bucket: str, mode: str, chunks: int, only_need_context: bool = False) -> Dict[str, Any]:
+    history = _history_for(bucket, mode, only_need_context)
+    if len(history.samples) >= LATENCY_MIN_SAMPLES:
+        return {"seconds": history.percentile(LATENCY_PERCENTILE), "source": "measured"}
+    scale = max(1.0, (chunks / PRIOR_REFERENCE_CHUNKS) ** 0.5)
+    return {"seconds": PRIOR_SECONDS.get(mode, PRIOR_SECONDS["hybrid"]) * scale, "source": "prior"}
+
+def _top_k_for(chunks: int) -> int:
+    return max(TOP_K_MIN, min(TOP_K_MAX, int(round(chunks ** 0.5))))
+
+
+# ——— Public API ———
+
+def plan_query(bucket: str, chunks: int, latency_budget: float = None, mode: str = "auto",
+               top_k: int = None, only_need_context: bool = False) -> Dict[str, Any]:
+    """
+    Choose query mode and top_k for one bucket query.
+
+    An explicit mode (anything but "auto") is kept. Otherwise the richest mode whose
+    estimated latency fits latency_budget (seconds) is chosen; without a budget that
+    is hybrid. If nothing fits, the fastest estimate wins. Estimates come from the
+    bucket's measured latencies per mode (of context-only retrievals when
+    only_need_context, of full answer queries otherwise), or size-scaled priors until
+    there are enough. With a budget, top_k follows the bucket size and is halved when
+    the chosen mode leaves little slack; without one (and no explicit top_k) it is
+    None, leaving LightRAG's default.
+
+    Returns {"mode", "top_k", "estimated_seconds", "estimate_source", "budget_seconds", "chunks", "reason"}.
+    """
+    estimates = {candidate: _estimate(bucket, candidate, chunks, only_need_context) for candidate in MODE_PREFERENCE}
+    size_top_k = _top_k_for(chunks)
+
+    if mode and mode != "auto":
+        chosen, reason = mode, "requested"
+    elif not latency_budget or latency_budget <= 0:
+        chosen, reason = "hybrid", "no latency budget"
+    else:
+        fitting = [candidate for candidate in MODE_PREFERENCE if estimates[candidate]["seconds"] <= latency_budget]
+        if fitting:
+            chosen, reason = fitting[0], f"richest mode within {latency_budget:.1f}s"
+        else:
+            chosen = min(MODE_PREFERENCE, key=lambda candidate: estimates[candidate]["seconds"])
+            reason = f"no mode fits {latency_budget:.1f}s, using the fastest"
+
+    estimate = estimates.get(chosen) or _estimate(bucket, chosen, chunks, only_need_context)
+    if top_k:
+        chosen_top_k = top_k
+    elif not latency_budget or latency_budget <= 0:
+        chosen_top_k = None
+    elif estimate["seconds"] * 1.5 > latency_budget:
+        chosen_top_k = max(TOP_K_MIN, size_top_k // 2)
+    else:
+        chosen_top_k = size_top_k
+
+    return {
+        "mode": chosen,
+        "top_k": chosen_top_k,
+        "estimated_seconds": round(estimate["seconds"], 3),
+        "estimate_source": estimate["source"],
+        "budget_seconds": latency_budget,
+        "chunks": chunks,
+        "reason": reason,
+    }
+
+def record_latency(bucket: str, mode: str, seconds: float, only_need_context: bool = False):
+    _history_for(bucket, mode, only_need_context).record(seconds)
+
+def forget_bucket_latency(bucket: str):
+    for key in [key for key in _history if key[0] == bucket]:
+        _history.pop(key, None)
+
+def bucket_latency_stats(bucket: str) -> Dict[str, Any]:
+    """Recent latencies per mode, for full answer queries and context-only retrievals"""
+    stats = {"answer": {}, "context": {}}
+    for mode in MODE_PREFERENCE:
+        for kind, only_need_context in (("answer", False), ("context", True)):
+            history = _history.get((bucket, mode, only_need_context))
+            if history and history.samples:
+                stats[kind][mode] = {
+                    "samples": len(history.samples),
+                    "p50": round(history.percentile(50), 3),
+                    "p90": round(history.percentile(90), 3),
+                    "last": round(history.samples[-1], 3),
+                }
+    return stats
+
+class QueryTimer:
+    """Context manager measuring a query and recording it against (bucket, mode, only_need_context)"""
+
+    def __init__(self, bucket: str, mode: str, only_need_context: bool = False):
+        self.bucket = bucket
+        self.mode = mode
+        self.only_need_context = only_need_context
+        self.seconds = None
+
+    def __enter__(self):
+        self.started = time.monotonic()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.seconds = time.monotonic() - self.started
+        # Failed or cancelled queries say little about how long a successful one takes
+        if exc_type is None:
+            record_latency(self.bucket, self.mode, self.seconds, self.only_need_context)
+        return False
@@ -0,0 +1,140 @@
+# backend/core/request_context.py
+
+import os
+import time
+import asyncio
+import contextvars
+from typing import Any, Callable, Awaitable, Optional
+
+# Wall-clock budget for one generation request; clients may ask for less with the
+# X-Request-Deadline header (seconds) but never for more. 0 disables the deadline.
+REQUEST_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_SECONDS", "300"))
+# Whole-chapter generation runs one write per section, so it gets a larger budget
+CHAPTER_DEADLINE_SECONDS = float(os.getenv("CHAPTER_DEADLINE_SECONDS", "1800"))
+# How often the client connection is checked while the request is being worked on
+DISCONNECT_POLL_SECONDS = float(os.getenv("DISCONNECT_POLL_SECONDS", "0.5"))
+DEADLINE_HEADER = "x-request-deadline"
+
+
+class RequestAbandoned(Exception):
+    """Work for a request was cancelled because the client left or its deadline passed"""
+
+    def __init__(self, reason: str, elapsed: float):
+        super().__init__(f"Request abandoned ({reason}) after {elapsed:.1f}s")
+        self.reason = reason  # "client_disconnected" | "deadline_exceeded" | "cancelled"
+        self.elapsed = elapsed
+        # 499 (client closed request) is never seen by the client; it is for logs/metrics
+        self.status_code = 499 if reason == "client_disconnected" else 504
+
+
+class RequestScope:
+    """Deadline of the request whose work is running in the current task"""
+
+    def __init__(self, label: str, deadline_seconds: Optional[float]):
+        self.label = label
+        self.started = time.monotonic()
+        self.deadline = self.started + deadline_seconds if deadline_seconds else None
+
+    def remaining(self) -> Optional[float]:
+        return None if self.deadline is None else self.deadline - time.monotonic()
+
+    def expired(self) -> bool:
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+
+# Scope of the request being served; inherited by tasks the work spawns
+_scope: contextvars.ContextVar[Optional[RequestScope]] = contextvars.ContextVar("request_scope", default=None)
+
+
+def _deadline_for(request, default_seconds: float) -> Optional[float]:
+    requested = request.headers.get(DEADLINE_HEADER) if request is not None else None
+    if requested:
+        try:
+            seconds = float(requested)
+            if seconds > 0:
+                return min(seconds, default_seconds) if default_seconds > 0 else seconds
+        except ValueError:
+            print(f"[REQUEST] Ignoring invalid {DEADLINE_HEADER} header: {requested!r}")
+    return default_seconds if default_seconds > 0 else None
+
+async def _watch_disconnect(request):
+    while not await request.is_disconnected():
+        await asyncio.sleep(DISCONNECT_POLL_SECONDS)
+
+
+# ——— Public API ———
+
+def check_deadline(stage: str = ""):
+    """
+    Checkpoint for long pipelines: cancel the current task once its request's
+    deadline has passed, so it stops before starting the next expensive step.
+
+    Raises CancelledError (not an Exception) so broad error handlers in the
+    pipeline do not swallow it. Does nothing outside a request scope, e.g. in work
+    shared through singleflight, which stops only once every waiting request has
+    been cancelled.
+    """
+    scope = _scope.get()
+    if scope is not None and scope.expired():
+        print(f"[REQUEST] {scope.label}: deadline exceeded{f' before {stage}' if stage else ''}, abandoning work")
+        raise asyncio.CancelledError("deadline_exceeded")
+
+def detached_context() -> contextvars.Context:
+    """
+    Copy of the current context without the request scope, for work shared by
+    several requests: each request enforces its own deadline while waiting on it.
+    """
+    context = contextvars.copy_context()
+    context.run(_scope.set, None)
+    return context
+
+def remaining_time() -> Optional[float]:
+    scope = _scope.get()
+    return scope.remaining() if scope is not None else None
+
+async def run_cancellable(request, work: Callable[[], Awaitable[Any]], label: str,
+                          deadline_seconds: float = None, cancel_on_disconnect: bool = True) -> Any:
+    """
+    Run work() for an HTTP request, cancelling it when the client disconnects or the
+    request's deadline passes. With cancel_on_disconnect=False only the deadline
+    cancels it (requests with an Idempotency-Key, whose retry attaches to the work).
+
+    Cancellation propagates through every await in the work (bucket queries, LLM
+    calls waiting on or holding gateway slots), so abandoned requests free their
+    capacity and never reach the point of saving a version.
+
+    Raises RequestAbandoned when the work was cancelled for either reason, or
+    cancelled by something else (reason "cancelled", reported as 504).
+    """
+    deadline = _deadline_for(request, REQUEST_DEADLINE_SECONDS if deadline_seconds is None else deadline_seconds)
+    scope = RequestScope(label, deadline)
+    token = _scope.set(scope)
+    try:
+        loop = asyncio.get_running_loop()
+        task = loop.create_task(work())
+        watcher = loop.create_task(_watch_disconnect(request)) if request is not None and cancel_on_disconnect else None
+    finally:
+        _scope.reset(token)
+
+    waiting = [task] + ([watcher] if watcher else [])
+    reason = None
+    try:
+        done, _ = await asyncio.wait(waiting, timeout=scope.remaining(), return_when=asyncio.FIRST_COMPLETED)
+        if task not in done:
+            reason = "client_disconnected" if watcher in done else "deadline_exceeded"
+            task.cancel()
+        elif task.cancelled():
+            reason = "deadline_exceeded" if scope.expired() else "cancelled"
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+    finally:
+        if watcher:
+            watcher.cancel()
+        await asyncio.gather(*waiting, return_exceptions=True)
+
+    if reason:
+        elapsed = time.monotonic() - scope.started
+        print(f"[REQUEST] {label}: {reason.replace('_', ' ')} after {elapsed:.1f}s, work cancelled")
+        raise RequestAbandoned(reason, elapsed)
+    return task.result()
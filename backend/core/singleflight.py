@@ -0,0 +1,88 @@
+# backend/core/singleflight.py
+
+import json
+import asyncio
+import hashlib
+from typing import Dict, Any, Callable, Awaitable
+
+from backend.core.request_context import detached_context
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls: the first caller for a key starts the work,
+    callers arriving while it runs wait for the same result instead of repeating it.
+
+    The shared work is cancelled only when every caller waiting on it has gone away.
+    It runs outside the first caller's request scope, so one caller's deadline never
+    cancels it for the others.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._waiters: Dict[str, int] = {}
+        self.stats = {"executions": 0, "coalesced": 0, "failed": 0, "abandoned": 0}
+
+    def _forget(self, key: str, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+            self._waiters.pop(key, None)
+
+    async def run(self, key: str, call: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            self.stats["executions"] += 1
+            task = asyncio.get_running_loop().create_task(call(), context=detached_context())
+            task.add_done_callback(lambda done, key=key: self._forget(key, done))
+            self._inflight[key] = task
+            self._waiters[key] = 0
+        else:
+            self.stats["coalesced"] += 1
+            print(f"[SINGLEFLIGHT] {self.name}: joined in-flight call ({self._waiters[key]} waiting)")
+
+        self._waiters[key] += 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.done():
+                self._waiters[key] -= 1
+                if self._waiters[key] == 0:
+                    self.stats["abandoned"] += 1
+                    task.cancel()
+            raise
+        except Exception:
+            self.stats["failed"] += 1
+            raise
+
+    def metrics(self) -> Dict[str, Any]:
+        calls = self.stats["executions"] + self.stats["coalesced"]
+        return {
+            **self.stats,
+            "in_flight": len(self._inflight),
+            "coalesce_rate": round(self.stats["coalesced"] / calls, 4) if calls else 0.0,
+        }
+
+
+# In-memory caches
+_groups: Dict[str, SingleFlight] = {}
+
+def get_group(name: str) -> SingleFlight:
+    if name not in _groups:
+        _groups[name] = SingleFlight(name)
+    return _groups[name]
+
+
+# ——— Public API ———
+
+def flight_key(*parts: Any) -> str:
+    """Stable key for a call from its normalized inputs (JSON-serializable parts)"""
+    material = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+async def coalesce(group: str, key: str, call: Callable[[], Awaitable[Any]]) -> Any:
+    """Run call() unless an identical call (same group and key) is already in flight; share its result"""
+    return await get_group(group).run(key, call)
+
+def coalescing_metrics() -> Dict[str, Any]:
+    return {name: group.metrics() for name, group in _groups.items()}
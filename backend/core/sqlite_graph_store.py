@@ -0,0 +1,281 @@
+# backend/core/sqlite_graph_store.py
+
+import os
+import json
+import sqlite3
+from typing import Dict, List
+
+from backend.core.graph_backend import GraphBackend
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+GRAPH_DB_PATH = os.getenv("GRAPH_DB_PATH", os.path.join(BASE_DIR, "graph_store", "graph.db"))
+
+# SQLite caps bound parameters per statement; stay well below the limit
+_IN_CHUNK = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS nodes (
+    id TEXT PRIMARY KEY,
+    labels TEXT NOT NULL DEFAULT '[]',
+    props TEXT NOT NULL DEFAULT '{}'
+);
+CREATE TABLE IF NOT EXISTS edges (
+    src TEXT NOT NULL,
+    dst TEXT NOT NULL,
+    type TEXT NOT NULL,
+    props TEXT NOT NULL DEFAULT '{}',
+    PRIMARY KEY (src, dst, type)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_edges_dst ON edges (dst, src);
+CREATE TABLE IF NOT EXISTS node_buckets (
+    id TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    PRIMARY KEY (id, bucket)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS edge_buckets (
+    src TEXT NOT NULL,
+    dst TEXT NOT NULL,
+    type TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    PRIMARY KEY (src, dst, type, bucket)
+) WITHOUT ROWID;
+"""
+
+def _chunks(items: list, size: int = _IN_CHUNK):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+def _placeholders(n: int) -> str:
+    return ",".join("?" * n)
+
+
+class SQLiteGraphBackend(GraphBackend):
+    """
+    Embedded on-disk graph store: adjacency tables in a single SQLite file.
+
+    Edges are keyed (src, dst, type) with a secondary (dst, src) index, so
+    neighbour expansion and degree queries are index lookups in both
+    directions. WAL mode lets several workers read while one writes.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, db_path: str = None):
+        self.db_path = db_path or GRAPH_DB_PATH
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA busy_timeout = 30000")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        return conn
+
+    # ——— Writes ———
+
+    def write_graph(self, nodes, relations, bucket=None):
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany(
+                    """
+                    INSERT INTO nodes (id, labels, props) VALUES (?, ?, ?)
+                    ON CONFLICT(id) DO UPDATE SET
+                        labels = excluded.labels,
+                        props = json_patch(nodes.props, excluded.props)
+                    """,
+                    [
+                        (n["id"], json.dumps(sorted(set(n.get("labels", [])))), json.dumps(n.get("props", {}), default=str))
+                        for n in nodes
+                    ]
+                )
+                if bucket:
+                    conn.executemany(
+                        "INSERT OR IGNORE INTO node_buckets (id, bucket) VALUES (?, ?)",
+                        [(n["id"], bucket) for n in nodes]
+                    )
+
+                # Like MATCH ... MERGE in Neo4j: relations need both endpoints to exist
+                rel_rows = [
+                    (r["start"], r["end"], r.get("type") or "RELATED", json.dumps(r.get("props", {}), default=str))
+                    for r in relations
+                ]
+                conn.executemany(
+                    """
+                    INSERT INTO edges (src, dst, type, props)
+                    SELECT ?1, ?2, ?3, ?4
+                    WHERE EXISTS (SELECT 1 FROM nodes WHERE id = ?1)
+                      AND EXISTS (SELECT 1 FROM nodes WHERE id = ?2)
+                    ON CONFLICT(src, dst, type) DO UPDATE SET props = json_patch(edges.props, excluded.props)
+                    """,
+                    rel_rows
+                )
+                if bucket:
+                    conn.executemany(
+                        """
+                        INSERT OR IGNORE INTO edge_buckets (src, dst, type, bucket)
+                        SELECT ?1, ?2, ?3, ?4
+                        WHERE EXISTS (SELECT 1 FROM edges WHERE src = ?1 AND dst = ?2 AND type = ?3)
+                        """,
+                        [(src, dst, rel_type, bucket) for src, dst, rel_type, _ in rel_rows]
+                    )
+        finally:
+            conn.close()
+        return {"nodes": len(nodes), "relations": len(relations)}
+
+    def delete_relations(self, relations, bucket=None):
+        # Matched in either direction, as in the Neo4j backend
+        keys = []
+        for r in relations:
+            rel_type = r.get("type") or "RELATED"
+            keys.append((r["start"], r["end"], rel_type))
+            keys.append((r["end"], r["start"], rel_type))
+
+        conn = self._connect()
+        try:
+            with conn:
+                if bucket:
+                    conn.executemany(
+                        "DELETE FROM edge_buckets WHERE src = ? AND dst = ? AND type = ? AND bucket = ?",
+                        [key + (bucket,) for key in keys]
+                    )
+                    conn.executemany(
+                        """
+                        DELETE FROM edges WHERE src = ?1 AND dst = ?2 AND type = ?3
+                        AND NOT EXISTS (SELECT 1 FROM edge_buckets WHERE src = ?1 AND dst = ?2 AND type = ?3)
+                        """,
+                        keys
+                    )
+                else:
+                    conn.executemany("DELETE FROM edge_buckets WHERE src = ? AND dst = ? AND type = ?", keys)
+                    conn.executemany("DELETE FROM edges WHERE src = ? AND dst = ? AND type = ?", keys)
+        finally:
+            conn.close()
+        return {"relations": len(relations)}
+
+    def delete_nodes(self, node_ids, bucket=None):
+        conn = self._connect()
+        try:
+            with conn:
+                if bucket:
+                    conn.executemany(
+                        "DELETE FROM node_buckets WHERE id = ? AND bucket = ?",
+                        [(node_id, bucket) for node_id in node_ids]
+                    )
+                    doomed = [
+                        node_id for node_id in node_ids
+                        if conn.execute("SELECT 1 FROM node_buckets WHERE id = ? LIMIT 1", (node_id,)).fetchone() is None
+                    ]
+                else:
+                    doomed = list(node_ids)
+
+                # DETACH DELETE: drop the node together with every relation touching it
+                rows = [(node_id,) for node_id in doomed]
+                conn.executemany("DELETE FROM edge_buckets WHERE src = ?", rows)
+                conn.executemany("DELETE FROM edge_buckets WHERE dst = ?", rows)
+                conn.executemany("DELETE FROM edges WHERE src = ?", rows)
+                conn.executemany("DELETE FROM edges WHERE dst = ?", rows)
+                conn.executemany("DELETE FROM node_buckets WHERE id = ?", rows)
+                conn.executemany("DELETE FROM nodes WHERE id = ?", rows)
+        finally:
+            conn.close()
+        return {"nodes": len(node_ids)}
+
+    # ——— Reads ———
+
+    def _query(self, sql: str, params=()) -> List[tuple]:
+        conn = self._connect()
+        try:
+            return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+    def fetch_graph(self, limit=100):
+        rows = self._query("SELECT src, type, dst FROM edges LIMIT ?", (limit,))
+        return [{"from": src, "type": rel_type, "to": dst} for src, rel_type, dst in rows]
+
+    def neighbors(self, node_id, limit=100, rel_type=None):
+        type_filter = " AND type = ?" if rel_type else ""
+        extra = (rel_type,) if rel_type else ()
+        rows = self._query(
+            f"""
+            SELECT dst, type, 'out', props FROM edges WHERE src = ?{type_filter}
+            UNION ALL
+            SELECT src, type, 'in', props FROM edges WHERE dst = ?{type_filter}
+            LIMIT ?
+            """,
+            (node_id, *extra, node_id, *extra, limit)
+        )
+        return [
+            {"id": other, "type": t, "direction": direction, "props": json.loads(props)}
+            for other, t, direction, props in rows
+        ]
+
+    def degree(self, node_ids):
+        result = {}
+        for chunk in _chunks(list(dict.fromkeys(node_ids))):
+            marks = _placeholders(len(chunk))
+            rows = self._query(
+                f"""
+                SELECT id, SUM(n) FROM (
+                    SELECT src AS id, COUNT(*) AS n FROM edges WHERE src IN ({marks}) GROUP BY src
+                    UNION ALL
+                    SELECT dst AS id, COUNT(*) AS n FROM edges WHERE dst IN ({marks}) GROUP BY dst
+                ) GROUP BY id
+                """,
+                (*chunk, *chunk)
+            )
+            counts = dict(rows)
+            existing = {
+                row[0] for row in self._query(f"SELECT id FROM nodes WHERE id IN ({marks})", tuple(chunk))
+            }
+            result.update({node_id: counts.get(node_id, 0) for node_id in chunk if node_id in existing})
+        return result
+
+    def _adjacent_ids(self, node_ids):
+        adjacency: Dict[str, set] = {}
+        for chunk in _chunks(list(node_ids)):
+            marks = _placeholders(len(chunk))
+            rows = self._query(
+                f"""
+                SELECT src, dst FROM edges WHERE src IN ({marks})
+                UNION
+                SELECT dst, src FROM edges WHERE dst IN ({marks})
+                """,
+                (*chunk, *chunk)
+            )
+            for node_id, other in rows:
+                adjacency.setdefault(node_id, set()).add(other)
+        return adjacency
+
+    def _node_records(self, node_ids):
+        records = {}
+        for chunk in _chunks(list(node_ids)):
+            rows = self._query(
+                f"SELECT id, labels, props FROM nodes WHERE id IN ({_placeholders(len(chunk))})",
+                tuple(chunk)
+            )
+            for node_id, labels, props in rows:
+                records[node_id] = {"id": node_id, "labels": json.loads(labels), "props": json.loads(props)}
+        # Preserve the caller's (BFS) order
+        return [records[n] for n in node_ids if n in records]
+
+    def _edges_among(self, node_ids):
+        selected = set(node_ids)
+        edges = []
+        for chunk in _chunks(list(node_ids)):
+            rows = self._query(
+                f"SELECT src, dst, type, props FROM edges WHERE src IN ({_placeholders(len(chunk))})",
+                tuple(chunk)
+            )
+            edges.extend(
+                {"start": src, "end": dst, "type": t, "props": json.loads(props)}
+                for src, dst, t, props in rows if dst in selected
+            )
+        return edges
@@ -11,9 +11,12 @@ from backend.api import (
     graph,
     project_versions,
     templates,  # ✅ ADDED: Template system
-    export      # ✅ ADDED: Export system
+    export,     # ✅ ADDED: Export system
+    llm
 )
 
+from backend.core import ingest_queue
+
 # 🧠 Import submodule routers
 from backend.api.brainstorming import routes as brainstorming_routes
 from backend.api.writing import routes as writing_routes
@@ -34,11 +37,25 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# ✅ Healthcheck
+# ✅ Healthcheck (liveness only - deep readiness lives at /projects/system/health)
 @app.get("/healthcheck", tags=["Health"])
 def healthcheck():
     return {"status": "ok"}
 
+# 🩺 Background health reports (served from cache by the health endpoints)
+@app.on_event("startup")
+async def start_health_monitor():
+    project_manager.ensure_health_monitor()
+
+@app.on_event("shutdown")
+async def stop_health_monitor():
+    await project_manager.stop_health_monitor()
+
+# 📥 Background ingestion workers (started on the first queued upload)
+@app.on_event("shutdown")
+async def stop_ingest_workers():
+    await ingest_queue.stop_workers()
+
 # 🎯 PHASE 1 ADDITIONS - Template and Export Systems
 app.include_router(templates.router, prefix="/templates", tags=["Templates"])
 app.include_router(export.router, prefix="/projects/{project_name}/export", tags=["Export"])
@@ -65,6 +82,9 @@ app.include_router(buckets.router, prefix="/projects/{project_name}/buckets", ta
 # 🔗 Graph Operations (Neo4j)
 app.include_router(graph.router, prefix="/projects/{project_name}/graph", tags=["Graph"])
 
+# 🚦 LLM gateway metrics (rate limits, lanes, queue depth)
+app.include_router(llm.router, tags=["LLM"])
+
 # 🚀 API is now complete with all Phase 1-2.2 functionality
 # Available endpoints:
 # - Templates: /templates/*
@@ -0,0 +1,161 @@
+# backend/tests/test_idempotency.py
+
+import asyncio
+
+import pytest
+
+from backend.core import idempotency
+from backend.core.idempotency import run_idempotent, IdempotencyConflict
+
+
+@pytest.fixture(autouse=True)
+def key_store(tmp_path, monkeypatch):
+    monkeypatch.setattr(idempotency, "IDEMPOTENCY_DIR", str(tmp_path))
+    monkeypatch.setattr(idempotency, "_ready", False)
+    monkeypatch.setattr(idempotency, "POLL_SECONDS", 0.01)
+    idempotency._inflight.clear()
+
+
+class Work:
+    """Counts executions and returns the next scripted response (or raises it)"""
+
+    def __init__(self, *responses, delay: float = 0):
+        self.responses = list(responses)
+        self.delay = delay
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        response = self.responses[min(self.calls, len(self.responses)) - 1]
+        if isinstance(response, BaseException):
+            raise response
+        return response
+
+
+def test_replays_stored_response():
+    work = Work({"status": "success", "text": "first"}, {"status": "success", "text": "second"})
+
+    async def scenario():
+        first = await run_idempotent("write", "k1", "fp", work)
+        second = await run_idempotent("write", "k1", "fp", work)
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first == ({"status": "success", "text": "first"}, False)
+    assert second == ({"status": "success", "text": "first"}, True)
+    assert work.calls == 1
+
+def test_conflicting_body_is_rejected():
+    work = Work({"status": "success"})
+
+    async def scenario():
+        await run_idempotent("write", "k1", "fp", work)
+        await run_idempotent("write", "k1", "other", work)
+
+    with pytest.raises(IdempotencyConflict):
+        asyncio.run(scenario())
+    assert work.calls == 1
+
+def test_conflicting_body_is_rejected_while_running():
+    work = Work({"status": "success"}, delay=0.05)
+
+    async def scenario():
+        first = asyncio.create_task(run_idempotent("write", "k1", "fp", work))
+        await asyncio.sleep(0.01)
+        try:
+            await run_idempotent("write", "k1", "other", work)
+        finally:
+            await first
+
+    with pytest.raises(IdempotencyConflict):
+        asyncio.run(scenario())
+
+def test_concurrent_duplicate_waits_for_the_original():
+    work = Work({"status": "success", "text": "once"}, delay=0.05)
+
+    async def scenario():
+        return await asyncio.gather(
+            run_idempotent("write", "k1", "fp", work),
+            run_idempotent("write", "k1", "fp", work),
+        )
+
+    original, duplicate = asyncio.run(scenario())
+    assert original == ({"status": "success", "text": "once"}, False)
+    assert duplicate == ({"status": "success", "text": "once"}, True)
+    assert work.calls == 1
+
+def test_error_response_is_not_replayed():
+    work = Work({"status": "error", "error": "LLM down"}, {"status": "success", "text": "retried"})
+
+    async def scenario():
+        first = await run_idempotent("write", "k1", "fp", work)
+        second = await run_idempotent("write", "k1", "fp", work)
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first == ({"status": "error", "error": "LLM down"}, False)
+    assert second == ({"status": "success", "text": "retried"}, False)
+    assert work.calls == 2
+
+def test_storable_vetoes_failure_reported_as_success():
+    work = Work({"status": "success", "result": "Content generation failed: timeout"},
+                {"status": "success", "result": "A chapter"})
+    storable = lambda response: not response["result"].startswith("Content generation failed")
+
+    async def scenario():
+        await run_idempotent("write", "k1", "fp", work, storable=storable)
+        return await run_idempotent("write", "k1", "fp", work, storable=storable)
+
+    assert asyncio.run(scenario()) == ({"status": "success", "result": "A chapter"}, False)
+    assert work.calls == 2
+
+def test_exception_releases_the_key():
+    work = Work(RuntimeError("provider error"), {"status": "success"})
+
+    async def scenario():
+        with pytest.raises(RuntimeError):
+            await run_idempotent("write", "k1", "fp", work)
+        return await run_idempotent("write", "k1", "fp", work)
+
+    assert asyncio.run(scenario()) == ({"status": "success"}, False)
+    assert work.calls == 2
+
+def test_duplicate_reruns_after_the_original_fails():
+    work = Work({"status": "error"}, {"status": "success", "text": "second"}, delay=0.05)
+
+    async def scenario():
+        return await asyncio.gather(
+            run_idempotent("write", "k1", "fp", work),
+            run_idempotent("write", "k1", "fp", work),
+        )
+
+    original, duplicate = asyncio.run(scenario())
+    assert original == ({"status": "error"}, False)
+    assert duplicate == ({"status": "success", "text": "second"}, False)
+    assert work.calls == 2
+
+def test_retry_attaches_to_work_of_a_dropped_request():
+    work = Work({"status": "success", "text": "once"}, delay=0.05)
+
+    async def scenario():
+        dropped = asyncio.create_task(run_idempotent("write", "k1", "fp", work))
+        await asyncio.sleep(0.01)
+        dropped.cancel()
+        retry = await run_idempotent("write", "k1", "fp", work)
+        return dropped.cancelled(), retry
+
+    dropped, retry = asyncio.run(scenario())
+    assert dropped
+    assert retry == ({"status": "success", "text": "once"}, True)
+    assert work.calls == 1
+
+def test_without_key_work_always_runs():
+    work = Work({"status": "success"})
+
+    async def scenario():
+        await run_idempotent("write", None, "fp", work)
+        return await run_idempotent("write", None, "fp", work)
+
+    assert asyncio.run(scenario()) == ({"status": "success"}, False)
+    assert work.calls == 2
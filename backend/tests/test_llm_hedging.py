@@ -0,0 +1,55 @@
+# backend/tests/test_llm_hedging.py
+
+import asyncio
+
+import pytest
+
+from backend.core import llm_hedging
+from backend.core.llm_hedging import hedged_completion
+
+
+@pytest.fixture(autouse=True)
+def trackers(monkeypatch):
+    monkeypatch.setattr(llm_hedging, "HEDGE_DEFAULT_DELAY", 0.05)
+    llm_hedging._trackers.clear()
+
+
+def streaming(text: str, first_token_after: float = 0, fail: BaseException = None):
+    """Attempt that raises fail, or streams text after the given delay"""
+    calls = []
+
+    async def attempt(on_first_token):
+        calls.append(1)
+        await asyncio.sleep(first_token_after)
+        if fail is not None:
+            raise fail
+        on_first_token()
+        return text
+    attempt.calls = calls
+    return attempt
+
+
+def test_fast_primary_is_not_hedged():
+    primary, backup = streaming("primary"), streaming("backup")
+    result = asyncio.run(hedged_completion("a", primary, "b", backup))
+    assert result == {"text": "primary", "provider": "a", "hedged": False, "winner": "primary"}
+    assert not backup.calls
+
+def test_slow_primary_is_hedged():
+    primary, backup = streaming("primary", first_token_after=1), streaming("backup")
+    result = asyncio.run(hedged_completion("a", primary, "b", backup))
+    assert result == {"text": "backup", "provider": "b", "hedged": True, "winner": "hedge"}
+    # The cancelled primary still leaves a lower-bound first-token sample
+    assert len(llm_hedging.get_tracker("a").samples) == 1
+
+def test_primary_failing_before_the_deadline_falls_back():
+    primary = streaming("primary", fail=ConnectionError("refused"))
+    backup = streaming("backup")
+    result = asyncio.run(hedged_completion("a", primary, "b", backup))
+    assert result == {"text": "backup", "provider": "b", "hedged": True, "winner": "hedge"}
+
+def test_both_failing_raises_the_primary_error():
+    primary = streaming("primary", fail=ConnectionError("refused"))
+    backup = streaming("backup", fail=RuntimeError("rate limited"))
+    with pytest.raises(ConnectionError):
+        asyncio.run(hedged_completion("a", primary, "b", backup))